@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark thesis-device detection: the compiled phrase trie used by
+marker.iter_device_spans against the previous per-position loop, which
+built a lowercased tuple for every phrase length at every token.
+
+Each essay is repeated ``--scale`` times to simulate a long essay, parsed
+once, and scanned with both implementations. The two must yield identical
+spans; the script exits non-zero if they don't.
+
+Usage:
+    python bench_device_spans.py essay1.docx [essay2.docx ...] [--scale 10] [--repeat 5]
+"""
+
+import argparse
+import sys
+import time
+
+import marker
+
+
+def _legacy_iter_device_spans(doc):
+    """iter_device_spans before the trie (full-doc range only), for comparison."""
+    n = len(doc)
+    i = 0
+    while i < n:
+        tok = doc[i]
+        matched = False
+        for length in range(marker.THESIS_MULTIWORD_MAX_LEN, 1, -1):
+            if i + length > n:
+                continue
+            phrase_tokens = doc[i:i + length]
+            phrase_key = tuple(t.text.lower() for t in phrase_tokens)
+            if phrase_key in marker.THESIS_MULTIWORD_SYNONYMS:
+                end = phrase_tokens[-1].idx + len(phrase_tokens[-1].text)
+                yield marker.THESIS_MULTIWORD_SYNONYMS[phrase_key], tok.idx, end
+                i += length
+                matched = True
+                break
+        if matched:
+            continue
+        canonical = marker._single_token_device_key(tok)
+        if canonical is not None:
+            yield canonical, tok.idx, tok.idx + len(tok.text)
+        i += 1
+
+
+def _best_ms(fn, doc, repeat: int) -> tuple[float, list]:
+    best = float("inf")
+    spans = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        spans = list(fn(doc))
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, spans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("essays", nargs="+", help=".docx essays to scan")
+    parser.add_argument("--scale", type=int, default=10, help="times to repeat each essay's text")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per implementation (best is kept)")
+    args = parser.parse_args()
+
+    print(f"{len(marker.THESIS_MULTIWORD_SYNONYMS)} multi-word device phrases, "
+          f"longest {marker.THESIS_MULTIWORD_MAX_LEN} tokens")
+    print(f"\n{'essay':40} {'tokens':>7} {'loop ms':>9} {'trie ms':>9} {'speedup':>8}")
+
+    mismatched = False
+    for path in args.essays:
+        with open(path, "rb") as f:
+            analysis = marker.EssayAnalysis.from_docx_bytes(f.read())
+        doc = marker.parse_text("\n".join([analysis.full_text] * max(1, args.scale)), "lemma")
+        loop_ms, loop_spans = _best_ms(_legacy_iter_device_spans, doc, args.repeat)
+        trie_ms, trie_spans = _best_ms(marker.iter_device_spans, doc, args.repeat)
+        if loop_spans != trie_spans:
+            mismatched = True
+            print(f"MISMATCH in {path}: {len(loop_spans)} loop spans vs {len(trie_spans)} trie spans")
+        print(f"{path[-40:]:40} {len(doc):>7} {loop_ms:>9.2f} {trie_ms:>9.2f} {loop_ms / trie_ms:>7.1f}x")
+
+    sys.exit(1 if mismatched else 0)
+
+
+if __name__ == "__main__":
+    main()
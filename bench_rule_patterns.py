@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled rule-pattern registry (marker.RULE_PATTERNS) that
+analyze_text scans each paragraph with.
+
+For every paragraph of the given essays this times a scan with every
+registry pattern three ways:
+
+  * registry  — the precompiled patterns, as analyze_text uses them now;
+  * warm      — re.compile() on each pattern source first, as analyze_text
+                used to on every call (served from the re module's cache);
+  * cold      — the same after re.purge(), which is what a worker pays once
+                the re cache (512 entries) has been churned by other code.
+
+The warm/cold minus registry difference is the per-paragraph saving.
+
+Usage:
+    python bench_rule_patterns.py essay1.docx [essay2.docx ...] [--repeat 20]
+"""
+
+import argparse
+import re
+import time
+
+import marker
+
+
+def _scan(patterns, text: str) -> int:
+    return sum(1 for pat in patterns for _ in pat.finditer(text))
+
+
+def _best_us(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("essays", nargs="+", help=".docx essays to scan")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per variant (best is kept)")
+    args = parser.parse_args()
+
+    patterns = list(marker.RULE_PATTERNS.values())
+    sources = [(pat.pattern, pat.flags) for pat in patterns]
+    print(f"{len(patterns)} registry patterns")
+
+    paragraphs = []
+    for path in args.essays:
+        with open(path, "rb") as f:
+            analysis = marker.EssayAnalysis.from_docx_bytes(f.read())
+        paragraphs.extend(p for p in analysis.paragraphs if p.strip())
+    if not paragraphs:
+        raise SystemExit("no paragraphs found")
+
+    def registry():
+        for text in paragraphs:
+            _scan(patterns, text)
+
+    def warm():
+        for text in paragraphs:
+            _scan([re.compile(p, f) for p, f in sources], text)
+
+    def cold():
+        for text in paragraphs:
+            re.purge()
+            _scan([re.compile(p, f) for p, f in sources], text)
+
+    n = len(paragraphs)
+    registry_us = _best_us(registry, args.repeat) / n
+    warm_us = _best_us(warm, args.repeat) / n
+    cold_us = _best_us(cold, max(1, args.repeat // 4)) / n
+
+    print(f"\n{n} paragraphs, µs per paragraph:")
+    print(f"  registry {registry_us:10.1f}")
+    print(f"  warm     {warm_us:10.1f}   (saves {warm_us - registry_us:.1f})")
+    print(f"  cold     {cold_us:10.1f}   (saves {cold_us - registry_us:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Benchmark sentence post-processing: the single sweep in marker.spacy_parse
+(with known_names) against the previous four passes — quote merge,
+single-letter abbreviation merge, missing-space split, then
+merge_sentences_around_known_names' any() over every name span.
+
+Every paragraph of the given essays, plus a set of built-in edge cases
+(quotes, initials, "U.S.", "sentence.Next", split author names), is parsed
+once and segmented both ways; the sentences must be identical and the
+script exits non-zero if they aren't. Timings are for each paragraph
+repeated ``--scale`` times, to simulate long paragraphs.
+
+Usage:
+    python bench_sentence_segmentation.py essay1.docx [essay2.docx ...] \\
+        [--names "F. Scott Fitzgerald" "The Great Gatsby"] [--scale 20] [--repeat 5]
+"""
+
+import argparse
+import re
+import sys
+import time
+
+import marker
+
+EDGE_CASES = [
+    'In "What is Love?", the author asks a question. It is answered later.',
+    'She said "Stop! Wait." Then she left.',
+    'He wrote "Go now." and "Stay!" He meant both.',
+    'John F. Kennedy spoke. The U.S. listened. A. Lincoln did too.',
+    "The sentence ends here.Next one starts without a space.Is it split?Yes!Again.",
+    "Initials like J.K.Rowling and A.B.Smith stay together. Dr.Jekyll does not.",
+    "In The Great Gatsby, F. Scott Fitzgerald writes. Mr. T. S. Eliot agrees.",
+    'Quotes "inside. quotes" end with 3 "numbers. 42" and (parens "here.") okay.',
+    "x. Y. z. A.B.C.D. E.F. Done.",
+    "Ünïcode.Ärger and émigré.Ça marche. Ω.Σ ends.",
+]
+DEFAULT_NAMES = ["F. Scott Fitzgerald", "The Great Gatsby", "Mr. T. S. Eliot", "J.K.Rowling", "Dr.Jekyll"]
+
+
+def _legacy_spacy_parse(text, doc):
+    """spacy_parse's sentence passes before the sweep, for comparison."""
+    tokens = [(t.text, t.idx, t.idx + len(t.text)) for t in doc]
+    raw_sentences = [(s.start_char, s.end_char) for s in doc.sents]
+    quote_spans = list(marker.compute_quote_spans(text))
+
+    def _quote_span_for_pos(pos: int):
+        for qs, qe in quote_spans:
+            if qs <= pos < qe:
+                return (qs, qe)
+        return None
+
+    def _should_merge_at_boundary(boundary_pos: int) -> bool:
+        if boundary_pos < 0 or boundary_pos >= len(text):
+            return False
+        if text[boundary_pos] not in ".?!":
+            return False
+        span = _quote_span_for_pos(boundary_pos)
+        if not span:
+            return False
+        qs, qe = span
+        if boundary_pos < (qe - 1):
+            return True
+        j = qe + 1
+        while j < len(text) and text[j].isspace():
+            j += 1
+        if j >= len(text):
+            return False
+        nxt = text[j]
+        return (nxt in {",", ";", ":", ")", "]"} or nxt.islower() or nxt.isdigit())
+
+    if len(raw_sentences) >= 2:
+        merged = []
+        cur_start, cur_end = raw_sentences[0]
+        for ns, ne in raw_sentences[1:]:
+            if _should_merge_at_boundary(cur_end - 1):
+                cur_end = ne
+            else:
+                merged.append((cur_start, cur_end))
+                cur_start, cur_end = ns, ne
+        merged.append((cur_start, cur_end))
+        raw_sentences = merged
+
+    _single_letter_end_re = re.compile(r"(?:^|[\s.])[A-Za-z]\.\s*$")
+    if len(raw_sentences) >= 2:
+        merged2 = []
+        cur_start, cur_end = raw_sentences[0]
+        for ns, ne in raw_sentences[1:]:
+            if _single_letter_end_re.search(text[cur_start:cur_end]):
+                cur_end = ne
+            else:
+                merged2.append((cur_start, cur_end))
+                cur_start, cur_end = ns, ne
+        merged2.append((cur_start, cur_end))
+        raw_sentences = merged2
+
+    sentences = []
+    for s_start, s_end in raw_sentences:
+        cur_start = s_start
+        i = s_start
+        while i < s_end - 1:
+            ch = text[i]
+            nxt = text[i + 1]
+            if ch in ".?!" and not nxt.isspace() and nxt.isalpha() and nxt.isupper():
+                if ch == "." and i >= 1 and text[i - 1].isalpha() and (i < 2 or not text[i - 2].isalpha()):
+                    i += 1
+                    continue
+                cut_end = i + 1
+                if cur_start < cut_end:
+                    sentences.append((cur_start, cut_end))
+                cur_start = cut_end
+            i += 1
+        if cur_start < s_end:
+            sentences.append((cur_start, s_end))
+    return doc, tokens, sentences
+
+
+def _legacy_merge_known_names(sentences, flat_text, known_names):
+    """merge_sentences_around_known_names before the sweep, for comparison."""
+    if not known_names or not sentences:
+        return sentences
+    text_lower = flat_text.lower()
+    protected_spans = []
+    for name in known_names:
+        if not name:
+            continue
+        name_lower = name.lower()
+        start = 0
+        while True:
+            idx = text_lower.find(name_lower, start)
+            if idx == -1:
+                break
+            protected_spans.append((idx, idx + len(name)))
+            start = idx + 1
+    if not protected_spans:
+        return sentences
+    merged = []
+    i = 0
+    while i < len(sentences):
+        s_start, s_end = sentences[i]
+        while i + 1 < len(sentences):
+            if any(ps < s_end < pe for ps, pe in protected_spans):
+                s_end = sentences[i + 1][1]
+                i += 1
+            else:
+                break
+        merged.append((s_start, s_end))
+        i += 1
+    return merged
+
+
+def _legacy(text, doc, names):
+    _, _, sentences = _legacy_spacy_parse(text, doc)
+    return _legacy_merge_known_names(sentences, text, names)
+
+
+def _sweep(text, doc, names):
+    _, _, sentences = marker.spacy_parse(text, doc=doc, known_names=names)
+    return sentences
+
+
+def _best_ms(fn, text, doc, names, repeat: int) -> tuple[float, list]:
+    best = float("inf")
+    sentences = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sentences = fn(text, doc, names)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, sentences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("essays", nargs="*", help=".docx essays to segment")
+    parser.add_argument("--names", nargs="*", default=DEFAULT_NAMES, help="known author/title names")
+    parser.add_argument("--scale", type=int, default=20, help="times to repeat each paragraph for timing")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per implementation (best is kept)")
+    args = parser.parse_args()
+
+    paragraphs = list(EDGE_CASES)
+    for path in args.essays:
+        with open(path, "rb") as f:
+            analysis = marker.EssayAnalysis.from_docx_bytes(f.read())
+        paragraphs.extend(p for p in analysis.paragraphs if p.strip())
+
+    # Parity on every paragraph as written, with and without known names
+    mismatched = 0
+    for text in paragraphs:
+        doc = marker.cached_parse(text)
+        for names in (None, args.names):
+            if _legacy(text, doc, names) != _sweep(text, doc, names):
+                mismatched += 1
+                print(f"MISMATCH (names={bool(names)}): {text[:70]!r}")
+    print(f"parity: {len(paragraphs)} paragraphs, {mismatched} mismatches")
+
+    # Timing on long paragraphs
+    total_legacy = total_sweep = 0.0
+    for text in paragraphs:
+        long_text = " ".join([text] * max(1, args.scale))
+        doc = marker.cached_parse(long_text)
+        legacy_ms, legacy_sents = _best_ms(_legacy, long_text, doc, args.names, args.repeat)
+        sweep_ms, sweep_sents = _best_ms(_sweep, long_text, doc, args.names, args.repeat)
+        if legacy_sents != sweep_sents:
+            mismatched += 1
+            print(f"MISMATCH (x{args.scale}): {text[:70]!r}")
+        total_legacy += legacy_ms
+        total_sweep += sweep_ms
+    print(f"\n{len(paragraphs)} paragraphs x{args.scale}: "
+          f"passes {total_legacy:.1f} ms, sweep {total_sweep:.1f} ms "
+          f"({total_legacy / max(total_sweep, 1e-9):.1f}x)")
+
+    sys.exit(1 if mismatched else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark the spaCy pipeline profiles used by marker.py.
+
+For each essay, times the calls one mark makes outside the per-paragraph
+marking pass (lexis detection, positive events and the techniques list all
+share one full-essay parse), once with the full pipeline and once with the
+profile each call site now declares. Prints per-essay milliseconds and the
+saving.
+
+Usage:
+    python bench_spacy_profiles.py essay1.docx [essay2.docx ...] [--repeat 5]
+"""
+
+import argparse
+import time
+
+import marker
+
+
+def _time_parse(text: str, profile: str, repeat: int) -> float:
+    """Best-of-``repeat`` milliseconds for parse_text(text, profile)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        marker.parse_text(text, profile)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_essay(path: str, repeat: int) -> dict:
+    with open(path, "rb") as f:
+        analysis = marker.EssayAnalysis.from_docx_bytes(f.read())
+    text = analysis.full_text
+    return {
+        "essay": path,
+        "words": len(text.split()),
+        **{profile: _time_parse(text, profile, repeat) for profile in marker.SPACY_PROFILES},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("essays", nargs="+", help=".docx essays to parse")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per essay and profile (best is kept)")
+    args = parser.parse_args()
+
+    print(f"spaCy pipeline: {marker.nlp.pipe_names}")
+    marker.parse_text("Warm up the pipeline.", "full")
+
+    rows = [bench_essay(path, max(1, args.repeat)) for path in args.essays]
+    profiles = list(marker.SPACY_PROFILES)
+
+    print(f"\n{'essay':40} {'words':>6} " + " ".join(f"{p + ' ms':>12}" for p in profiles) + f" {'saved':>8}")
+    for row in rows:
+        saved = 1 - row["lemma"] / row["full"] if row["full"] else 0.0
+        print(
+            f"{row['essay'][-40:]:40} {row['words']:>6} "
+            + " ".join(f"{row[p]:>12.1f}" for p in profiles)
+            + f" {saved:>8.0%}"
+        )
+
+    total_full = sum(r["full"] for r in rows)
+    total_lemma = sum(r["lemma"] for r in rows)
+    if total_full:
+        print(
+            f"\nFull-essay parse, full -> lemma profile: "
+            f"{total_full / len(rows):.1f} ms -> {total_lemma / len(rows):.1f} ms per essay "
+            f"({1 - total_lemma / total_full:.0%} saved)"
+        )
+
+
+if __name__ == "__main__":
+    main()
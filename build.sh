@@ -30,4 +30,15 @@ pip install -r requirements.txt
 echo "📦 Downloading spaCy language model..."
 pip install https://github.com/explosion/spacy-models/releases/download/en_core_web_sm-3.7.1/en_core_web_sm-3.7.1-py3-none-any.whl
 
+echo "📦 Downloading LanguageTool server..."
+python3 -c "import sys; from lt_service import ensure_server_jar; sys.exit(0 if ensure_server_jar() else 1)" \
+    || echo "⚠️  LanguageTool not downloaded; the API will download it at startup"
+
+echo "📚 Precompiling lexis index..."
+python3 build_lexis_index.py || echo "⚠️  Lexis index not precompiled; workers will build it on first use"
+
+echo "📚 Building English word index..."
+python3 build_word_index.py \
+    || echo "⚠️  Word index not built (no full dictionary found, see above); derivation checks will ask LanguageTool"
+
 echo "✓ Build completed successfully"
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Precompile the lexis lemma index used by marker.detect_lexis_in_text.
+
+Lemmatizes every assignment-lexis.csv term in one spaCy nlp.pipe run and
+writes the result to assignment-lexis.index.json (or VYSTI_LEXIS_INDEX_PATH),
+so API workers load the index in milliseconds instead of lemmatizing the
+whole vocabulary on their first mark. Run it after editing the CSV (build.sh
+does this on deploy). Workers also rebuild the artifact themselves when it
+no longer matches the CSV, so a stale file is never used.
+
+Usage:
+    python build_lexis_index.py [--out PATH] [--force]
+"""
+
+import argparse
+import time
+
+import marker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default=marker.LEXIS_INDEX_PATH, help="artifact path (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the artifact is up to date")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    path, entries, rebuilt = marker.precompile_lexis_index(args.out, force=args.force)
+    elapsed = time.perf_counter() - start
+    status = "wrote" if rebuilt else "up to date:"
+    print(f"{status} {path} ({entries} index entries, {elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
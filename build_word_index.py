@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Build the English word index used by marker._is_valid_derivation.
+
+Reads plain word lists (one word per line; hunspell .dic files work too:
+the count line and "/FLAGS" suffixes are skipped) and writes the
+memory-mapped index to english-words.idx (or VYSTI_WORD_INDEX_PATH).
+Without arguments it uses the system dictionary (/usr/share/dict/words)
+plus the plain-text English spelling lists
+(org/languagetool/resource/en/hunspell/spelling*.txt) packed in a
+downloaded LanguageTool's language-module jars. The LanguageTool lists are
+only additions to its binary dictionary, so without a system dictionary
+nothing is built. A source written ``some.jar!path/in/jar`` is read out of
+the jar. The build exits non-zero, writing no artifact, when the words add
+up to fewer than word_index.MIN_WORDS.
+Run it at build time (build.sh does this on deploy); without the
+artifact, derivation checks fall back to asking LanguageTool.
+
+Usage:
+    python build_word_index.py [wordlist ...] [--out PATH]
+"""
+
+import argparse
+import glob
+import io
+import os
+import time
+import zipfile
+
+from lt_service import find_server_jar
+from word_index import MIN_WORDS, WORD_INDEX_PATH, build_word_index
+
+SYSTEM_DICTIONARIES = ("/usr/share/dict/words", "/usr/share/dict/american-english")
+
+
+def default_sources() -> list[str]:
+    """System dictionaries plus LanguageTool's spelling lists; empty without a system dictionary."""
+    sources = [p for p in SYSTEM_DICTIONARIES if os.path.exists(p)]
+    if not sources:
+        return []
+    jar = find_server_jar()
+    if jar:
+        # The English module ships as libs/language-en.jar (older releases
+        # bundle it into the other jars), so look inside all of them.
+        jar_dir = os.path.dirname(jar)
+        for module in sorted(glob.glob(os.path.join(jar_dir, "*.jar")) + glob.glob(os.path.join(jar_dir, "libs", "*.jar"))):
+            try:
+                with zipfile.ZipFile(module) as archive:
+                    sources += [
+                        f"{module}!{name}" for name in sorted(archive.namelist())
+                        if name.startswith(_LT_SPELLING_PREFIX) and name.endswith(".txt")
+                    ]
+            except (OSError, zipfile.BadZipFile):
+                continue
+    return sources
+
+
+_LT_SPELLING_PREFIX = "org/languagetool/resource/en/hunspell/spelling"
+
+
+def _open_source(path: str):
+    if "!" in path:
+        jar, member = path.split("!", 1)
+        with zipfile.ZipFile(jar) as archive:
+            return io.StringIO(archive.read(member).decode("utf-8", errors="ignore"))
+    return open(path, encoding="utf-8", errors="ignore")
+
+
+def read_words(path: str):
+    with _open_source(path) as f:
+        for line in f:
+            word = line.split("/", 1)[0].strip()
+            if word and not word.startswith("#") and not word.isdigit():
+                yield word
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("sources", nargs="*", help="word list files (default: system and LanguageTool lists)")
+    parser.add_argument("--out", default=WORD_INDEX_PATH, help="artifact path (default: %(default)s)")
+    parser.add_argument("--min-words", type=int, default=MIN_WORDS,
+                        help="refuse to write an index with fewer words (default: %(default)s)")
+    args = parser.parse_args()
+
+    sources = args.sources or default_sources()
+    if not sources:
+        raise SystemExit(
+            f"no system dictionary found ({', '.join(SYSTEM_DICTIONARIES)}); "
+            "install one (e.g. the wamerican package) or pass word list files"
+        )
+
+    start = time.perf_counter()
+    try:
+        count = build_word_index((w for path in sources for w in read_words(path)), args.out, args.min_words)
+    except ValueError as e:
+        raise SystemExit(f"not writing {args.out}: {e}")
+    elapsed = time.perf_counter() - start
+    print(f"wrote {args.out} ({count} words from {len(sources)} lists, {elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
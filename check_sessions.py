@@ -0,0 +1,126 @@
+"""
+Write-mode check sessions for incremental /check_text.
+
+The live Write page re-sends the whole essay to /check_text after every
+pause in typing, and each call re-marked every paragraph from scratch. A
+client that sends a ``session_id`` now gets incremental checks:
+
+  * an unchanged revision (same text, mode, titles and rule flags) is
+    answered straight from the session without re-marking;
+  * otherwise only the paragraphs that need it are analyzed again. Each
+    paragraph's marks are kept in the session, keyed by its text and a
+    digest of the document-level state it reads (thesis topics, its
+    position and intro/body/conclusion role, first-use labels, the
+    noun-repetition threshold set by the word count, ...; see
+    marker.analyze_paragraph). A paragraph whose key is unchanged replays
+    its marks; document-level passes (structure detection, the summary
+    metadata) still run over the whole essay.
+  * paragraphs that are analyzed again but whose text is unchanged reuse
+    their LanguageTool results from the previous revision (and their spaCy
+    parses from the paragraph parse cache).
+
+Editing a paragraph re-analyzes it and any later paragraph whose inputs
+it changes: e.g. a new first-use label, or a new thesis, moves every
+later paragraph's key. Typing at the end of the essay usually
+re-analyzes only the last paragraph. Adding or removing a paragraph changes every
+paragraph's position inputs, so that check is a full one.
+
+Sessions live in the memory of one API worker. A check that lands on a
+different worker simply runs as a full check and starts a new session there.
+
+Config (env):
+    VYSTI_CHECK_SESSIONS_MAX          sessions kept per worker (default 2000).
+    VYSTI_CHECK_SESSION_TTL_SECONDS   idle seconds before a session is dropped (default 1800).
+"""
+
+import difflib
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from env_config import env_int
+
+
+# ── Config ───────────────────────────────────────────────────────────────
+SESSIONS_MAX = max(1, env_int("VYSTI_CHECK_SESSIONS_MAX", 2000))
+SESSION_TTL_SECONDS = max(1, env_int("VYSTI_CHECK_SESSION_TTL_SECONDS", 1800))
+
+
+@dataclass
+class CheckSession:
+    revision: str
+    paragraphs: list[str]
+    response: dict
+    grammar_matches: dict = field(default_factory=dict)  # paragraph text -> [GrammarMatch]
+    paragraph_marks: dict = field(default_factory=dict)  # analyze_paragraph key -> pickled result
+    touched: float = field(default_factory=time.time)
+
+
+def revision_hash(fields: dict) -> str:
+    """Stable hash of everything that affects a check's result."""
+    blob = json.dumps(fields, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def split_paragraphs(text: str) -> list[str]:
+    """Paragraphs as build_doc_from_text sees them (blank-line separated)."""
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    return re.split(r"\n{2,}", text)
+
+
+def changed_paragraphs(previous: list[str], current: list[str]) -> list[int]:
+    """Indices into ``current`` of paragraphs that are new or edited since ``previous``."""
+    changed: list[int] = []
+    matcher = difflib.SequenceMatcher(a=previous, b=current, autojunk=False)
+    for tag, _i1, _i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("replace", "insert"):
+            changed.extend(range(j1, j2))
+    return changed
+
+
+class CheckSessionStore:
+    """LRU of CheckSessions with an idle TTL, safe to share across threads."""
+
+    def __init__(self, max_sessions: int = SESSIONS_MAX, ttl_seconds: float = SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: OrderedDict[str, CheckSession] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, key: str) -> CheckSession | None:
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                return None
+            if now - session.touched > self.ttl_seconds:
+                del self._sessions[key]
+                return None
+            session.touched = now
+            self._sessions.move_to_end(key)
+            return session
+
+    def put(self, key: str, session: CheckSession) -> None:
+        with self._lock:
+            self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+
+_STORE: CheckSessionStore | None = None
+
+
+def get_check_sessions() -> CheckSessionStore:
+    """Process-wide CheckSessionStore, created on first use."""
+    global _STORE
+    if _STORE is None:
+        _STORE = CheckSessionStore()
+    return _STORE
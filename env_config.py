@@ -0,0 +1,21 @@
+"""
+Tolerant parsing of the integer VYSTI_* settings read at import time.
+
+A mistyped value must not stop a module from importing (a failed
+``import marker`` takes down every marking worker), so a bad value is
+logged and the default used instead.
+"""
+
+import os
+
+
+def env_int(name: str, default: int) -> int:
+    """int(os.getenv(name)), or ``default`` when the variable is unset, blank or not an integer."""
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        print(f"[config] ignoring invalid {name}={raw!r}; using {default}")
+        return default
@@ -0,0 +1,224 @@
+"""
+Paragraph-level LanguageTool result cache.
+
+Students resubmit nearly identical essays through /check_text, /mark_text
+and /revision/check, and every call sent every paragraph back to
+LanguageTool. Matches are now cached per paragraph, so only paragraphs the
+student actually edited are checked again:
+
+  * a bounded in-process LRU (entries, not bytes: a paragraph's matches
+    are a few KB at most);
+  * an optional SQLite tier shared by every worker process on the host, so
+    a resubmission that lands on another worker (or after a restart)
+    still skips LanguageTool. Rows older than a TTL, and the oldest rows
+    beyond a row cap, are deleted as new ones are written;
+  * hit / miss counters for /health-style introspection.
+
+The paragraph stays the unit of the LanguageTool request: checking
+sentences on their own would hide the surrounding context from LT's
+cross-sentence rules and change the marks. Keys are a SHA-256 of the
+LanguageTool language, the ruleset version and the exact paragraph text,
+and match offsets are stored relative to the paragraph.
+
+Config (env):
+    VYSTI_GRAMMAR_CACHE_ENTRIES      memory tier size in paragraphs (default 20000; 0 disables the cache).
+    VYSTI_GRAMMAR_CACHE_DB           path of the SQLite tier (default: off).
+    VYSTI_GRAMMAR_CACHE_DB_TTL_DAYS  drop SQLite rows older than this (default 30).
+    VYSTI_GRAMMAR_CACHE_DB_MAX_ROWS  keep at most this many SQLite rows, oldest dropped first
+                                     (default 500000).
+    VYSTI_LT_RULESET_VERSION         bump to invalidate cached matches after a LanguageTool
+                                     or rule-config upgrade (default "1").
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from env_config import env_int
+
+
+# ── Config ───────────────────────────────────────────────────────────────
+CACHE_ENTRIES = max(0, env_int("VYSTI_GRAMMAR_CACHE_ENTRIES", 20000))
+CACHE_DB = os.getenv("VYSTI_GRAMMAR_CACHE_DB", "").strip() or None
+CACHE_DB_TTL_SECONDS = max(0, env_int("VYSTI_GRAMMAR_CACHE_DB_TTL_DAYS", 30)) * 86400
+CACHE_DB_MAX_ROWS = max(0, env_int("VYSTI_GRAMMAR_CACHE_DB_MAX_ROWS", 500000))
+RULESET_VERSION = os.getenv("VYSTI_LT_RULESET_VERSION", "1").strip() or "1"
+
+# Evict from the SQLite tier at most this often (per process)
+_EVICT_INTERVAL_SECONDS = 600
+
+
+class GrammarCache:
+    """LRU of per-paragraph LanguageTool matches with an optional SQLite tier.
+
+    Matches are stored as plain lists ``[rule_id, offset, error_length,
+    replacements]`` with offsets relative to the paragraph.
+    """
+
+    def __init__(
+        self,
+        language: str = "en-US",
+        ruleset_version: str = RULESET_VERSION,
+        max_entries: int = CACHE_ENTRIES,
+        db_path: str | None = CACHE_DB,
+        db_ttl_seconds: int = CACHE_DB_TTL_SECONDS,
+        db_max_rows: int = CACHE_DB_MAX_ROWS,
+    ):
+        self.language = language
+        self.ruleset_version = ruleset_version
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.db_ttl_seconds = db_ttl_seconds
+        self.db_max_rows = db_max_rows
+        self._next_evict = 0.0
+        self._entries: OrderedDict[str, list] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        if db_path and self.enabled:
+            self._open_db()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, text: str) -> str:
+        h = hashlib.sha256()
+        for part in (self.language, self.ruleset_version, text):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    # -- lookups -------------------------------------------------------
+    def get_many(self, texts) -> dict[str, list]:
+        """Cached matches for each of ``texts`` that has them, by text."""
+        found: dict[str, list] = {}
+        if not self.enabled:
+            return found
+        keys = {text: self.key(text) for text in texts}
+        missing: dict[str, str] = {}
+        with self._lock:
+            for text, key in keys.items():
+                matches = self._entries.get(key)
+                if matches is None:
+                    missing[key] = text
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[text] = matches
+
+        from_db = self._read_db(list(missing))
+        with self._lock:
+            self.db_hits += len(from_db)
+            self.misses += len(missing) - len(from_db)
+        for key, matches in from_db.items():
+            self._remember(key, matches)
+            found[missing[key]] = matches
+        return found
+
+    def put_many(self, results: dict[str, list]) -> None:
+        """Store ``{text: [[rule_id, offset, error_length, replacements], ...]}``."""
+        if not self.enabled or not results:
+            return
+        rows = {self.key(text): matches for text, matches in results.items()}
+        for key, matches in rows.items():
+            self._remember(key, matches)
+        self._write_db(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.db_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.db_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    # -- memory tier ---------------------------------------------------
+    def _remember(self, key: str, matches: list) -> None:
+        with self._lock:
+            self._entries[key] = matches
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # -- SQLite tier ---------------------------------------------------
+    def _open_db(self) -> None:
+        try:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            # WAL lets every worker read while one writes
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS lt_matches ("
+                " key TEXT PRIMARY KEY, matches TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS lt_matches_created ON lt_matches (created)")
+            self._db = db
+        except sqlite3.Error as e:
+            print(f"[grammar_cache] SQLite tier disabled ({self.db_path}): {e!r}")
+            self._db = None
+
+    def _read_db(self, keys: list[str]) -> dict[str, list]:
+        if self._db is None or not keys:
+            return {}
+        found: dict[str, list] = {}
+        try:
+            with self._lock:
+                # SQLite's default limit on bound parameters is 999
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, matches FROM lt_matches WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                    for key, matches in rows:
+                        found[key] = json.loads(matches)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"[grammar_cache] SQLite read failed: {e!r}")
+        return found
+
+    def _write_db(self, rows: dict[str, list]) -> None:
+        if self._db is None:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO lt_matches (key, matches, created) VALUES (?, ?, ?)",
+                    [(key, json.dumps(matches, separators=(",", ":")), now) for key, matches in rows.items()],
+                )
+                if now >= self._next_evict:
+                    self._next_evict = now + _EVICT_INTERVAL_SECONDS
+                    self._evict_db(now)
+        except sqlite3.Error as e:
+            print(f"[grammar_cache] SQLite write failed: {e!r}")
+
+    def _evict_db(self, now: float) -> None:
+        """Drop rows past the TTL, then the oldest rows beyond the row cap. Caller holds _lock."""
+        if self.db_ttl_seconds:
+            self._db.execute("DELETE FROM lt_matches WHERE created < ?", (now - self.db_ttl_seconds,))
+        if self.db_max_rows:
+            (rows,) = self._db.execute("SELECT COUNT(*) FROM lt_matches").fetchone()
+            if rows > self.db_max_rows:
+                self._db.execute(
+                    "DELETE FROM lt_matches WHERE key IN "
+                    "(SELECT key FROM lt_matches ORDER BY created LIMIT ?)",
+                    (rows - self.db_max_rows,),
+                )
@@ -0,0 +1,339 @@
+"""
+Prebuilt lexis lookups for the dictionary endpoints.
+
+GET /api/lexis (the A–Z list) is serialized once per worker into a
+PrecompressedPayload: identity, gzip and (when the optional ``brotli``
+package is installed) brotli bodies behind a strong ETag, so repeat
+visits get a 304 and first visits cost no JSON encoding.
+
+GET /api/lexis/{term_norm} uses LexisLookup, described below.
+
+The Related Terms chips fire many lookups per page, and each one used to
+scan the whole lexis DataFrame several times (exact, plural variants, a
+substring .apply() and difflib over every term_norm). The same lookup
+cascade now runs against structures built once when the lexis loads:
+
+  * exact / article-stripped / plural-variant steps: a hash map from
+    lowercased term_norm to the first row holding it;
+  * substring step: "term inside query" enumerates the query's substrings
+    against that map; "query inside term" verifies candidates from an
+    n-gram posting list (row positions in ascending order, so the first
+    verified row is the answer);
+  * typo step: difflib over only the term_norms whose length can reach
+    the 0.82 cutoff (the same bound difflib applies first), not all of
+    them;
+  * resolved queries are memoized in an LRU.
+
+Every step returns the same row the DataFrame scans did.
+"""
+
+import difflib
+import gzip
+import hashlib
+import json
+import math
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: serve gzip / identity only
+    brotli = None
+
+_FUZZY_CUTOFF = 0.82
+_FUZZY_MIN_LEN = 5
+_GRAM = 3  # n-gram size for the substring index (1..3-grams are indexed)
+_CACHE_SIZE = 4096
+
+
+def normalize_lexis_query(s: str, strip_article: bool = False) -> str:
+    """
+    Transliterate accents (é→e, è→e, ä→a, …) so accented queries match the
+    transliterated term_norm convention; strip stray brackets/quotes; collapse
+    non-alphanumerics (incl. hyphens) to underscore; lower-case. Only strip a
+    leading article ("the/a/an ") when asked — terms like "the Real"/"the
+    Symbolic" legitimately keep it in their term_norm.
+    """
+    s = unicodedata.normalize("NFKD", s or "").encode("ascii", "ignore").decode("ascii")
+    s = re.sub(r"['\"\[\]]+", "", s).strip().lower()
+    if strip_article:
+        s = re.sub(r"^(the|a|an)\s+", "", s)
+    return re.sub(r"[^a-z0-9]+", "_", s).strip("_")
+
+
+class LexisLookup:
+    """Lookup structures over one lexis DataFrame; find() returns a row position."""
+
+    def __init__(self, lexis_df):
+        self._df = lexis_df
+        norms = [t.lower() if isinstance(t, str) else None for t in lexis_df["term_norm"].tolist()]
+
+        # Exact map: lowercased term_norm -> first row position
+        self._first: dict[str, int] = {}
+        for pos, norm in enumerate(norms):
+            if norm is not None and norm not in self._first:
+                self._first[norm] = pos
+
+        # Substring index over non-empty norms: n-gram -> ascending row positions
+        self._norms = norms
+        self._grams: dict[str, list[int]] = {}
+        for pos, norm in enumerate(norms):
+            if not norm:
+                continue
+            seen = set()
+            for n in range(1, _GRAM + 1):
+                for i in range(len(norm) - n + 1):
+                    gram = norm[i:i + n]
+                    if gram not in seen:
+                        seen.add(gram)
+                        self._grams.setdefault(gram, []).append(pos)
+        self._first_nonempty = next((pos for pos, norm in enumerate(norms) if norm), None)
+
+        # Fuzzy candidates bucketed by length
+        self._by_length: dict[int, list[str]] = {}
+        for norm in self._first:
+            self._by_length.setdefault(len(norm), []).append(norm)
+
+        self._cache: OrderedDict[str, int | None] = OrderedDict()
+        self._records: dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    # -- public --------------------------------------------------------
+    def find(self, term_norm: str) -> int | None:
+        """Row position for a raw /api/lexis/{term_norm} path value, or None."""
+        with self._lock:
+            if term_norm in self._cache:
+                self._cache.move_to_end(term_norm)
+                return self._cache[term_norm]
+        pos = self._find(term_norm)
+        with self._lock:
+            self._cache[term_norm] = pos
+            while len(self._cache) > _CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return pos
+
+    def record(self, pos: int) -> dict:
+        """Row ``pos`` as a JSON-ready dict (NaN and None dropped, numpy unwrapped)."""
+        record = self._records.get(pos)
+        if record is None:
+            row = self._df.iloc[pos]
+            record = {}
+            for col in self._df.columns:
+                val = row.get(col)
+                if val is None:
+                    continue
+                if hasattr(val, "item"):
+                    val = val.item()
+                if isinstance(val, float) and math.isnan(val):
+                    continue
+                record[col] = val
+            self._records[pos] = record
+        return record
+
+    # -- cascade -------------------------------------------------------
+    def _find(self, term_norm: str) -> int | None:
+        query_full = normalize_lexis_query(term_norm)                  # keeps "the Real" -> the_real
+        query = normalize_lexis_query(term_norm, strip_article=True)   # article-stripped fallback
+        if not query_full and not query:
+            return None
+
+        # Exact match on the FULL form first (so "the Real" doesn't collapse to "real"),
+        # then fall back to the article-stripped form.
+        pos = self._first.get(query_full)
+        if pos is None and query != query_full:
+            pos = self._first.get(query)
+        if pos is not None:
+            return pos
+
+        # Plural/singular variants
+        for variant in (query, query.rstrip("s"), query + "s",
+                        query.rstrip("es"), query + "es"):
+            if variant and variant in self._first:
+                return self._first[variant]
+
+        # Substring containment (term_norm contains query, or vice versa)
+        pos = self._containment(query)
+        if pos is not None:
+            return pos
+
+        # Fuzzy edit-distance fallback for short typos (e.g., "feminity" → "femininity")
+        if len(query) >= _FUZZY_MIN_LEN:
+            close = difflib.get_close_matches(query, self._fuzzy_candidates(query), n=1, cutoff=_FUZZY_CUTOFF)
+            if close:
+                return self._first[close[0]]
+        return None
+
+    def _containment(self, query: str) -> int | None:
+        """First row whose non-empty norm contains ``query`` or is contained in it."""
+        best = None
+        # Norm inside query: look up every substring of the query
+        for i in range(len(query)):
+            for j in range(i + 1, len(query) + 1):
+                pos = self._first.get(query[i:j])
+                if pos is not None and (best is None or pos < best):
+                    best = pos
+        # Query inside norm
+        if not query:
+            inner = self._first_nonempty
+        elif len(query) <= _GRAM:
+            postings = self._grams.get(query)
+            inner = postings[0] if postings else None
+        else:
+            inner = None
+            postings = min(
+                (self._grams.get(query[i:i + _GRAM], []) for i in range(len(query) - _GRAM + 1)),
+                key=len,
+            )
+            for pos in postings:
+                if best is not None and pos >= best:
+                    break
+                if query in self._norms[pos]:
+                    inner = pos
+                    break
+        if inner is not None and (best is None or inner < best):
+            best = inner
+        return best
+
+    def _fuzzy_candidates(self, query: str) -> list[str]:
+        # difflib rejects any candidate whose real_quick_ratio (2*min/(la+lb))
+        # is below the cutoff before scoring it, so skip those lengths here.
+        la = len(query)
+        return [
+            norm
+            for lb, bucket in self._by_length.items()
+            if 2.0 * min(la, lb) / (la + lb) >= _FUZZY_CUTOFF
+            for norm in bucket
+        ]
+
+
+# ── A–Z list payload ────────────────────────────────────────────────────
+
+# Compact fields for the A-Z list (keeps payload small)
+_AZ_COLUMNS = [
+    "term", "term_norm", "focus_type", "definition",
+    "part_of_speech", "tags", "etymology", "application",
+]
+_AZ_CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
+
+
+def build_lexis_az_list(lexis_df) -> dict:
+    """{"terms": [...], "count": n}: active terms, A–Z, compact fields only."""
+    # Only active terms
+    active_df = lexis_df[lexis_df["active"] == True]  # noqa: E712
+    # Sort alphabetically (case-insensitive)
+    active_df = active_df.copy()
+    active_df["_sort"] = active_df["term"].str.lower()
+    active_df = active_df.sort_values("_sort")
+
+    result = []
+    for _, row in active_df.iterrows():
+        entry = {}
+        for col in _AZ_COLUMNS:
+            val = row.get(col)
+            if val is None:
+                continue
+            if hasattr(val, "item"):
+                val = val.item()
+            if isinstance(val, float) and math.isnan(val):
+                continue
+            entry[col] = val
+        if entry.get("term"):
+            result.append(entry)
+    return {"terms": result, "count": len(result)}
+
+
+class PrecompressedPayload:
+    """A JSON body serialized once, with compressed variants and strong ETags."""
+
+    def __init__(self, content, cache_control: str = _AZ_CACHE_CONTROL):
+        # Same bytes JSONResponse would render
+        body = json.dumps(
+            content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+        self.cache_control = cache_control
+        self.variants: dict[str, bytes] = {"identity": body, "gzip": gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=11)
+        # Strong validators differ per content-coding (RFC 9110 §8.8.3)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etags = {
+            coding: f'"{digest}"' if coding == "identity" else f'"{digest}-{coding}"'
+            for coding in self.variants
+        }
+
+    def pick_encoding(self, accept_encoding: str) -> str:
+        """Best available coding the client accepts: br, then gzip, then identity."""
+        accepted = {}
+        for part in (accept_encoding or "").split(","):
+            coding, _, params = part.strip().partition(";")
+            q = 1.0
+            for param in params.split(";"):
+                name, _, value = param.strip().partition("=")
+                if name == "q":
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            if coding:
+                accepted[coding.lower()] = q
+        for coding in ("br", "gzip"):
+            q = accepted.get(coding, accepted.get("*", 0.0))
+            if coding in self.variants and q > 0:
+                return coding
+        return "identity"
+
+    def response(self, headers) -> Response:
+        """200 with the best variant, or 304 when If-None-Match names any current ETag."""
+        coding = self.pick_encoding(headers.get("accept-encoding", ""))
+        out = {
+            "ETag": self.etags[coding],
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = headers.get("if-none-match")
+        if if_none_match:
+            tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+            if "*" in tags or tags & set(self.etags.values()):
+                return Response(status_code=304, headers=out)
+        if coding != "identity":
+            out["Content-Encoding"] = coding
+        return Response(self.variants[coding], media_type="application/json", headers=out)
+
+
+_LOOKUP: LexisLookup | None = None
+_AZ_PAYLOAD: PrecompressedPayload | None = None
+_LOOKUP_LOCK = threading.Lock()
+
+
+def get_lexis_lookup() -> LexisLookup | None:
+    """Process-wide LexisLookup over marker's lexis database (None if it isn't loaded)."""
+    global _LOOKUP
+    if _LOOKUP is None:
+        with _LOOKUP_LOCK:
+            if _LOOKUP is None:
+                from marker import load_lexis_database
+
+                lexis_df = load_lexis_database()
+                if lexis_df.empty:
+                    return None
+                _LOOKUP = LexisLookup(lexis_df)
+    return _LOOKUP
+
+
+def get_lexis_az_payload() -> PrecompressedPayload | None:
+    """Process-wide A–Z list payload for GET /api/lexis (None if the lexis isn't loaded)."""
+    global _AZ_PAYLOAD
+    if _AZ_PAYLOAD is None:
+        with _LOOKUP_LOCK:
+            if _AZ_PAYLOAD is None:
+                from marker import load_lexis_database
+
+                lexis_df = load_lexis_database()
+                if lexis_df.empty:
+                    return None
+                _AZ_PAYLOAD = PrecompressedPayload(build_lexis_az_list(lexis_df))
+    return _AZ_PAYLOAD
@@ -0,0 +1,393 @@
+"""
+Shared local LanguageTool servers and a pooled async client.
+
+get_language_tool() used to start a LanguageTool JVM through
+language_tool_python in every process that called it — one
+multi-hundred-MB Java server per uvicorn worker and marking-pool worker —
+and every check was a blocking ``requests`` call on a fresh connection.
+Now:
+
+  * LTServiceManager runs ``VYSTI_LT_SERVERS`` LanguageTool HTTP servers on
+    consecutive local ports, once per host. Starting is serialized with a
+    host-wide file lock, and servers that already answer on their port
+    (started by another uvicorn worker) are reused, not duplicated.
+  * LTClient talks to those servers over one keep-alive httpx.AsyncClient,
+    sending each check to the server with the fewest checks in flight and
+    failing over to the next one on connection errors.
+  * PooledLanguageTool wraps LTClient for the synchronous marking engine:
+    checks run on a background event loop, ``check()`` has the
+    language_tool_python signature, and ``check_many()`` sends a whole
+    batch to all servers concurrently.
+
+The API process starts the servers at boot and exports their URLs in
+VYSTI_LT_URLS, so marking-pool workers (spawned afterwards) connect to them
+instead of starting their own JVM. If no server jar has been downloaded
+yet (a fresh container), the manager runs language_tool_python's download
+step first, and a watcher thread restarts any server that stops answering
+(e.g. killed for memory) instead of leaving checks to fail into the
+circuit breaker. The servers are shared by every worker
+on the host, so no worker stops them on shutdown: they run in their own
+session and live until the host (or whatever supervises the API) stops
+them. Deployments that want LanguageTool managed separately run it
+themselves and set VYSTI_LT_URLS.
+
+Config (env):
+    VYSTI_LT_SERVERS              local LanguageTool servers per host (default 1; 0 = none).
+    VYSTI_LT_HEAP_MB              JVM heap per server in MB (default 512).
+    VYSTI_LT_BASE_PORT            first server's port; the rest follow it (default 8081).
+    VYSTI_LT_URLS                 comma-separated server URLs to use instead of starting servers.
+    VYSTI_LT_JAR                  languagetool-server.jar (default: newest language_tool_python download,
+                                  downloading one if there is none).
+    VYSTI_LT_WATCH_SECONDS        how often to check the servers and restart dead ones (default 30; 0 = never).
+    VYSTI_LT_LANGUAGE             language code sent with each check (default en-US).
+    VYSTI_LT_TIMEOUT_SECONDS      hard per-request timeout, failover included (default 15).
+    VYSTI_LT_MAX_CONNECTIONS      keep-alive connections per server (default 8).
+"""
+
+import asyncio
+import glob
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from bisect import bisect_right
+from typing import NamedTuple
+
+import httpx
+
+from env_config import env_int
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: no host-wide lock
+    fcntl = None
+
+
+# ── Config ───────────────────────────────────────────────────────────────
+SERVERS = max(0, env_int("VYSTI_LT_SERVERS", 1))
+HEAP_MB = max(64, env_int("VYSTI_LT_HEAP_MB", 512))
+BASE_PORT = env_int("VYSTI_LT_BASE_PORT", 8081)
+LANGUAGE = os.getenv("VYSTI_LT_LANGUAGE", "en-US").strip() or "en-US"
+TIMEOUT_SECONDS = max(1, env_int("VYSTI_LT_TIMEOUT_SECONDS", 15))
+MAX_CONNECTIONS = max(1, env_int("VYSTI_LT_MAX_CONNECTIONS", 8))
+WATCH_SECONDS = max(0, env_int("VYSTI_LT_WATCH_SECONDS", 30))
+
+_LOCK_PATH = os.path.join(tempfile.gettempdir(), "vysti-languagetool.lock")
+
+
+def configured_urls() -> list[str]:
+    """Server URLs from VYSTI_LT_URLS (set by the operator or by LTServiceManager)."""
+    raw = os.getenv("VYSTI_LT_URLS", "")
+    return [u.strip().rstrip("/") for u in raw.split(",") if u.strip()]
+
+
+def find_server_jar() -> str | None:
+    """VYSTI_LT_JAR, else the newest LanguageTool that language_tool_python downloaded."""
+    jar = os.getenv("VYSTI_LT_JAR", "").strip()
+    if jar:
+        return jar if os.path.exists(jar) else None
+    roots = [os.getenv("LTP_PATH", "").strip(), os.path.expanduser("~/.cache/language_tool_python")]
+    candidates = []
+    for root in filter(None, roots):
+        candidates += glob.glob(os.path.join(root, "LanguageTool-*", "languagetool-server.jar"))
+    return max(candidates, key=os.path.getmtime) if candidates else None
+
+
+def ensure_server_jar() -> str | None:
+    """
+    find_server_jar(), downloading LanguageTool through language_tool_python
+    first when nothing has been downloaded yet. An explicit VYSTI_LT_JAR is
+    never replaced by a download.
+    """
+    jar = find_server_jar()
+    if jar or os.getenv("VYSTI_LT_JAR", "").strip():
+        return jar
+    try:
+        from language_tool_python.download_lt import download_lt
+        print("[lt_service] downloading LanguageTool...")
+        download_lt()
+    except Exception as e:
+        print(f"[lt_service] LanguageTool download failed: {e!r}")
+        return None
+    return find_server_jar()
+
+
+# ── Servers ─────────────────────────────────────────────────────────────
+
+class LTServiceManager:
+    """Starts (or finds) the host's local LanguageTool servers."""
+
+    def __init__(
+        self,
+        servers: int = SERVERS,
+        heap_mb: int = HEAP_MB,
+        base_port: int = BASE_PORT,
+        jar_path: str | None = None,
+    ):
+        self.servers = servers
+        self.heap_mb = heap_mb
+        self.base_port = base_port
+        self.jar_path = jar_path
+        self._processes: list[subprocess.Popen] = []
+        self._watcher: threading.Thread | None = None
+        self._stop_watching = threading.Event()
+
+    @property
+    def urls(self) -> list[str]:
+        return [f"http://127.0.0.1:{self.base_port + i}" for i in range(self.servers)]
+
+    def start(self, wait_seconds: float = 90) -> list[str]:
+        """Make sure every server is up; returns the URLs that answer (may be empty)."""
+        if self.servers <= 0:
+            return []
+        java = shutil.which("java")
+        with _host_lock():
+            down = [url for url in self.urls if not _alive(url)]
+            # Downloading can take a minute; only do it when a server is needed
+            jar = (self.jar_path or ensure_server_jar()) if down else None
+            if down and not (java and jar):
+                print(f"[lt_service] can't start LanguageTool (java={java!r}, jar={jar!r})")
+            elif down:
+                for url in down:
+                    port = url.rsplit(":", 1)[1]
+                    cmd = [
+                        java, f"-Xmx{self.heap_mb}m", "-cp", jar,
+                        "org.languagetool.server.HTTPServer", "--port", port,
+                    ]
+                    # Own session: a server started by one worker keeps
+                    # serving the others if that worker is restarted.
+                    self._processes.append(subprocess.Popen(
+                        cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+                    ))
+                deadline = time.monotonic() + wait_seconds
+                while time.monotonic() < deadline and not all(_alive(url) for url in down):
+                    time.sleep(0.5)
+        alive = [url for url in self.urls if _alive(url)]
+        print(f"[lt_service] {len(alive)}/{self.servers} LanguageTool servers up ({self.heap_mb} MB heap each)")
+        return alive
+
+    def watch(self, interval: float = WATCH_SECONDS) -> None:
+        """
+        Check the servers every ``interval`` seconds in a daemon thread and
+        restart any that stopped answering. Every worker on the host may
+        watch: restarts go through start(), which holds the host lock until
+        the restarted servers answer, so a dead server is started once.
+        """
+        if interval <= 0 or self.servers <= 0 or self._watcher is not None:
+            return
+
+        def _loop():
+            while not self._stop_watching.wait(interval):
+                try:
+                    if not all(_alive(url) for url in self.urls):
+                        print("[lt_service] LanguageTool server down; restarting")
+                        self.start()
+                except Exception as e:
+                    print(f"[lt_service] watcher error: {e!r}")
+
+        self._watcher = threading.Thread(target=_loop, name="languagetool-watch", daemon=True)
+        self._watcher.start()
+
+    def unwatch(self) -> None:
+        """Stop the watcher thread (the servers keep running)."""
+        self._stop_watching.set()
+        self._watcher = None
+
+    def stop(self) -> None:
+        """Terminate the servers this manager started (for scripts that own their lifetime)."""
+        for proc in self._processes:
+            proc.terminate()
+        for proc in self._processes:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        self._processes.clear()
+
+
+class _host_lock:
+    def __enter__(self):
+        self._f = open(_LOCK_PATH, "a")
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+        self._f.close()
+
+
+def _alive(url: str) -> bool:
+    try:
+        return httpx.get(f"{url}/v2/languages", timeout=1.0).status_code == 200
+    except httpx.HTTPError:
+        return False
+
+
+# ── Client ──────────────────────────────────────────────────────────────
+
+class LTMatch(NamedTuple):
+    """The language_tool_python Match attributes the engine reads."""
+    rule_id: str
+    offset: int
+    error_length: int
+    replacements: list
+    message: str
+
+
+def _matches_from_json(text: str, payload: dict) -> list[LTMatch]:
+    # LanguageTool counts offsets in UTF-16 code units; map them to str
+    # indices when the text has characters outside the BMP (emoji).
+    astral = [i + k for k, i in enumerate(i for i, ch in enumerate(text) if ord(ch) > 0xFFFF)]
+
+    def _index(u16: int) -> int:
+        return u16 - bisect_right(astral, u16 - 2) if astral else u16
+
+    matches = []
+    for m in payload.get("matches", []):
+        start = _index(m["offset"])
+        end = _index(m["offset"] + m["length"])
+        matches.append(LTMatch(
+            m.get("rule", {}).get("id", ""),
+            start,
+            end - start,
+            [r["value"] for r in m.get("replacements", []) if "value" in r],
+            m.get("message", ""),
+        ))
+    return matches
+
+
+class LTClient:
+    """Async LanguageTool client over a keep-alive pool, balanced across servers."""
+
+    def __init__(
+        self,
+        urls: list[str],
+        language: str = LANGUAGE,
+        timeout: float = TIMEOUT_SECONDS,
+        max_connections: int = MAX_CONNECTIONS,
+    ):
+        if not urls:
+            raise ValueError("LTClient needs at least one server URL")
+        self.urls = list(urls)
+        self.language = language
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._inflight = [0] * len(self.urls)
+        self._next = 0
+        self._client: httpx.AsyncClient | None = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            n = self.max_connections * len(self.urls)
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=n, max_keepalive_connections=n),
+            )
+        return self._client
+
+    def _order(self) -> list[int]:
+        """Server indices, least busy first (round-robin among ties)."""
+        start = self._next
+        self._next = (self._next + 1) % len(self.urls)
+        rotated = [(start + i) % len(self.urls) for i in range(len(self.urls))]
+        return sorted(rotated, key=lambda i: self._inflight[i])
+
+    async def check(self, text: str) -> list[LTMatch]:
+        # httpx's timeout is per read/write, so a server trickling bytes (or
+        # failover across several slow ones) could outlast it; cap the whole check.
+        return await asyncio.wait_for(self._check(text), self.timeout)
+
+    async def _check(self, text: str) -> list[LTMatch]:
+        last_error: Exception | None = None
+        for i in self._order():
+            self._inflight[i] += 1
+            try:
+                response = await self._http().post(
+                    f"{self.urls[i]}/v2/check", data={"language": self.language, "text": text},
+                )
+                response.raise_for_status()
+                return _matches_from_json(text, response.json())
+            except httpx.TransportError as e:
+                last_error = e  # server down or restarting: try the next one
+            finally:
+                self._inflight[i] -= 1
+        raise last_error
+
+    async def check_many(self, texts: list[str]) -> list[list[LTMatch]]:
+        return list(await asyncio.gather(*(self.check(text) for text in texts)))
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class PooledLanguageTool:
+    """Synchronous, language_tool_python-compatible front-end over LTClient."""
+
+    def __init__(self, client: LTClient):
+        self.client = client
+        self._loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=self._loop.run_forever, name="languagetool-client", daemon=True)
+        thread.start()
+
+    def _run(self, coro):
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            # A little over the client's own timeout, so its error wins
+            return future.result(self.client.timeout + 5)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def check(self, text: str) -> list[LTMatch]:
+        return self._run(self.client.check(text))
+
+    def check_many(self, texts: list[str]) -> list[list[LTMatch]]:
+        """Check several texts at once, spread across the servers."""
+        return self._run(self.client.check_many(texts))
+
+    def close(self) -> None:
+        self._run(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_MANAGER: LTServiceManager | None = None
+
+
+def start_language_tool_service() -> list[str]:
+    """
+    Start (or find) this host's LanguageTool servers and export their URLs
+    in VYSTI_LT_URLS for processes spawned afterwards. Does nothing when
+    VYSTI_LT_URLS is already set. While this process runs, dead servers
+    are restarted (LTServiceManager.watch). The servers outlive the calling
+    process; see the module docstring.
+    """
+    global _MANAGER
+    urls = configured_urls()
+    if urls:
+        return urls
+    _MANAGER = LTServiceManager()
+    urls = _MANAGER.start()
+    if urls:
+        os.environ["VYSTI_LT_URLS"] = ",".join(urls)
+        _MANAGER.watch()
+    return urls
+
+
+def stop_language_tool_watch() -> None:
+    """Stop restarting this host's servers from this process; they keep running."""
+    if _MANAGER is not None:
+        _MANAGER.unwatch()
+
+
+def get_pooled_language_tool() -> PooledLanguageTool | None:
+    """A PooledLanguageTool over VYSTI_LT_URLS, or None when no servers are configured."""
+    urls = configured_urls()
+    if not urls:
+        return None
+    return PooledLanguageTool(LTClient(urls))
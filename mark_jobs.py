@@ -0,0 +1,430 @@
+"""
+Background marking jobs for POST /mark/jobs.
+
+/mark holds the HTTP connection open for the whole engine run and the
+Supabase uploads/inserts that follow it, so large essays and teacher
+batches hit proxy timeouts. The job API validates the upload up front,
+queues the rest of the work here and returns a job id immediately;
+clients poll GET /mark/jobs/{id} and fetch GET /mark/jobs/{id}/result.
+
+Each job runs as a background task in the API process; how many marks
+actually run at once, and in what order across users, is decided by the
+marking scheduler (mark_scheduler.py), so a burst at the start of a class
+period waits its turn instead of piling onto the CPU. Status and results
+live in a JobStore — SQLite by default — so every API worker on the box
+can answer a poll; store calls run in a thread so SQLite (and the result
+BLOB writes) never block the event loop. Finished results expire after a
+TTL.
+
+Each API process renews a lease (``heartbeat_at``) on its unfinished jobs
+every VYSTI_MARK_JOB_HEARTBEAT_SECONDS. A job whose lease has lapsed — its
+worker crashed or was killed — is failed by whichever process notices
+first, so clients polling it get an error instead of "queued" forever.
+
+Config (env):
+    VYSTI_MARK_JOB_DB           SQLite file (default: <tmpdir>/vysti_mark_jobs.sqlite3).
+    VYSTI_MARK_JOB_QUEUE_MAX    unfinished jobs per API process before submissions
+                                are refused (default 500).
+    VYSTI_MARK_JOB_TTL_SECONDS  how long finished jobs are kept (default 3600).
+    VYSTI_MARK_JOB_HEARTBEAT_SECONDS
+                                how often unfinished jobs' leases are renewed (default 30).
+    VYSTI_MARK_JOB_LEASE_SECONDS
+                                how long an unrenewed job lives before it is failed
+                                (default 180).
+"""
+
+import asyncio
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable
+
+from env_config import env_int
+
+
+# ── Config ───────────────────────────────────────────────────────────────
+JOB_DB_PATH = os.getenv("VYSTI_MARK_JOB_DB") or os.path.join(
+    tempfile.gettempdir(), "vysti_mark_jobs.sqlite3"
+)
+JOB_QUEUE_MAX = max(1, env_int("VYSTI_MARK_JOB_QUEUE_MAX", 500))
+JOB_TTL_SECONDS = max(60, env_int("VYSTI_MARK_JOB_TTL_SECONDS", 3600))
+JOB_HEARTBEAT_SECONDS = max(1, env_int("VYSTI_MARK_JOB_HEARTBEAT_SECONDS", 30))
+JOB_LEASE_SECONDS = max(3 * JOB_HEARTBEAT_SECONDS, env_int("VYSTI_MARK_JOB_LEASE_SECONDS", 180))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when VYSTI_MARK_JOB_QUEUE_MAX jobs are already unfinished."""
+
+
+# ── Stores ──────────────────────────────────────────────────────────────
+
+_INTERRUPTED_ERROR = "The server restarted before this essay was marked. Please submit it again."
+
+
+class JobStore(ABC):
+    """Persistence for job status and results.
+
+    Jobs are plain dicts with the keys in SQLiteJobStore._COLUMNS; the
+    result columns (``document``, ``filename``, ``metadata``) are only set
+    once a job is done. Subclass this to back jobs with something other
+    than SQLite (Redis, Postgres, ...). Methods are blocking; MarkJobQueue
+    calls them from a worker thread.
+    """
+
+    @abstractmethod
+    def create(self, job: dict) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, **fields) -> None:
+        ...
+
+    @abstractmethod
+    def purge_expired(self, now: float) -> int:
+        ...
+
+    @abstractmethod
+    def fail_orphans(self, is_orphan: Callable[[int, str], bool], now: float) -> int:
+        """Fail queued/running jobs whose owning process is gone."""
+
+    @abstractmethod
+    def renew_leases(self, job_ids: list[str], now: float) -> None:
+        """Set ``heartbeat_at`` to ``now`` on the given unfinished jobs."""
+
+    @abstractmethod
+    def fail_stale(self, lease_expired_before: float, now: float) -> int:
+        """Fail queued/running jobs whose lease was last renewed before the cutoff."""
+
+
+class SQLiteJobStore(JobStore):
+    """JobStore on a single SQLite file, shared by every worker on the host."""
+
+    _COLUMNS = (
+        "id", "user_id", "status", "file_name", "return_metadata",
+        "owner_pid", "owner_token", "heartbeat_at",
+        "created_at", "started_at", "finished_at", "expires_at", "error",
+        "filename", "metadata", "document",
+    )
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS mark_jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT,
+                status TEXT NOT NULL,
+                file_name TEXT,
+                return_metadata INTEGER NOT NULL DEFAULT 0,
+                owner_pid INTEGER,
+                owner_token TEXT,
+                heartbeat_at REAL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                expires_at REAL,
+                error TEXT,
+                filename TEXT,
+                metadata TEXT,
+                document BLOB
+            )
+            """
+        )
+        # Databases created before job leases existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(mark_jobs)")}
+        if "heartbeat_at" not in columns:
+            self._conn.execute("ALTER TABLE mark_jobs ADD COLUMN heartbeat_at REAL")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS mark_jobs_expires ON mark_jobs (expires_at)"
+        )
+        self._conn.commit()
+
+    def create(self, job: dict) -> None:
+        row = {c: job.get(c) for c in self._COLUMNS}
+        row["metadata"] = json.dumps(row["metadata"]) if row["metadata"] is not None else None
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO mark_jobs ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                tuple(row.values()),
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            cur = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM mark_jobs WHERE id = ?",
+                (job_id,),
+            )
+            row = cur.fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self._COLUMNS, row))
+        job["return_metadata"] = bool(job["return_metadata"])
+        if job["metadata"] is not None:
+            job["metadata"] = json.loads(job["metadata"])
+        return job
+
+    def update(self, job_id: str, **fields) -> None:
+        unknown = set(fields) - set(self._COLUMNS)
+        if unknown:
+            raise ValueError(f"unknown job fields: {sorted(unknown)}")
+        if "metadata" in fields and fields["metadata"] is not None:
+            fields["metadata"] = json.dumps(fields["metadata"])
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE mark_jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+            self._conn.commit()
+
+    def purge_expired(self, now: float) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM mark_jobs WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (now,),
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def fail_orphans(self, is_orphan: Callable[[int, str], bool], now: float) -> int:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, owner_pid, owner_token FROM mark_jobs WHERE status IN (?, ?)",
+                (JOB_QUEUED, JOB_RUNNING),
+            ).fetchall()
+            orphans = [job_id for job_id, pid, token in rows if is_orphan(pid, token)]
+            for job_id in orphans:
+                self._conn.execute(
+                    "UPDATE mark_jobs SET status = ?, error = ?, finished_at = ?, expires_at = ? "
+                    "WHERE id = ?",
+                    (JOB_FAILED, _INTERRUPTED_ERROR, now, now + JOB_TTL_SECONDS, job_id),
+                )
+            self._conn.commit()
+        return len(orphans)
+
+    def renew_leases(self, job_ids: list[str], now: float) -> None:
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE mark_jobs SET heartbeat_at = ? WHERE id = ? AND status IN (?, ?)",
+                [(now, job_id, JOB_QUEUED, JOB_RUNNING) for job_id in job_ids],
+            )
+            self._conn.commit()
+
+    def fail_stale(self, lease_expired_before: float, now: float) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE mark_jobs SET status = ?, error = ?, finished_at = ?, expires_at = ? "
+                "WHERE status IN (?, ?) AND COALESCE(heartbeat_at, created_at) < ?",
+                (JOB_FAILED, _INTERRUPTED_ERROR, now, now + JOB_TTL_SECONDS,
+                 JOB_QUEUED, JOB_RUNNING, lease_expired_before),
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+
+# Identifies this process's jobs; pids alone get reused across container restarts.
+_PROCESS_TOKEN = uuid.uuid4().hex
+
+
+def _is_orphan(pid: int | None, token: str | None) -> bool:
+    """True if the process that queued a job is gone (its queue died with it)."""
+    if token == _PROCESS_TOKEN:
+        return False
+    if not pid or pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+# ── Queue ───────────────────────────────────────────────────────────────
+
+# Called with the job's ``mark_running`` coroutine function; returns the result
+JobRunner = Callable[[Callable[[], Awaitable[None]]], Awaitable[dict]]
+
+
+class MarkJobQueue:
+    """Runs submitted mark jobs as background tasks, up to ``max_queued`` at once.
+
+    ``submit`` takes a coroutine function that does the actual marking. It
+    is called with a ``mark_running`` coroutine function to await once the
+    mark gets a slot (the job reads "queued" until then), and returns
+    ``{"document": bytes, "filename": str, "metadata": dict}``. Exceptions are recorded on the job; an exception's ``detail``
+    (as on HTTPException — a string, or a dict with a "message") is shown to
+    the client, anything else becomes a generic error.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        max_queued: int = JOB_QUEUE_MAX,
+        ttl_seconds: int = JOB_TTL_SECONDS,
+    ):
+        self.store = store
+        self.max_queued = max_queued
+        self.ttl_seconds = ttl_seconds
+        self._jobs: dict[str, asyncio.Task] = {}
+        self._purge_task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._purge_task is not None:
+            return
+        self._purge_task = asyncio.create_task(self._maintenance_loop())
+
+    async def stop(self) -> None:
+        tasks = [*self._jobs.values(), *([self._purge_task] if self._purge_task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._jobs.clear()
+        self._purge_task = None
+
+    async def submit(
+        self,
+        run: JobRunner,
+        *,
+        user_id: str | None,
+        file_name: str | None,
+        return_metadata: bool,
+    ) -> dict:
+        if len(self._jobs) >= self.max_queued:
+            raise JobQueueFull()
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "status": JOB_QUEUED,
+            "file_name": file_name,
+            "return_metadata": return_metadata,
+            "owner_pid": os.getpid(),
+            "owner_token": _PROCESS_TOKEN,
+            "created_at": now,
+            "heartbeat_at": now,
+        }
+        await asyncio.to_thread(self.store.create, job)
+        task = asyncio.create_task(self._run(job["id"], run))
+        self._jobs[job["id"]] = task
+        task.add_done_callback(lambda _t, job_id=job["id"]: self._jobs.pop(job_id, None))
+        return job
+
+    async def get(self, job_id: str) -> dict | None:
+        """Return the job, or None if it doesn't exist or has expired."""
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            return None
+        if job["expires_at"] is not None and job["expires_at"] <= time.time():
+            return None
+        return job
+
+    async def _run(self, job_id: str, run: JobRunner) -> None:
+        async def mark_running() -> None:
+            await asyncio.to_thread(self.store.update, job_id, status=JOB_RUNNING, started_at=time.time())
+
+        try:
+            result = await run(mark_running)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            detail = getattr(e, "detail", None)
+            if isinstance(detail, dict):
+                detail = detail.get("message")
+            if not isinstance(detail, str):
+                print(f"[mark_jobs] job {job_id} failed: {e!r}")
+                detail = "Marking failed. Please try again."
+            now = time.time()
+            await asyncio.to_thread(
+                self.store.update,
+                job_id, status=JOB_FAILED, error=detail,
+                finished_at=now, expires_at=now + self.ttl_seconds,
+            )
+            return
+        now = time.time()
+        await asyncio.to_thread(
+            self.store.update,
+            job_id,
+            status=JOB_DONE,
+            finished_at=now,
+            expires_at=now + self.ttl_seconds,
+            document=result["document"],
+            filename=result["filename"],
+            metadata=result["metadata"],
+        )
+
+    async def _maintenance_loop(self) -> None:
+        """Fail interrupted jobs at boot, then renew leases, fail stale jobs and purge expired ones."""
+        try:
+            failed = await asyncio.to_thread(self.store.fail_orphans, _is_orphan, time.time())
+            if failed:
+                print(f"[mark_jobs] marked {failed} interrupted job(s) as failed")
+        except Exception as e:
+            print(f"[mark_jobs] orphan check failed: {e!r}")
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            now = time.time()
+            try:
+                await asyncio.to_thread(self.store.renew_leases, list(self._jobs), now)
+                stale = await asyncio.to_thread(self.store.fail_stale, now - JOB_LEASE_SECONDS, now)
+                if stale:
+                    print(f"[mark_jobs] marked {stale} job(s) with a lapsed lease as failed")
+                await asyncio.to_thread(self.store.purge_expired, now)
+            except Exception as e:
+                print(f"[mark_jobs] maintenance failed: {e!r}")
+
+
+def job_status_payload(job: dict) -> dict:
+    """Public view of a job for GET /mark/jobs/{id} (no result bytes)."""
+    def _iso(ts):
+        if ts is None:
+            return None
+        return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).isoformat()
+
+    payload = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "file_name": job["file_name"],
+        "created_at": _iso(job["created_at"]),
+        "started_at": _iso(job["started_at"]),
+        "finished_at": _iso(job["finished_at"]),
+        "expires_at": _iso(job["expires_at"]),
+    }
+    if job["status"] == JOB_FAILED:
+        payload["error"] = job["error"]
+    if job["status"] == JOB_DONE:
+        payload["result_url"] = f"/mark/jobs/{job['id']}/result"
+    return payload
+
+
+_QUEUE: MarkJobQueue | None = None
+
+
+def get_mark_job_queue() -> MarkJobQueue:
+    """Process-wide MarkJobQueue on the default SQLite store, created on first use."""
+    global _QUEUE
+    if _QUEUE is None:
+        _QUEUE = MarkJobQueue(SQLiteJobStore())
+    return _QUEUE
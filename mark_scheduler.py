@@ -0,0 +1,288 @@
+"""
+Fair scheduling of marks across users and API keys.
+
+The old guard was a per-process ``set`` of user ids: it only worked inside
+one uvicorn worker and answered a second concurrent mark with a 429 even
+when cores were idle. Marks now wait for a slot here instead:
+
+  * bounded global concurrency (one slot per marking core);
+  * one FIFO queue per tenant (user id, or ``apikey:<id>`` for API
+    clients), served weighted round-robin — a tenant at the head of the
+    ring gets ``weight`` slots before the next tenant's turn — so one
+    teacher queueing 120 essays can't starve everyone else;
+  * queue-depth limits (global and per tenant) that fail fast with a
+    retry hint instead of queueing forever;
+  * an optional cross-worker slot backend: with VYSTI_MARK_LOCK_DIR set,
+    slots are flock()ed files shared by every worker on the host, and a
+    crashed worker's slots are released by the kernel.
+
+Config (env):
+    VYSTI_MARK_CONCURRENCY          marks running at once (default: marking pool size, min 1).
+    VYSTI_MARK_QUEUE_MAX            marks waiting across all tenants (default 500).
+    VYSTI_MARK_QUEUE_PER_TENANT     marks waiting per tenant (default 150).
+    VYSTI_MARK_QUEUE_WAIT_SECONDS   longest a mark may wait for a slot (default 600).
+    VYSTI_MARK_LOCK_DIR             directory for cross-worker slot lock files (default: off).
+    VYSTI_MARK_TIER_WEIGHTS         round-robin weights, e.g. "free=1,paid=2,api=2".
+"""
+
+import asyncio
+import contextlib
+import os
+import time
+from collections import deque
+
+from env_config import env_int
+from marking_pool import POOL_SIZE
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: no cross-worker slots (VYSTI_MARK_LOCK_DIR)
+    fcntl = None
+
+
+def _parse_weights(raw: str) -> dict[str, int]:
+    weights = {"free": 1, "paid": 2, "api": 2}
+    for part in raw.split(","):
+        name, _, value = part.partition("=")
+        try:
+            weights[name.strip()] = max(1, int(value))
+        except ValueError:
+            if part.strip():
+                print(f"[mark_scheduler] ignoring invalid tier weight {part!r}")
+    return weights
+
+
+# ── Config ───────────────────────────────────────────────────────────────
+CONCURRENCY = max(1, env_int("VYSTI_MARK_CONCURRENCY", POOL_SIZE))
+QUEUE_MAX = max(1, env_int("VYSTI_MARK_QUEUE_MAX", 500))
+QUEUE_PER_TENANT = max(1, env_int("VYSTI_MARK_QUEUE_PER_TENANT", 150))
+QUEUE_WAIT_SECONDS = max(1, env_int("VYSTI_MARK_QUEUE_WAIT_SECONDS", 600))
+LOCK_DIR = os.getenv("VYSTI_MARK_LOCK_DIR", "").strip() or None
+TIER_WEIGHTS = _parse_weights(os.getenv("VYSTI_MARK_TIER_WEIGHTS", ""))
+
+_BACKEND_RETRY_SECONDS = 0.25  # how often to re-poll a busy cross-worker backend
+
+
+class MarkQueueFull(Exception):
+    """Raised when a tenant's (or the global) mark queue is at its limit."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class MarkQueueTimeout(Exception):
+    """Raised when a mark waited longer than VYSTI_MARK_QUEUE_WAIT_SECONDS for a slot."""
+
+
+# ── Slot backends ───────────────────────────────────────────────────────
+
+class LocalSlotBackend:
+    """Slots counted in this process only (single uvicorn worker)."""
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self._used = 0
+
+    def try_acquire(self):
+        if self._used >= self.slots:
+            return None
+        self._used += 1
+        return True
+
+    def release(self, token) -> None:
+        self._used -= 1
+
+
+class FileLockSlotBackend:
+    """Slots shared by every worker on the host: one flock()ed file per slot.
+
+    A worker that dies holding a slot releases it automatically when the
+    kernel closes its file descriptors.
+    """
+
+    def __init__(self, lock_dir: str, slots: int):
+        os.makedirs(lock_dir, exist_ok=True)
+        self.slots = slots
+        self._paths = [os.path.join(lock_dir, f"mark-slot-{i}.lock") for i in range(slots)]
+
+    def try_acquire(self):
+        for path in self._paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            return fd
+        return None
+
+    def release(self, token) -> None:
+        try:
+            fcntl.flock(token, fcntl.LOCK_UN)
+        finally:
+            os.close(token)
+
+
+# ── Scheduler ───────────────────────────────────────────────────────────
+
+class MarkScheduler:
+    """Weighted round-robin over per-tenant FIFO queues, capped at ``concurrency``.
+
+    Use as ``async with scheduler.slot(tenant, weight): ...``. Waiting is
+    work-conserving: whenever a slot is free and anyone is queued, the next
+    tenant in the ring gets it, so a lone tenant can use every slot.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = CONCURRENCY,
+        queue_max: int = QUEUE_MAX,
+        queue_per_tenant: int = QUEUE_PER_TENANT,
+        max_wait: float = QUEUE_WAIT_SECONDS,
+        backend=None,
+    ):
+        self.concurrency = concurrency
+        self.queue_max = queue_max
+        self.queue_per_tenant = queue_per_tenant
+        self.max_wait = max_wait
+        self.backend = backend or LocalSlotBackend(concurrency)
+        self._queues: dict[str, deque] = {}
+        self._ring: deque[str] = deque()
+        self._turns_left: dict[str, int] = {}
+        self._weights: dict[str, int] = {}
+        self._queued = 0
+        self._running = 0
+        self._avg_seconds = 10.0  # EMA of slot hold time, for Retry-After
+        self._retry_handle: asyncio.TimerHandle | None = None
+
+    # -- introspection -------------------------------------------------
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def retry_after(self) -> int:
+        """Rough seconds until the current backlog drains."""
+        backlog = self._queued + self._running
+        return max(1, int(backlog * self._avg_seconds / max(1, self.concurrency)))
+
+    def check_capacity(self, tenant: str, count: int = 1) -> None:
+        """Raise MarkQueueFull if ``tenant`` could not queue ``count`` more marks right now."""
+        if self._queued + count > self.queue_max:
+            raise MarkQueueFull(
+                "The marker is very busy right now. Please try again shortly.",
+                self.retry_after(),
+            )
+        if len(self._queues.get(tenant, ())) + count > self.queue_per_tenant:
+            raise MarkQueueFull(
+                f"You can have at most {self.queue_per_tenant} essays waiting to be marked. "
+                "Please wait for some to finish.",
+                self.retry_after(),
+            )
+
+    # -- scheduling ----------------------------------------------------
+    @contextlib.asynccontextmanager
+    async def slot(self, tenant: str, weight: int = 1):
+        self.check_capacity(tenant)
+        waiter = asyncio.get_running_loop().create_future()
+        self._enqueue(tenant, max(1, weight), waiter)
+        self._dispatch()
+        try:
+            token = await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we gave up; hand the slot straight back.
+                self._release(waiter.result(), started=None)
+            else:
+                waiter.cancel()
+                self._drop_waiter(tenant, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise MarkQueueTimeout(
+                    f"Waited more than {self.max_wait:.0f}s for a marking slot"
+                ) from e
+            raise
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(token, started)
+
+    def _enqueue(self, tenant: str, weight: int, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(tenant)
+        if queue is None:
+            queue = self._queues[tenant] = deque()
+            self._ring.append(tenant)
+            self._turns_left[tenant] = weight
+        self._weights[tenant] = weight
+        queue.append(waiter)
+        self._queued += 1
+
+    def _drop_waiter(self, tenant: str, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(tenant)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self._queued -= 1
+        if not queue:
+            self._forget(tenant)
+
+    def _forget(self, tenant: str) -> None:
+        del self._queues[tenant]
+        self._ring.remove(tenant)
+        self._turns_left.pop(tenant, None)
+        self._weights.pop(tenant, None)
+
+    def _next_tenant(self) -> str:
+        tenant = self._ring[0]
+        self._turns_left[tenant] -= 1
+        if self._turns_left[tenant] <= 0:
+            self._turns_left[tenant] = self._weights[tenant]
+            self._ring.rotate(-1)
+        return tenant
+
+    def _dispatch(self) -> None:
+        while self._ring and self._running < self.concurrency:
+            token = self.backend.try_acquire()
+            if token is None:
+                # Another worker holds the shared slots; poll until one frees up.
+                if self._retry_handle is None:
+                    loop = asyncio.get_running_loop()
+                    self._retry_handle = loop.call_later(_BACKEND_RETRY_SECONDS, self._retry_dispatch)
+                return
+            tenant = self._next_tenant()
+            waiter = self._queues[tenant].popleft()
+            self._queued -= 1
+            if not self._queues[tenant]:
+                self._forget(tenant)
+            self._running += 1
+            waiter.set_result(token)
+
+    def _retry_dispatch(self) -> None:
+        self._retry_handle = None
+        self._dispatch()
+
+    def _release(self, token, started: float | None) -> None:
+        self._running -= 1
+        self.backend.release(token)
+        if started is not None:
+            elapsed = time.monotonic() - started
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+        self._dispatch()
+
+
+_SCHEDULER: MarkScheduler | None = None
+
+
+def get_mark_scheduler() -> MarkScheduler:
+    """Process-wide MarkScheduler, created on first use."""
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        if LOCK_DIR and fcntl is None:
+            raise RuntimeError("VYSTI_MARK_LOCK_DIR needs fcntl file locks, which this platform lacks; unset it")
+        backend = FileLockSlotBackend(LOCK_DIR, CONCURRENCY) if LOCK_DIR else None
+        _SCHEDULER = MarkScheduler(backend=backend)
+    return _SCHEDULER
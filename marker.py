@@ -5,10 +5,19 @@
 
 import json
 import os
+import pickle
 import sys
 import re
 import tempfile
+from bisect import bisect_left, bisect_right
 import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from dataclasses import dataclass, field
+from functools import lru_cache
+from difflib import SequenceMatcher
+from typing import Dict, Tuple, NamedTuple
 from io import BytesIO
 import pandas as pd
 import docx  # type: ignore
@@ -21,6 +30,11 @@ from docx.oxml import OxmlElement  # type: ignore[attr-defined]
 from docx.opc.constants import RELATIONSHIP_TYPE
 import spacy
 
+from env_config import env_int
+from parse_cache import ParseCache
+from grammar_cache import GrammarCache
+from word_index import get_word_index
+
 # Custom logical color for grammar issues (implemented via shading)
 GRAMMAR_ORANGE = "GRAMMAR_ORANGE"
 GRAMMAR_REPETITION = "GRAMMAR_REPETITION"  # Noun repetition: no Word highlight (frontend toggle only)
@@ -34,14 +48,63 @@ except OSError:
     download("en_core_web_sm")
     nlp = spacy.load("en_core_web_sm")
 
-from dataclasses import dataclass
-from difflib import SequenceMatcher
-from typing import Dict, Tuple, NamedTuple
+# Paragraph pre-parsing with nlp.pipe (see EssayAnalysis.parse_many).
+# n_process > 1 forks spaCy workers per essay; only worth it for very long
+# documents when marks are not already running in the marking pool.
+SPACY_PIPE_BATCH_SIZE = max(1, env_int("VYSTI_SPACY_BATCH_SIZE", 16))
+SPACY_PIPE_N_PROCESS = max(1, env_int("VYSTI_SPACY_N_PROCESS", 1))
+
+# Pipeline profiles: the components each kind of caller can skip.
+#   full      — everything (sentence splitting and marking rules need the parser)
+#   lemma     — tokens + POS + lemmas; the rule lemmatizer needs the tagger
+#               and attribute_ruler but never reads parser or NER output
+#   tokenize  — tokenizer only (no tags, no lemmas)
+# Components not in the loaded pipeline are ignored.
+SPACY_PROFILES: dict[str, tuple[str, ...] | None] = {
+    "full": (),
+    "lemma": ("parser", "senter", "ner"),
+    "tokenize": None,  # None = disable every component
+}
+
+
+def _profile_disable(profile: str) -> list[str]:
+    skip = SPACY_PROFILES[profile]
+    if skip is None:
+        return list(nlp.pipe_names)
+    return [name for name in skip if name in nlp.pipe_names]
+
+
+def parse_text(text: str, profile: str = "full"):
+    """nlp(text), running only the components ``profile`` needs."""
+    return nlp(text, disable=_profile_disable(profile))
+
+
+_parse_cache_instance: ParseCache | None = None
+
+
+def get_parse_cache() -> ParseCache:
+    """Process-wide paragraph parse cache (see parse_cache.py), created on first use."""
+    global _parse_cache_instance
+    if _parse_cache_instance is None:
+        _parse_cache_instance = ParseCache(nlp)
+    return _parse_cache_instance
+
+
+def cached_parse(text: str, profile: str = "full"):
+    """parse_text(), reusing the parse of identical text from an earlier mark."""
+    cache = get_parse_cache()
+    doc = cache.get(text, profile)
+    if doc is None:
+        doc = parse_text(text, profile)
+        cache.put(text, doc, profile)
+    return doc
+
 
 # ============================================================
 # LANGUAGETOOL — GRAMMAR CHECKING (lazy-loaded singleton)
 # ============================================================
 _language_tool_instance = None
+_language_tool_lock = threading.Lock()
 
 def get_language_tool():
     """Lazy-load LanguageTool.
@@ -51,37 +114,371 @@ def get_language_tool():
     native Python builds), falls back to LT's hosted public API so spelling
     and grammar checks still run. The hosted API is rate-limited to ~20
     requests/minute per IP, which is acceptable for our current scale.
+
+    When the host's shared LanguageTool servers are running (VYSTI_LT_URLS,
+    see lt_service.py), checks go to them through a pooled client instead
+    and this process starts no JVM of its own.
+
+    Initialization is guarded by a lock so concurrent marks in one process
+    don't each start their own LanguageTool server.
     """
     global _language_tool_instance
     if _language_tool_instance is None:
-        try:
-            import language_tool_python
-        except Exception as e:
-            print(f"⚠️  language_tool_python import failed: {e}")
-            _language_tool_instance = False
-            return None
+        with _language_tool_lock:
+            if _language_tool_instance is not None:
+                return _language_tool_instance if _language_tool_instance else None
+            from lt_service import TIMEOUT_SECONDS, get_pooled_language_tool
+
+            pooled = get_pooled_language_tool()
+            if pooled is not None:
+                _language_tool_instance = pooled
+                print(f"✓ LanguageTool initialized (shared servers: {', '.join(pooled.client.urls)})")
+                return _language_tool_instance
+            try:
+                import language_tool_python
+            except Exception as e:
+                print(f"⚠️  language_tool_python import failed: {e}")
+                _language_tool_instance = False
+                return None
 
-        import shutil
-        java_present = bool(shutil.which("java"))
-        try:
-            if java_present:
-                _language_tool_instance = language_tool_python.LanguageTool('en-US')
-                print("✓ LanguageTool initialized (local Java server)")
-            else:
-                # NOTE: pinning the remote_server explicitly. The package's
-                # default URL ("https://languagetool.org/api/") is stale and
-                # returns HTML; the real API endpoint is api.languagetool.org.
-                _language_tool_instance = language_tool_python.LanguageToolPublicAPI(
-                    'en-US',
-                    remote_server='https://api.languagetool.org',
-                )
-                print("✓ LanguageTool initialized (hosted public API — Java not found)")
-        except Exception as e:
-            print(f"⚠️  LanguageTool initialization failed: {e}")
-            _language_tool_instance = False  # Mark as failed, don't retry
+            import shutil
+            java_present = bool(shutil.which("java"))
+            try:
+                if java_present:
+                    _language_tool_instance = language_tool_python.LanguageTool('en-US')
+                    print("✓ LanguageTool initialized (local Java server)")
+                else:
+                    # NOTE: pinning the remote_server explicitly. The package's
+                    # default URL ("https://languagetool.org/api/") is stale and
+                    # returns HTML; the real API endpoint is api.languagetool.org.
+                    _language_tool_instance = language_tool_python.LanguageToolPublicAPI(
+                        'en-US',
+                        remote_server='https://api.languagetool.org',
+                    )
+                    print("✓ LanguageTool initialized (hosted public API — Java not found)")
+                # language_tool_python's requests timeout defaults to five
+                # minutes; a check abandoned by _run_lt would pin its thread
+                # that long. Use the same per-request cap as the pooled client.
+                _language_tool_instance._TIMEOUT = TIMEOUT_SECONDS
+            except Exception as e:
+                print(f"⚠️  LanguageTool initialization failed: {e}")
+                _language_tool_instance = False  # Mark as failed, don't retry
     return _language_tool_instance if _language_tool_instance else None
 
 
+class GrammarMatch(NamedTuple):
+    """The parts of a LanguageTool match the marking rules read (plain, picklable)."""
+    rule_id: str
+    offset: int
+    error_length: int
+    replacements: list
+
+    @classmethod
+    def from_lt(cls, match) -> "GrammarMatch":
+        return cls(match.rule_id, match.offset, match.error_length, list(match.replacements or []))
+
+
+# ── LanguageTool budget and circuit breaker ──
+# A slow or rate-limited LanguageTool used to stall every paragraph of every
+# essay. Each essay now gets a total time budget for LanguageTool calls, and
+# a per-process breaker stops calling it after consecutive failures or
+# timeouts, letting one trial call through after the cool-down. Paragraphs
+# that miss their check are counted, and mark_docx_bytes reports
+# metadata["grammar_checks"] as "full", "partial" or "skipped".
+LT_BUDGET_SECONDS = max(1, env_int("VYSTI_LT_BUDGET_SECONDS", 20))
+LT_BREAKER_FAILURES = max(1, env_int("VYSTI_LT_BREAKER_FAILURES", 3))
+LT_BREAKER_COOLDOWN_SECONDS = max(1, env_int("VYSTI_LT_BREAKER_COOLDOWN_SECONDS", 60))
+
+
+class LTCircuitBreaker:
+    """Closed until ``failures`` consecutive failures, then open for ``cooldown`` seconds."""
+
+    def __init__(self, failures: int = LT_BREAKER_FAILURES, cooldown: float = LT_BREAKER_COOLDOWN_SECONDS):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._open_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._consecutive < self.failures:
+                return "closed"
+            return "open" if time.monotonic() < self._open_until or self._probing else "half-open"
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (after the cool-down, one trial call at a time)."""
+        with self._lock:
+            if self._consecutive < self.failures:
+                return True
+            if time.monotonic() < self._open_until or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._consecutive >= self.failures:
+                print("[LanguageTool] circuit closed")
+            self._consecutive = 0
+            self._probing = False
+
+    def release(self) -> None:
+        """Give up the trial call without counting it either way (e.g. the caller stopped waiting)."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            self._probing = False
+            if self._consecutive >= self.failures:
+                self._open_until = time.monotonic() + self.cooldown
+                print(f"[LanguageTool] circuit open for {self.cooldown}s after {self._consecutive} failures")
+
+
+_LT_BREAKER = LTCircuitBreaker()
+# Calls run here so a slow request can be abandoned when the budget runs out.
+# The clients' own per-request timeouts (VYSTI_LT_TIMEOUT_SECONDS) bound how
+# long an abandoned call keeps its thread.
+_LT_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="languagetool")
+
+
+def _run_lt(ctx: "MarkingContext | None", fn, *args):
+    """
+    fn(*args) — one LanguageTool call — within the essay's remaining budget
+    (when ``ctx`` is given) and the circuit breaker. Returns None when the
+    call was skipped, failed or timed out.
+
+    Only the call's own outcome feeds the breaker: errors (including the
+    client's per-request timeout) count as failures. Running out of one
+    essay's budget does not; a call still in flight then is left to finish
+    in the background and its outcome recorded when it does.
+    """
+    remaining = None
+    if ctx is not None:
+        remaining = LT_BUDGET_SECONDS - ctx.grammar_seconds
+        if remaining <= 0:
+            return None
+    if not _LT_BREAKER.allow():
+        return None
+    started = time.monotonic()
+    future = _LT_EXECUTOR.submit(fn, *args)
+    try:
+        result = future.result(timeout=remaining)
+    except FuturesTimeout:
+        if future.cancel():
+            _LT_BREAKER.release()
+        else:
+            future.add_done_callback(_record_abandoned_lt_call)
+        print(f"[LanguageTool] check abandoned: essay budget of {LT_BUDGET_SECONDS}s used up")
+        return None
+    except Exception as e:
+        _LT_BREAKER.record_failure()
+        print(f"[LanguageTool] check failed: {e}")
+        return None
+    finally:
+        if ctx is not None:
+            ctx.grammar_seconds += time.monotonic() - started
+    _LT_BREAKER.record_success()
+    return result
+
+
+def _record_abandoned_lt_call(future) -> None:
+    if future.exception() is not None:
+        _LT_BREAKER.record_failure()
+    else:
+        _LT_BREAKER.record_success()
+
+
+def grammar_check_status(ctx: "MarkingContext") -> str:
+    """"full", "partial" or "skipped": how many paragraphs got their LanguageTool check."""
+    if not ctx.grammar_skipped:
+        return "full"
+    return "partial" if ctx.grammar_checked else "skipped"
+
+
+def check_grammar(text: str, ctx: "MarkingContext") -> "list[GrammarMatch] | None":
+    """
+    LanguageTool matches for one paragraph's text, or None if the paragraph
+    isn't in the grammar cache and LanguageTool is unavailable, the circuit
+    breaker is open, or the essay's grammar budget is used up (counted in
+    ctx.grammar_skipped).
+
+    Results are reused by exact text from ctx.grammar_reuse (an earlier
+    check of the same essay, see incremental /check_text) and recorded in
+    ctx.grammar_matches for the caller to keep.
+    """
+    matches = ctx.grammar_matches.get(text)
+    if matches is None:
+        matches = ctx.grammar_reuse.get(text)
+    if matches is None:
+        matches = ctx.grammar_prefetched.get(text)
+    if matches is None:
+        # The grammar cache is read even when LanguageTool can't be called
+        matches = cached_grammar([text]).get(text)
+    if matches is None:
+        lt = get_language_tool()
+        results = _run_lt(ctx, _lt_check_and_cache, lt, [text]) if lt is not None else None
+        if results is None:
+            ctx.grammar_skipped += 1
+            return None
+        matches = results[0]
+    ctx.grammar_matches[text] = matches
+    ctx.grammar_checked += 1
+    return matches
+
+
+_grammar_cache_instance: GrammarCache | None = None
+
+
+def get_grammar_cache() -> GrammarCache:
+    """Process-wide paragraph-level LanguageTool cache (see grammar_cache.py), created on first use."""
+    global _grammar_cache_instance
+    if _grammar_cache_instance is None:
+        _grammar_cache_instance = GrammarCache(language="en-US")
+    return _grammar_cache_instance
+
+
+# Whole-essay batching (see prefetch_grammar). Paragraphs are joined with a
+# blank line, which LanguageTool treats as a paragraph break, so no
+# sentence-level match can span two paragraphs. Batches stay under the
+# hosted API's per-request text limit.
+LT_BATCH_SEPARATOR = "\n\n"
+LT_BATCH_MAX_CHARS = max(1, env_int("VYSTI_LT_BATCH_MAX_CHARS", 18000))
+
+# MarkerConfig flags for the rules that read LanguageTool matches
+_LT_RULE_FLAGS = (
+    "enforce_sva_rule", "enforce_spelling_rule", "enforce_confused_words_rule",
+    "enforce_intro_comma_rule", "enforce_apostrophe_rule",
+)
+
+
+def _split_batch_matches(matches, starts: list[int], texts: list[str]) -> list[list]:
+    """Per-paragraph GrammarMatches from one batched check, offsets made paragraph-relative."""
+    per_text: list[list] = [[] for _ in texts]
+    for m in matches:
+        i = bisect_right(starts, m.offset) - 1
+        if i < 0:
+            continue
+        offset = m.offset - starts[i]
+        # Matches on the separator itself belong to no paragraph
+        if offset + m.error_length > len(texts[i]):
+            continue
+        per_text[i].append(m._replace(offset=offset))
+    return per_text
+
+
+def _lt_check_batched(lt, texts: list[str]) -> list[list]:
+    """GrammarMatches for each of ``texts``, checked in as few LanguageTool requests as possible."""
+    batches: list[list[str]] = [[]]
+    size = 0
+    for text in texts:
+        if batches[-1] and size + len(LT_BATCH_SEPARATOR) + len(text) > LT_BATCH_MAX_CHARS:
+            batches.append([])
+            size = 0
+        size += (len(LT_BATCH_SEPARATOR) if batches[-1] else 0) + len(text)
+        batches[-1].append(text)
+
+    joined = [LT_BATCH_SEPARATOR.join(batch) for batch in batches]
+    if len(joined) > 1 and hasattr(lt, "check_many"):
+        raw = lt.check_many(joined)  # pooled servers: all batches at once
+    else:
+        raw = [lt.check(text) for text in joined]
+
+    results: list[list] = []
+    for batch, batch_matches in zip(batches, raw):
+        starts = []
+        pos = 0
+        for text in batch:
+            starts.append(pos)
+            pos += len(text) + len(LT_BATCH_SEPARATOR)
+        matches = [GrammarMatch.from_lt(m) for m in batch_matches]
+        results.extend(_split_batch_matches(matches, starts, batch))
+    return results
+
+
+def cached_grammar(texts) -> "dict[str, list[GrammarMatch]]":
+    """
+    GrammarMatches for each of ``texts`` already in the grammar cache (from
+    any earlier check, on any worker sharing its SQLite tier), by text.
+
+    Needs no LanguageTool call, so callers read it before the essay budget
+    and circuit breaker decide whether LanguageTool may be asked at all.
+    """
+    known = get_grammar_cache().get_many(dict.fromkeys(texts))
+    return {
+        text: [GrammarMatch(rule_id, offset, error_length, list(replacements))
+               for rule_id, offset, error_length, replacements in rows]
+        for text, rows in known.items()
+    }
+
+
+def _lt_check_and_cache(lt, texts: list[str]) -> list[list]:
+    """GrammarMatches for each of ``texts`` from LanguageTool (batched), stored in the grammar cache."""
+    results = _lt_check_batched(lt, texts)
+    get_grammar_cache().put_many({
+        text: [list(m) for m in matches] for text, matches in zip(texts, results)
+    })
+    return results
+
+
+def lt_check_texts(lt, texts: list[str]) -> list[list]:
+    """
+    GrammarMatches for each paragraph in ``texts``.
+
+    Paragraphs already in the grammar cache skip LanguageTool; the rest are
+    checked whole, in batched requests, and cached.
+    """
+    known = cached_grammar(texts)
+    missing = [text for text in dict.fromkeys(texts) if text not in known]
+    if missing:
+        known.update(zip(missing, _lt_check_and_cache(lt, missing)))
+    return [known[text] for text in texts]
+
+
+def prefetch_grammar(texts, ctx: "MarkingContext", config=None) -> None:
+    """
+    Check the paragraphs analyze_text is about to send to LanguageTool in as
+    few requests as possible (one per essay unless it exceeds
+    LT_BATCH_MAX_CHARS, and only the paragraphs the grammar cache hasn't
+    seen), instead of one request per paragraph.
+
+    Each paragraph's matches are stored under its exact text in
+    ctx.grammar_prefetched, where check_grammar finds them; a paragraph
+    whose text changes before its turn is just checked on its own.
+    """
+    if config is not None and not any(getattr(config, f, True) for f in _LT_RULE_FLAGS):
+        return
+    pending = []
+    for text in dict.fromkeys(texts):
+        stripped = text.strip()
+        if not stripped or TITLE_PATTERN.match(stripped) or TITLE_PATTERN_NO_COLON.match(stripped):
+            continue  # analyze_text skips LanguageTool on essay title lines
+        if text in ctx.grammar_matches or text in ctx.grammar_reuse or text in ctx.grammar_prefetched:
+            continue
+        pending.append(text)
+    if not pending:
+        return
+    # Cached paragraphs are served even when LanguageTool is unavailable,
+    # the breaker is open or the budget is spent; only the rest cost a call.
+    cached = cached_grammar(pending)
+    ctx.grammar_prefetched.update(cached)
+    missing = [text for text in pending if text not in cached]
+    if not missing:
+        return
+    lt = get_language_tool()
+    if lt is None:
+        return
+    results = _run_lt(ctx, _lt_check_and_cache, lt, missing)
+    if results is None:
+        return  # left to check_grammar's per-paragraph path
+    for text, matches in zip(missing, results):
+        ctx.grammar_prefetched[text] = matches
+
+
 # Curated set of British/Australian English spellings that en-US flags as errors.
 # Using an explicit set avoids false positives from pattern matching
 # (e.g. "authour" matching -our→-or, or "beautifull" matching -ll→-l).
@@ -336,8 +733,10 @@ def _is_british_variant(word, replacements):
 # LanguageTool's dictionary misses many valid English derivations
 # (e.g. "questionability", "performativity", "situatedness").
 # Instead of enumerating every form, we strip the suffix, reconstruct
-# the base form, and check whether LanguageTool itself accepts the base.
-# Results are cached per-process so the cost is negligible.
+# the base form, and look the base up in the word index (word_index.py,
+# built at deploy time). Without the index we ask LanguageTool whether it
+# accepts the base; those checks go through the sentence-level grammar
+# cache, so each base costs at most one round trip per host.
 
 _DERIVATION_SUFFIX_MAP = [
     # (suffix_to_strip, suffix_to_add_back)  — longest first to avoid partial matches
@@ -354,19 +753,8 @@ _DERIVATION_SUFFIX_MAP = [
     ("ment",       ""),         # enmeshment       → enmesh (handled carefully)
 ]
 
-_derivation_cache = {}  # word -> bool (True = valid derivation)
-
-
-def _is_valid_derivation(word, lt_instance):
-    """Return True if *word* is a standard English derivation of a known base.
-
-    Works by stripping common nominalizing suffixes and checking whether
-    LanguageTool accepts the reconstructed base form.  Cached per-word.
-    """
-    w = word.lower().strip()
-    if w in _derivation_cache:
-        return _derivation_cache[w]
-
+def _derivation_stem(w: str) -> str | None:
+    """Reconstructed base of *w* for the first (longest) matching suffix, or None."""
     for suffix, base_suffix in _DERIVATION_SUFFIX_MAP:
         if not w.endswith(suffix) or len(w) <= len(suffix) + 2:
             continue
@@ -374,29 +762,32 @@ def _is_valid_derivation(word, lt_instance):
         # Quick sanity: stem should be at least 3 chars
         if len(stem) < 3:
             continue
-        try:
-            check = lt_instance.check(f"This is {stem}.")
-            flagged = any(m.rule_id == "MORFOLOGIK_RULE_EN_US" for m in check)
-            if not flagged:
-                _derivation_cache[w] = True
-                return True
-        except Exception:
-            pass
-        # Only try the first matching suffix (longest match wins)
-        break
+        return stem
+    return None
 
-    _derivation_cache[w] = False
-    return False
 
+def _is_valid_derivation(word, lt_instance, ctx=None):
+    """Return True if *word* is a standard English derivation of a known base.
 
-# ============================================================
-# FOUNDATION ASSIGNMENT 1 — GLOBAL LABEL TRACKING
-# ============================================================
-# For Foundation Assignment 1, we track the position of the last piece of
-# extra content (extra sentence or extra paragraph) so we can attach a single
-# yellow label at the very end of all red-struck content.
-# Format: (paragraph_index, char_position_in_flat_text) or None
-FOUNDATION1_LABEL_TARGET = None
+    Works by stripping common nominalizing suffixes and checking whether
+    the reconstructed base form is a word: in the word index when it is
+    available, otherwise by asking LanguageTool (within ctx's grammar
+    budget, when given).
+    """
+    stem = _derivation_stem(word.lower().strip())
+    if stem is None:
+        return False
+
+    words = get_word_index()
+    if words is not None:
+        return stem in words
+    if lt_instance is None:
+        return False
+
+    results = _run_lt(ctx, lt_check_texts, lt_instance, [f"This is {stem}."])
+    if results is None:
+        return False
+    return not any(m.rule_id == "MORFOLOGIK_RULE_EN_US" for m in results[0])
 
 
 # ============================================================
@@ -407,6 +798,13 @@ FOUNDATION1_LABEL_TARGET = None
 LEXIS_DATABASE = None
 LEXIS_INDEX = None  # Cached lemma index for fast lookups
 
+# Precompiled lemma index written next to the CSV (see build_lexis_index.py).
+# Workers load it instead of lemmatizing every term on their first mark; it
+# is rebuilt automatically when the CSV contents or the spaCy model change.
+LEXIS_INDEX_PATH = os.getenv("VYSTI_LEXIS_INDEX_PATH", "assignment-lexis.index.json")
+LEXIS_INDEX_FORMAT = 1
+DEFAULT_LEXIS_FOCUS_TYPES = ["concept", "device", "event", "person"]
+
 
 def normalize_title_key(s: str) -> str:
     """
@@ -885,7 +1283,7 @@ def missing_intro_first_sentence_signals(doc, sentences, flat_text: str) -> dict
 
     first_start, first_end = sentences[0]
     first_sentence_text = flat_text[first_start:first_end]
-    sentence_tokens = [t for t in doc if first_start <= t.idx < first_end]
+    sentence_tokens = token_span(doc, first_start, first_end)
 
     result = {
         "has_author": has_author_full_name_signal(sentence_tokens),
@@ -1035,7 +1433,6 @@ INLINE_LABEL_ALLOWLIST = {
     "Unnecessary language",
     "Avoid the words 'therefore', 'thereby', 'hence', and 'thus'",
 }
-APPROVED_LABELS = None
 ARTICLE_ERROR_EXPLANATION = "Use a before consonants and an before vowels."
 ARTICLE_ERROR_GUIDANCE = "Swap the article so it matches the next word (a + consonant, an + vowel)."
 
@@ -1264,9 +1661,6 @@ HARDCODED_SHARED_EXPLANATIONS = {
     MLA_CITATION_LABEL: "Review citation formatting after quotations.",
 }
 
-# Global counter so bookmark IDs are unique in the document
-BOOKMARK_ID_COUNTER = 1
-
 
 def bookmark_name_for_label(label: str) -> str:
     """
@@ -1292,24 +1686,23 @@ def bookmark_name_for_label(label: str) -> str:
     return BOOKMARK_PREFIX + base
 
 
-def add_bookmark_to_paragraph(paragraph, bookmark_name: str):
+def add_bookmark_to_paragraph(paragraph, bookmark_name: str, ctx: "MarkingContext"):
     """
     Wrap the given paragraph in a Word bookmark so we can hyperlink to it.
     We don't care about the exact span; starting at the paragraph start is fine.
+    Bookmark IDs come from ctx so they stay unique within one document.
     """
-    global BOOKMARK_ID_COUNTER
-
     p = paragraph._p
     # Create bookmarkStart
     start = OxmlElement("w:bookmarkStart")
-    start.set(qn("w:id"), str(BOOKMARK_ID_COUNTER))
+    start.set(qn("w:id"), str(ctx.bookmark_id_counter))
     start.set(qn("w:name"), bookmark_name)
 
     # Create bookmarkEnd
     end = OxmlElement("w:bookmarkEnd")
-    end.set(qn("w:id"), str(BOOKMARK_ID_COUNTER))
+    end.set(qn("w:id"), str(ctx.bookmark_id_counter))
 
-    BOOKMARK_ID_COUNTER += 1
+    ctx.bookmark_id_counter += 1
 
     # Insert at beginning & end of paragraph
     # Put bookmarkStart before the first paragraph child
@@ -1422,6 +1815,11 @@ THESIS_MULTIWORD_SYNONYMS: Dict[Tuple[str, ...], str] = {}
 # Maximum length of multi-word phrases we need to check
 THESIS_MULTIWORD_MAX_LEN: int = 1
 
+# THESIS_MULTIWORD_SYNONYMS compiled into a token trie at load time:
+# {"rhetorical": {"question": {None: "rhetorical question"}, ...}, ...}.
+# The None key marks the end of a phrase and holds its canonical device.
+THESIS_MULTIWORD_TRIE: dict = {}
+
 
 @dataclass
 class MarkerConfig:
@@ -1810,8 +2208,6 @@ def load_thesis_devices(path: str = "thesis_devices.txt") -> None:
     - If term == canonical_device, it declares a canonical device
     - If term != canonical_device, it's a synonym for the canonical device
     """
-    global THESIS_MULTIWORD_MAX_LEN
-    
     # Get the directory where marker.py is located
     file_dir = os.path.dirname(os.path.abspath(__file__))
     file_path = os.path.join(file_dir, path)
@@ -1848,17 +2244,48 @@ def load_thesis_devices(path: str = "thesis_devices.txt") -> None:
                 # Multi-word term (len(tokens) > 1): add to multi-word synonyms
                 # This handles both canonical multi-word devices (e.g., "rhetorical question")
                 # and multi-word synonyms (e.g., "rhetorical questions" -> "rhetorical question")
-                key = tuple(tokens)
-                THESIS_MULTIWORD_SYNONYMS[key] = canonical_device
-                THESIS_MULTIWORD_MAX_LEN = max(THESIS_MULTIWORD_MAX_LEN, len(tokens))
+                _add_multiword_device(tuple(tokens), canonical_device)
             
             # Also handle the canonical_device if it's multi-word (regardless of term length)
             # This ensures canonical multi-word devices are always in the multi-word map
             canonical_tokens = canonical_device.split()
             if len(canonical_tokens) > 1:
-                canonical_key = tuple(canonical_tokens)
-                THESIS_MULTIWORD_SYNONYMS[canonical_key] = canonical_device
-                THESIS_MULTIWORD_MAX_LEN = max(THESIS_MULTIWORD_MAX_LEN, len(canonical_tokens))
+                _add_multiword_device(tuple(canonical_tokens), canonical_device)
+
+
+def _add_multiword_device(key: tuple[str, ...], canonical_device: str) -> None:
+    """Register a multi-word device phrase in THESIS_MULTIWORD_SYNONYMS and its trie."""
+    global THESIS_MULTIWORD_MAX_LEN
+    THESIS_MULTIWORD_SYNONYMS[key] = canonical_device
+    THESIS_MULTIWORD_MAX_LEN = max(THESIS_MULTIWORD_MAX_LEN, len(key))
+    node = THESIS_MULTIWORD_TRIE
+    for word in key:
+        node = node.setdefault(word, {})
+    node[None] = canonical_device
+
+
+def match_multiword_device(doc, i: int) -> tuple[str, int] | None:
+    """
+    Longest multi-word device phrase starting at doc[i], as
+    (canonical_device, token_count), or None.
+
+    Walks THESIS_MULTIWORD_TRIE one lowercased token at a time, so each
+    position costs at most THESIS_MULTIWORD_MAX_LEN dict lookups instead of
+    building a tuple for every phrase length.
+    """
+    node = THESIS_MULTIWORD_TRIE
+    best = None
+    j = i
+    n = len(doc)
+    while j < n:
+        node = node.get(doc[j].text.lower())
+        if node is None:
+            break
+        j += 1
+        canonical = node.get(None)
+        if canonical is not None:
+            best = (canonical, j - i)
+    return best
 
 
 # Load devices at module import time
@@ -1917,7 +2344,7 @@ def _load_power_verb_lemmas():
             lemma = (entry.get("lemma") or "").strip().lower()
             if not lemma:
                 try:
-                    doc = nlp(verb_form)
+                    doc = parse_text(verb_form, "lemma")
                 except Exception:
                     continue
                 if doc and len(doc) > 0:
@@ -1930,7 +2357,7 @@ def _load_power_verb_lemmas():
     return out
 
 
-def _compute_positive_events(full_text: str, detected_lexis_list):
+def _compute_positive_events(full_text: str, detected_lexis_list, analysis: "EssayAnalysis | None" = None):
     """Build the positive_events dict that gets stored on mark_events.
 
     Captures three independent positive signals from a single essay:
@@ -1943,7 +2370,8 @@ def _compute_positive_events(full_text: str, detected_lexis_list):
                      avoid double-counting with thesis_devices output.
 
     Pure function over its inputs; never raises (any failure produces
-    a partial result rather than aborting marking).
+    a partial result rather than aborting marking). With ``analysis``, the
+    essay parse and device scan are shared with the other metadata stages.
     """
     out = {
         "power_verbs": {},
@@ -1983,12 +2411,13 @@ def _compute_positive_events(full_text: str, detected_lexis_list):
         out["lexis"][focus][term] = out["lexis"][focus].get(term, 0) + count
 
     # 2. Power verbs + devices — both need a spaCy parse of the original
-    #    document text. (We re-parse here; the marking pass parsed already
-    #    but its doc isn't easily reachable from this scope. Cost is one
-    #    extra parse per mark, ~100-300 ms on typical essays.)
+    #    document text, shared via EssayAnalysis when one is supplied.
     if full_text:
         try:
-            doc = nlp(full_text)
+            doc = (
+                analysis.doc(full_text, "lemma") if analysis is not None
+                else parse_text(full_text, "lemma")
+            )
 
             # Power verb scan — lemma equality against the loaded set.
             lemma_map = _load_power_verb_lemmas()
@@ -2005,7 +2434,11 @@ def _compute_positive_events(full_text: str, detected_lexis_list):
             # in-essay green highlighting. canonical_device_key is the
             # stable key (already lowercase).
             try:
-                for device_key, _s, _e in iter_device_spans(doc):
+                device_spans = (
+                    analysis.device_spans(full_text) if analysis is not None
+                    else iter_device_spans(doc)
+                )
+                for device_key, _s, _e in device_spans:
                     key = (device_key or "").lower().strip()
                     if not key:
                         continue
@@ -2064,6 +2497,94 @@ def load_lexis_database(path: str = "assignment-lexis.csv"):
         return LEXIS_DATABASE
 
 
+def _lexis_index_source_hash(lexis_df) -> str:
+    """Fingerprint of the (filtered) lexis rows and the model that lemmatizes them."""
+    h = hashlib.sha256()
+    h.update(f"{LEXIS_INDEX_FORMAT}|{nlp.meta.get('name')}-{nlp.meta.get('version')}|".encode("utf-8"))
+    h.update("\x1f".join(map(str, lexis_df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(lexis_df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def _lexis_json_value(val):
+    """A DataFrame cell as a plain JSON value (NaN -> None, numpy -> Python)."""
+    if hasattr(val, "item"):
+        val = val.item()
+    if isinstance(val, float) and val != val:
+        return None
+    return val
+
+
+def compile_lexis_index(lexis_df) -> dict:
+    """
+    Build the lemma index for ``lexis_df``, lemmatizing every term in one
+    nlp.pipe run.
+
+    Returns a dict mapping lemma (single-word terms) or lowercased phrase
+    (multi-word terms) -> list of term records (plain dicts of the CSV row).
+    Single-word records carry "_require_cap" so capitalized CSV terms
+    ("State", "Self") only match capitalized words in the essay.
+    """
+    rows = []
+    for row in lexis_df.to_dict(orient="records"):
+        term = row.get("term", "")
+        if not term or pd.isna(term):
+            continue
+        rows.append({key: _lexis_json_value(val) for key, val in row.items()})
+
+    terms = [row["term"] for row in rows]
+    docs = nlp.pipe(terms, batch_size=256, disable=_profile_disable("lemma"))
+
+    index = {}
+    for row, term, doc in zip(rows, terms, docs):
+        # For single-word terms, use the lemma
+        if len(doc) == 1:
+            lemma = doc[0].lemma_.lower()
+            row["_require_cap"] = term[0].isupper() and term.lower() != term
+            index.setdefault(lemma, []).append(row)
+        # For multi-word terms (e.g., "19th Amendment"), store the full phrase
+        else:
+            index.setdefault(term.lower(), []).append(row)
+    return index
+
+
+def _lexis_index_artifact_path(path: str = LEXIS_INDEX_PATH) -> str:
+    if os.path.isabs(path):
+        return path
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+
+
+def read_lexis_index_artifact(source_hash: str, path: str = LEXIS_INDEX_PATH) -> dict | None:
+    """The precompiled index at ``path``, or None if missing, unreadable or stale."""
+    try:
+        with open(_lexis_index_artifact_path(path), encoding="utf-8") as f:
+            artifact = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Warning: ignoring unreadable lexis index {path}: {e}")
+        return None
+    if artifact.get("format") != LEXIS_INDEX_FORMAT or artifact.get("source_hash") != source_hash:
+        return None
+    return artifact.get("index")
+
+
+def write_lexis_index_artifact(index: dict, source_hash: str, path: str = LEXIS_INDEX_PATH) -> str:
+    """Atomically write ``index`` to ``path`` and return the absolute path."""
+    full_path = _lexis_index_artifact_path(path)
+    artifact = {"format": LEXIS_INDEX_FORMAT, "source_hash": source_hash, "index": index}
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(artifact, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, full_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return full_path
+
+
 def build_lexis_index(lexis_df):
     """
     Build an index of lemmatized terms from the lexis database.
@@ -2071,6 +2592,9 @@ def build_lexis_index(lexis_df):
 
     Returns a dict mapping lemma -> list of term data rows
     (list because multiple terms might have same lemma)
+
+    Loads the precompiled artifact when it matches ``lexis_df``; otherwise
+    compiles the index and writes the artifact for the next worker.
     """
     global LEXIS_INDEX
 
@@ -2081,39 +2605,108 @@ def build_lexis_index(lexis_df):
         LEXIS_INDEX = {}
         return LEXIS_INDEX
 
-    index = {}
+    source_hash = _lexis_index_source_hash(lexis_df)
+    index = read_lexis_index_artifact(source_hash)
+    if index is None:
+        index = compile_lexis_index(lexis_df)
+        try:
+            write_lexis_index_artifact(index, source_hash)
+        except OSError as e:
+            print(f"Warning: could not write lexis index {LEXIS_INDEX_PATH}: {e}")
 
-    for _, row in lexis_df.iterrows():
-        term = row.get("term", "")
-        if not term or pd.isna(term):
-            continue
+    LEXIS_INDEX = index
+    return index
 
-        # Parse the term with spacy to get its lemma(s)
-        doc = nlp(term)
 
-        # For single-word terms, use the lemma
-        if len(doc) == 1:
-            lemma = doc[0].lemma_.lower()
-            if lemma not in index:
-                index[lemma] = []
-            # Flag terms that are capitalized in the CSV (e.g. "State", "Self")
-            # so we only match them when capitalized in the essay text
-            row = row.copy()
-            row["_require_cap"] = term[0].isupper() and term.lower() != term
-            index[lemma].append(row)
+def precompile_lexis_index(path: str = LEXIS_INDEX_PATH, force: bool = False) -> tuple[str, int, bool]:
+    """
+    Build step for the lexis index artifact (see build_lexis_index.py).
 
-        # For multi-word terms (e.g., "19th Amendment"), store the full phrase
-        else:
-            phrase_key = term.lower()
-            if phrase_key not in index:
-                index[phrase_key] = []
-            index[phrase_key].append(row)
+    Returns (artifact_path, entry_count, rebuilt). The artifact is left
+    alone when it already matches the CSV, unless ``force`` is set.
+    """
+    lexis_df = load_lexis_database()
+    if lexis_df.empty:
+        raise RuntimeError("Lexis database not found or invalid; nothing to compile.")
+    lexis_df = lexis_df[lexis_df["focus_type"].isin(DEFAULT_LEXIS_FOCUS_TYPES)]
+    source_hash = _lexis_index_source_hash(lexis_df)
+    index = None if force else read_lexis_index_artifact(source_hash, path)
+    if index is not None:
+        return _lexis_index_artifact_path(path), len(index), False
+    index = compile_lexis_index(lexis_df)
+    return write_lexis_index_artifact(index, source_hash, path), len(index), True
+
+
+class PhraseAutomaton:
+    """
+    Aho-Corasick automaton over a fixed set of phrases.
+
+    find_all(text) reports every occurrence of every phrase — overlapping
+    ones included — in one left-to-right scan, instead of one str.find()
+    loop per phrase.
+    """
+
+    def __init__(self, phrases):
+        self.phrases: list[str] = list(dict.fromkeys(p for p in phrases if p))
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]  # phrase indexes ending at each state
+
+        for idx, phrase in enumerate(self.phrases):
+            state = 0
+            for ch in phrase:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(idx)
+
+        # Breadth-first failure links; each state inherits the outputs of
+        # its failure state so suffix phrases are reported too.
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> dict[str, list[int]]:
+        """Map each phrase found in ``text`` to its start offsets, in ascending order."""
+        found: dict[str, list[int]] = {}
+        goto, fail, out, phrases = self._goto, self._fail, self._out, self.phrases
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for idx in out[state]:
+                phrase = phrases[idx]
+                found.setdefault(phrase, []).append(i - len(phrase) + 1)
+        for starts in found.values():
+            starts.sort()
+        return found
 
-    LEXIS_INDEX = index
-    return index
+
+_LEXIS_PHRASE_AUTOMATON: tuple[dict, PhraseAutomaton] | None = None
 
 
-def detect_lexis_in_text(text: str, focus_types: list[str] | None = None):
+def _lexis_phrase_automaton(lexis_index: dict) -> PhraseAutomaton:
+    """The multi-word keys of ``lexis_index`` compiled once into a PhraseAutomaton."""
+    global _LEXIS_PHRASE_AUTOMATON
+    if _LEXIS_PHRASE_AUTOMATON is None or _LEXIS_PHRASE_AUTOMATON[0] is not lexis_index:
+        automaton = PhraseAutomaton(key for key in lexis_index if " " in key)
+        _LEXIS_PHRASE_AUTOMATON = (lexis_index, automaton)
+    return _LEXIS_PHRASE_AUTOMATON[1]
+
+
+def detect_lexis_in_text(text: str, focus_types: list[str] | None = None, doc=None):
     """
     Detect lexis terms in the given text using lemmatization.
 
@@ -2125,6 +2718,7 @@ def detect_lexis_in_text(text: str, focus_types: list[str] | None = None):
         text: The text to analyze
         focus_types: Optional list of focus_types to include (e.g., ["concept", "device", "event"])
                     If None, includes all types except "general"
+        doc: Optional existing spaCy parse of text (skips re-parsing)
 
     Returns a list of detected terms with their metadata:
     [
@@ -2148,7 +2742,7 @@ def detect_lexis_in_text(text: str, focus_types: list[str] | None = None):
 
     # Default filter: exclude "general" type (too noisy)
     if focus_types is None:
-        focus_types = ["concept", "device", "event", "person"]
+        focus_types = DEFAULT_LEXIS_FOCUS_TYPES
 
     # Filter by focus_type
     if focus_types:
@@ -2161,20 +2755,17 @@ def detect_lexis_in_text(text: str, focus_types: list[str] | None = None):
     lexis_index = build_lexis_index(lexis_df)
 
     # Parse the document with spacy
-    doc = nlp(text)
+    if doc is None:
+        doc = parse_text(text, "lemma")
 
     detected_terms = {}  # term -> term_data (to deduplicate)
 
-    # Check for multi-word phrases first (like "19th Amendment")
+    # Check for multi-word phrases first (like "19th Amendment"): one
+    # automaton scan finds them all, then walk them in index order.
+    phrase_hits = _lexis_phrase_automaton(lexis_index).find_all(text.lower())
     for phrase_key in lexis_index.keys():
-        if " " in phrase_key:  # Multi-word term
-            phrase_lower = phrase_key.lower()
-            start = 0
-            while True:
-                pos = text.lower().find(phrase_lower, start)
-                if pos == -1:
-                    break
-
+        if phrase_key in phrase_hits:
+            for pos in phrase_hits[phrase_key]:
                 # Check word boundaries
                 before_ok = (pos == 0 or not text[pos - 1].isalnum())
                 after_ok = (pos + len(phrase_key) >= len(text) or
@@ -2194,21 +2785,19 @@ def detect_lexis_in_text(text: str, focus_types: list[str] | None = None):
                                 "count": 0,
                             }
                             # Add optional fields if present
-                            for field in ["etymology", "derivations", "roots",
+                            for col in ["etymology", "derivations", "roots",
                                         "part_of_speech",
                                         "application", "application_default",
                                         "exploration", "exploration_default",
                                         "quote", "author", "source_major",
                                         "linked_lexis", "assign_lexis"]:
-                                val = row.get(field)
+                                val = row.get(col)
                                 if val and not pd.isna(val):
-                                    detected_terms[term][field] = val
+                                    detected_terms[term][col] = val
 
                         detected_terms[term]["positions"].append((pos, pos + len(phrase_key)))
                         detected_terms[term]["count"] += 1
 
-                start = pos + 1
-
     # Check single-word terms using lemmatization
     for token in doc:
         # Skip punctuation and whitespace
@@ -2238,15 +2827,15 @@ def detect_lexis_in_text(text: str, focus_types: list[str] | None = None):
                         "count": 0,
                     }
                     # Add optional fields if present
-                    for field in ["etymology", "derivations", "roots",
+                    for col in ["etymology", "derivations", "roots",
                                 "part_of_speech",
                                 "application", "application_default",
                                 "exploration", "exploration_default",
                                 "quote", "author", "source_major",
                                 "linked_lexis", "assign_lexis"]:
-                        val = row.get(field)
+                        val = row.get(col)
                         if val and not pd.isna(val):
-                            detected_terms[term][field] = val
+                            detected_terms[term][col] = val
 
                 # Add position (character span)
                 start_char = token.idx
@@ -2276,23 +2865,14 @@ def canonical_device_key(tok):
     """
     # Check multi-word phrases first (before single-token logic)
     # This allows detection of phrases like "rhetorical question" starting at "rhetorical"
-    doc = tok.doc
-    i = tok.i
-    
-    # Iterate from max length down to 2 (minimum multi-word phrase)
-    for length in range(THESIS_MULTIWORD_MAX_LEN, 1, -1):
-        # Guard against running past the end of the doc
-        if i + length > len(doc):
-            continue
-        
-        # Build a tuple of lowercased text from doc[i:i+length]
-        phrase_tokens = tuple(doc[j].text.lower() for j in range(i, i + length))
-        
-        # Check if this phrase exists in our multi-word synonyms
-        if phrase_tokens in THESIS_MULTIWORD_SYNONYMS:
-            return THESIS_MULTIWORD_SYNONYMS[phrase_tokens]
-    
-    # Fall back to existing single-token matching logic
+    phrase = match_multiword_device(tok.doc, tok.i)
+    if phrase is not None:
+        return phrase[0]
+    return _single_token_device_key(tok)
+
+
+def _single_token_device_key(tok):
+    """canonical_device_key() without the multi-word phrase check."""
     lemma = tok.lemma_.lower()
     lower = tok.text.lower()
 
@@ -2316,9 +2896,9 @@ def iter_device_spans(doc, start_char: int | None = None, end_char: int | None =
     Yield (canonical_device_key, span_start, span_end) for each thesis device
     in the given character range of `doc`.
 
-    - Uses THESIS_MULTIWORD_SYNONYMS and THESIS_MULTIWORD_MAX_LEN to detect
-      multi-word devices like 'false dilemma' and 'rhetorical question' as
-      single units.
+    - Uses THESIS_MULTIWORD_TRIE (compiled from THESIS_MULTIWORD_SYNONYMS) to
+      detect multi-word devices like 'false dilemma' and 'rhetorical question'
+      as single units, in one pass over the tokens.
 
     - Falls back to single-token detection via canonical_device_key for
       simple devices.
@@ -2343,30 +2923,18 @@ def iter_device_spans(doc, start_char: int | None = None, end_char: int | None =
             i += 1
             continue
 
-        # Try multi-word match first, from longest to shortest
-        matched = False
-        for length in range(THESIS_MULTIWORD_MAX_LEN, 1, -1):
-            if i + length > n:
-                continue
-            phrase_tokens = doc[i:i+length]
-            span_start_char = phrase_tokens[0].idx
-            span_end_char = phrase_tokens[-1].idx + len(phrase_tokens[-1].text)
-            # If phrase lies outside requested range, skip
-            if span_end_char <= start_char or span_start_char >= end_char:
-                continue
-            phrase_key = tuple(t.text.lower() for t in phrase_tokens)
-            if phrase_key in THESIS_MULTIWORD_SYNONYMS:
-                canonical = THESIS_MULTIWORD_SYNONYMS[phrase_key]
-                yield canonical, span_start_char, span_end_char
-                i += length
-                matched = True
-                break
-
-        if matched:
+        # Longest multi-word match first. The token already overlaps the
+        # requested range, so any phrase starting here does too.
+        phrase = match_multiword_device(doc, i)
+        if phrase is not None:
+            canonical, length = phrase
+            last = doc[i + length - 1]
+            yield canonical, tok.idx, last.idx + len(last.text)
+            i += length
             continue
 
         # Single-token fallback
-        canonical = canonical_device_key(tok)
+        canonical = _single_token_device_key(tok)
         if canonical is not None:
             span_start_char = tok.idx
             span_end_char = tok.idx + len(tok.text)
@@ -2614,54 +3182,101 @@ GENRE_PATTERN = re.compile(
 
 TITLE_QUOTE_PATTERN = re.compile(r'[\"“”][^\"“”]+[\"“”]')
 
-# Ordered device/strategy lemmas extracted from the thesis sentence
-THESIS_DEVICE_SEQUENCE = []
+MAX_EXAMPLES_PER_LABEL = 10
 
-# Will hold the ordered list of thesis topics (device/strategy lemmas)
-THESIS_TOPIC_ORDER = []
 
-# All device/strategy lemmas that appear anywhere in the thesis sentence
-THESIS_ALL_DEVICE_KEYS = set()
+@dataclass
+class MarkingContext:
+    """
+    Per-essay state shared by run_marker, analyze_text and apply_marks.
 
-# Noun lemmas from the thesis sentence — exempt from the Noun repetition
-# rule so a student's chosen key terms (e.g. "freedom" in a freedom thesis)
-# aren't punished for being central to the argument. Populated during intro
-# paragraph processing once the thesis sentence is identified.
-THESIS_NOUN_LEMMAS: set = set()
+    One context is created per marking call and threaded through the
+    pipeline, so concurrent marks in the same process (threads, or an
+    executor inside one worker) never see each other's thesis, examples
+    or counters. Nothing in here outlives a single essay.
+    """
+    # Ordered device/strategy lemmas extracted from the thesis sentence
+    thesis_device_sequence: list[str] = field(default_factory=list)
 
-# New: raw thesis paragraph text (lowercased) for simple substring checks
-THESIS_TEXT_LOWER: str = ""
+    # Will hold the ordered list of thesis topics (device/strategy lemmas)
+    thesis_topic_order: list[str] = field(default_factory=list)
 
-# The full thesis sentence (not lowercased) for dynamic guidance placeholders
-THESIS_TEXT: str = ""
+    # All device/strategy lemmas that appear anywhere in the thesis sentence
+    thesis_all_device_keys: set[str] = field(default_factory=set)
 
-# New global state for body paragraph indexing and bridge detection
-BODY_PARAGRAPH_COUNT = 0
-BRIDGE_PARAGRAPHS = set()
-BRIDGE_DEVICE_KEYS: dict[int, set[str]] = {}
+    # Noun lemmas from the thesis sentence — exempt from the Noun repetition
+    # rule so a student's chosen key terms (e.g. "freedom" in a freedom thesis)
+    # aren't punished for being central to the argument. Populated during intro
+    # paragraph processing once the thesis sentence is identified.
+    thesis_noun_lemmas: set[str] = field(default_factory=set)
 
-# Foundation Assignment 4 — Track thesis location for assignment-completion rule
-THESIS_PARAGRAPH_INDEX = None
-THESIS_ANCHOR_POS = None
+    # Raw thesis paragraph text (lowercased) for simple substring checks
+    thesis_text_lower: str = ""
 
-# Global state for collecting example sentences per label
-DOC_EXAMPLES = []
-DOC_EXAMPLE_COUNTS = {}  # dict: label -> int (count of examples stored for this label)
-DOC_EXAMPLE_SENT_HASHES = set()  # set of tuples: (label, md5(sentence)) for deduplication
-MAX_EXAMPLES_PER_LABEL = 10
+    # The full thesis sentence (not lowercased) for dynamic guidance placeholders
+    thesis_text: str = ""
+
+    # Body paragraph indexing and bridge detection
+    body_paragraph_count: int = 0
+    bridge_paragraphs: set[int] = field(default_factory=set)
+    bridge_device_keys: dict[int, set[str]] = field(default_factory=dict)
+
+    # Foundation Assignment 4 — Track thesis location for assignment-completion rule
+    thesis_paragraph_index: int | None = None
+    thesis_anchor_pos: int | None = None
+
+    # Foundation Assignment 1 — position of the last piece of extra content
+    # (extra sentence or extra paragraph) so we can attach a single yellow
+    # label at the very end of all red-struck content.
+    # Format: (paragraph_index, char_position_in_flat_text) or None
+    foundation1_label_target: tuple[int, int] | None = None
+
+    # Counter so bookmark IDs are unique in the document
+    bookmark_id_counter: int = 1
+
+    # Labels allowed to render (rules sheet + INLINE_LABEL_ALLOWLIST);
+    # None means "don't filter".
+    approved_labels: set[str] | None = None
+
+    # Example sentences per label
+    examples: list[dict] = field(default_factory=list)
+    example_counts: dict[str, int] = field(default_factory=dict)  # label -> count of examples stored
+    example_sent_hashes: set[tuple[str, str]] = field(default_factory=set)  # (label, md5(sentence)) for dedup
 
-# Global state for sentence type classification per paragraph
-DOC_SENTENCE_TYPES = {}  # { paragraph_index: [{"type": str, "text": str}, ...] }
+    # Sentence type classification per paragraph
+    sentence_types: dict[int, list[dict]] = field(default_factory=dict)  # { paragraph_index: [{"type", "text"}, ...] }
 
-# Global state for first-sentence component detection
-DOC_FIRST_SENTENCE_COMPONENTS = None  # dict with has_author, has_title, has_genre, has_summary_verb, missing
+    # First-sentence component detection
+    first_sentence_components: dict | None = None  # has_author, has_title, has_genre, has_summary_verb, missing
 
-# Global state for noun repetition detection
-DOC_REPEATED_NOUNS = []  # list of { "lemma": str, "count": int, "forms": [str] }
-DOC_TOTAL_WORD_COUNT = 0  # total word count across all real paragraphs
+    # Noun repetition detection
+    repeated_nouns: list[dict] = field(default_factory=list)  # [{ "lemma": str, "count": int, "forms": [str] }]
+    total_word_count: int = 0  # total word count across all real paragraphs
 
-# Global state for issue metadata (replaces the old summary table serialization)
-DOC_ISSUES_METADATA = []  # list of {"label": str, "explanation": str, "count": int}
+    # Issue metadata (replaces the old summary table serialization)
+    issues_metadata: list[dict] = field(default_factory=list)  # [{"label", "explanation", "count"}]
+
+    # Parse-once view of the original essay (set by mark_docx_bytes;
+    # run_marker creates an empty one on the CLI path).
+    analysis: "EssayAnalysis | None" = None
+
+    # LanguageTool matches by exact paragraph text: carried over from an
+    # earlier check of the same essay, and everything checked in this mark.
+    grammar_reuse: dict[str, list] = field(default_factory=dict)
+    grammar_matches: dict[str, list] = field(default_factory=dict)
+    # Matches from the whole-essay batched check (prefetch_grammar)
+    grammar_prefetched: dict[str, list] = field(default_factory=dict)
+    # Paragraphs that got / missed their LanguageTool check, and the time
+    # spent in LanguageTool calls against LT_BUDGET_SECONDS
+    grammar_checked: int = 0
+    grammar_skipped: int = 0
+    grammar_seconds: float = 0.0
+
+    # Per-paragraph analyze_text results (see analyze_paragraph): carried
+    # over from an earlier check of the same essay, and everything used or
+    # recorded in this mark (None: don't record).
+    marks_reuse: dict[str, bytes] = field(default_factory=dict)
+    paragraph_marks: dict[str, bytes] | None = None
 
 
 def _is_hidden_paragraph(p) -> bool:
@@ -2740,9 +3355,38 @@ def extract_thesis_topics(thesis_tokens):
     return topics
 
 
-def compute_quote_spans(text: str):
+class QuoteSpans(tuple):
+    """
+    Sorted, non-overlapping (start, end) quote interiors with O(log n) lookups.
+
+    Behaves like the plain list of spans it replaces (iteration, indexing,
+    len), so existing callers keep working; pos_in_spans() bisects instead of
+    scanning when it is handed one.
     """
-    Returns a list of (start, end) spans of all text inside quotes (exclusive of the quote marks).
+
+    def __new__(cls, spans=()):
+        self = super().__new__(cls, spans)
+        self._starts = [start for start, _ in self]
+        return self
+
+    def find(self, pos: int, inclusive: bool = True) -> tuple[int, int] | None:
+        """The span holding ``pos`` (end included unless ``inclusive`` is False), or None."""
+        i = bisect_right(self._starts, pos) - 1
+        if i < 0:
+            return None
+        start, end = self[i]
+        if pos < end or (inclusive and pos == end):
+            return start, end
+        return None
+
+    def contains(self, pos: int) -> bool:
+        return self.find(pos) is not None
+
+
+def compute_quote_spans(text: str) -> QuoteSpans:
+    """
+    Returns the (start, end) spans of all text inside quotes (exclusive of the quote marks),
+    in order, as a QuoteSpans.
     Handles nested quotes, mismatches, labels added after marking, and arbitrary run splitting.
     """
     spans = []
@@ -2763,7 +3407,7 @@ def compute_quote_spans(text: str):
             in_quote = False
             start = None
         i += 1
-    return spans
+    return QuoteSpans(spans)
 
 
 def pos_in_spans(pos, spans):
@@ -2771,9 +3415,21 @@ def pos_in_spans(pos, spans):
     Check if a position is inside any of the given spans.
     Returns True if pos is within [start, end] (inclusive) of any span.
     """
+    if isinstance(spans, QuoteSpans):
+        return spans.contains(pos)
     return any(start <= pos <= end for start, end in spans)
 
 
+_SENTENCE_END_RE = re.compile(r"[.?!]")
+
+
+def sentence_ends_outside_quotes(text: str, quote_spans, start: int = 0):
+    """Yield, in order, the indices of . ? ! in text[start:] that lie outside quote_spans."""
+    for m in _SENTENCE_END_RE.finditer(text, start):
+        if not pos_in_spans(m.start(), quote_spans):
+            yield m.start()
+
+
 def is_a_before_yoo_exception(next_word_lower: str) -> bool:
     # Common /juː/ ("yoo") starts where "a" is correct.
     if not next_word_lower:
@@ -2798,7 +3454,7 @@ def is_an_before_silent_h_exception(next_word_lower: str) -> bool:
     return next_word_lower.startswith(("honest", "hour", "heir", "honor", "herb"))
 
 
-def compute_topic_sentence_span(flat_text: str, quote_spans: list) -> tuple[int, int]:
+def compute_topic_sentence_span(flat_text: str, quote_spans: list, doc=None) -> tuple[int, int]:
     """
     Compute the topic sentence span for a body paragraph using character offsets.
     
@@ -2810,6 +3466,7 @@ def compute_topic_sentence_span(flat_text: str, quote_spans: list) -> tuple[int,
     Args:
         flat_text: The flattened paragraph text
         quote_spans: List of (start, end) tuples for quote spans (exclusive of quote marks)
+        doc: Optional existing spaCy parse of flat_text, used by the fallback
     
     Returns:
         (topic_start, topic_end) character offsets
@@ -2823,20 +3480,16 @@ def compute_topic_sentence_span(flat_text: str, quote_spans: list) -> tuple[int,
         # Empty paragraph
         return (0, len(flat_text))
     
-    # Scan forward for first . ? ! outside quotes
-    topic_end = None
-    for i in range(topic_start, len(flat_text)):
-        ch = flat_text[i]
-        if ch in {'.', '?', '!'}:
-            # Check if this punctuation is inside any quote span
-            if not pos_in_spans(i, quote_spans):
-                topic_end = i + 1  # Include the punctuation
-                break
+    # First . ? ! outside quotes (include the punctuation)
+    topic_end = next(sentence_ends_outside_quotes(flat_text, quote_spans, topic_start), None)
+    if topic_end is not None:
+        topic_end += 1
     
     # Fallback: if no sentence-ending punctuation found outside quotes,
     # use the first spaCy sentence as a safety net
     if topic_end is None:
-        doc = nlp(flat_text)
+        if doc is None:
+            doc = nlp(flat_text)
         if doc.sents:
             first_sent = next(doc.sents)
             topic_end = first_sent.end_char
@@ -2934,8 +3587,26 @@ def run_is_italic(run) -> bool:
     return False
 
 
+# Parsed rules workbook, keyed by absolute path -> (mtime, DataFrame).
+# load_rules and the guidance/explanation loaders below all read the same
+# sheet, so one mark used to open the .xlsx five times. Re-read only when
+# the file changes on disk.
+_RULES_SHEET_CACHE: dict[str, tuple[float, pd.DataFrame]] = {}
+
+
+def _read_rules_sheet(excel_path) -> pd.DataFrame:
+    path = os.path.abspath(excel_path)
+    mtime = os.path.getmtime(path)
+    cached = _RULES_SHEET_CACHE.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, pd.read_excel(path, header=None))
+        _RULES_SHEET_CACHE[path] = cached
+    # Callers mutate their frame in place; hand out a copy.
+    return cached[1].copy()
+
+
 def load_rules(excel_path):
-    df = pd.read_excel(excel_path, header=None)
+    df = _read_rules_sheet(excel_path)
     df = df.dropna(subset=[0, 1])
     df[0] = df[0].astype(str).str.strip()
     df[1] = df[1].astype(str).str.strip()
@@ -2943,7 +3614,7 @@ def load_rules(excel_path):
 
 
 def load_student_guidance(excel_path) -> dict[str, str]:
-    df = pd.read_excel(excel_path, header=None)
+    df = _read_rules_sheet(excel_path)
     if df.shape[1] < 3:
         return {}
     df = df.dropna(subset=[0, 2])
@@ -2962,7 +3633,7 @@ def load_student_guidance(excel_path) -> dict[str, str]:
 
 
 def load_short_explanations(excel_path) -> dict[str, str]:
-    df = pd.read_excel(excel_path, header=None)
+    df = _read_rules_sheet(excel_path)
     if df.shape[1] < 4:
         return {}
     df = df.dropna(subset=[0, 3])
@@ -2977,7 +3648,7 @@ def load_short_explanations(excel_path) -> dict[str, str]:
 
 def load_shared_issues(excel_path) -> dict[str, str]:
     """Column 4: internal_label → shared (generalized) label for user-facing output."""
-    df = pd.read_excel(excel_path, header=None)
+    df = _read_rules_sheet(excel_path)
     if df.shape[1] < 5:
         return {}
     df = df.dropna(subset=[0, 4])
@@ -2992,7 +3663,7 @@ def load_shared_issues(excel_path) -> dict[str, str]:
 
 def load_shared_explanations(excel_path) -> dict[str, str]:
     """Column 5: internal_label → shared (generalized) explanation for user-facing output."""
-    df = pd.read_excel(excel_path, header=None)
+    df = _read_rules_sheet(excel_path)
     if df.shape[1] < 6:
         return {}
     df = df.dropna(subset=[0, 5])
@@ -3141,6 +3812,45 @@ def flatten_paragraph_without_labels(paragraph):
     return flat_text, segments
 
 
+def known_name_spans(flat_text, known_names) -> list[tuple[int, int]]:
+    """Every case-insensitive occurrence of each known name in flat_text, sorted."""
+    text_lower = flat_text.lower()
+    spans: list[tuple[int, int]] = []
+    for name in known_names or ():
+        if not name:
+            continue
+        name_lower = name.lower()
+        start = 0
+        while True:
+            idx = text_lower.find(name_lower, start)
+            if idx == -1:
+                break
+            spans.append((idx, idx + len(name)))
+            start = idx + 1
+    spans.sort()
+    return spans
+
+
+class _ProtectedBoundaries:
+    """
+    "Does any protected span satisfy ps < pos < pe?" for non-decreasing pos,
+    in one pass over the sorted spans (the furthest end among spans that
+    start before pos answers it).
+    """
+
+    def __init__(self, spans):
+        self._spans = spans
+        self._next = 0
+        self._reach = -1
+
+    def __call__(self, pos: int) -> bool:
+        spans = self._spans
+        while self._next < len(spans) and spans[self._next][0] < pos:
+            self._reach = max(self._reach, spans[self._next][1])
+            self._next += 1
+        return self._reach > pos
+
+
 def merge_sentences_around_known_names(sentences, flat_text, known_names):
     """Merge sentences that were split within a known author or title name.
 
@@ -3148,55 +3858,98 @@ def merge_sentences_around_known_names(sentences, flat_text, known_names):
     boundary, the author's full name gets split across two sentences.  This
     post-processing step finds exact occurrences of *known_names* in
     *flat_text* and merges any sentence boundary that falls inside one of
-    those spans.
+    those spans. (spacy_parse(known_names=...) does the same inside its
+    own sweep.)
     """
     if not known_names or not sentences:
         return sentences
 
-    text_lower = flat_text.lower()
-    protected_spans: list[tuple[int, int]] = []
-    for name in known_names:
-        if not name:
+    protected_spans = known_name_spans(flat_text, known_names)
+    if not protected_spans:
+        return sentences
+
+    boundary_in_protected = _ProtectedBoundaries(protected_spans)
+    merged: list[tuple[int, int]] = []
+    s_start, s_end = sentences[0]
+    for next_start, next_end in sentences[1:]:
+        if boundary_in_protected(s_end):
+            s_end = next_end
+        else:
+            merged.append((s_start, s_end))
+            s_start, s_end = next_start, next_end
+    merged.append((s_start, s_end))
+    return merged
+
+
+def token_starts(doc) -> list[int]:
+    """Character offset of every token in ``doc``, computed once per Doc object."""
+    starts = doc.user_data.get("vysti_token_starts")
+    if starts is None or len(starts) != len(doc):
+        starts = [t.idx for t in doc]
+        doc.user_data["vysti_token_starts"] = starts
+    return starts
+
+
+def token_span(doc, start: int, end: int | None = None):
+    """
+    doc[i:j] holding exactly the tokens with start <= tok.idx < end (or every
+    token from ``start`` on when end is None), found by bisecting
+    token_starts() instead of walking the whole Doc.
+    """
+    starts = token_starts(doc)
+    i = bisect_left(starts, start)
+    j = len(starts) if end is None else max(i, bisect_left(starts, end))
+    return doc[i:j]
+
+
+_MISSING_SPACE_RE = re.compile(r"[.?!](?=\S)")
+
+
+def _missing_space_cuts(text: str) -> list[int]:
+    """
+    Offsets just after a . ? ! that runs straight into an uppercase letter
+    ("sentence.Next"), except after single-letter abbreviations like "U.S.".
+    """
+    cuts = []
+    for m in _MISSING_SPACE_RE.finditer(text):
+        i = m.start()
+        nxt = text[i + 1]
+        if not (nxt.isalpha() and nxt.isupper()):
             continue
-        name_lower = name.lower()
-        start = 0
-        while True:
-            idx = text_lower.find(name_lower, start)
-            if idx == -1:
-                break
-            protected_spans.append((idx, idx + len(name)))
-            start = idx + 1
+        # Don't split if period follows a single letter (abbreviation/acronym)
+        if text[i] == "." and i >= 1 and text[i - 1].isalpha() and (i < 2 or not text[i - 2].isalpha()):
+            continue
+        cuts.append(i + 1)
+    return cuts
 
-    if not protected_spans:
-        return sentences
 
-    merged: list[tuple[int, int]] = []
-    i = 0
-    while i < len(sentences):
-        s_start, s_end = sentences[i]
-        while i + 1 < len(sentences):
-            boundary_in_protected = any(
-                ps < s_end < pe for ps, pe in protected_spans
-            )
-            if boundary_in_protected:
-                _, next_end = sentences[i + 1]
-                s_end = next_end
-                i += 1
-            else:
-                break
-        merged.append((s_start, s_end))
-        i += 1
-    return merged
+def _ends_with_single_letter_abbrev(text: str, start: int, end: int) -> bool:
+    """
+    True when text[start:end] ends with a lone letter and a period ("F.",
+    "U. "): the start of the range or whitespace or "." before the letter,
+    only whitespace after the period.
+    """
+    e = end
+    while e > start and text[e - 1].isspace():
+        e -= 1
+    if e - start < 2 or text[e - 1] != "." or not ("A" <= text[e - 2] <= "Z" or "a" <= text[e - 2] <= "z"):
+        return False
+    return e - 2 == start or text[e - 3].isspace() or text[e - 3] == "."
 
 
-def spacy_parse(text):
+def spacy_parse(text, doc=None, known_names=None):
     """
     Returns:
         doc  -> spaCy Doc object
         tokens -> list of (token.text, start_char, end_char)
         sentences -> list of (sent.start_char, sent.end_char)
+
+    Pass ``doc`` to reuse an existing parse of exactly ``text``. Sentence
+    boundaries inside any of ``known_names`` (author names, titles) are
+    merged, as merge_sentences_around_known_names would.
     """
-    doc = nlp(text)
+    if doc is None:
+        doc = cached_parse(text)
     tokens = [(t.text, t.idx, t.idx + len(t.text)) for t in doc]
 
     raw_sentences = [(s.start_char, s.end_char) for s in doc.sents]
@@ -3206,10 +3959,7 @@ def spacy_parse(text):
 
     def _quote_span_for_pos(pos: int):
         # compute_quote_spans returns interior spans (start..end) where end is the closing quote index
-        for qs, qe in quote_spans:
-            if qs <= pos <= (qe - 1):
-                return (qs, qe)
-        return None
+        return quote_spans.find(pos, inclusive=False)
 
     def _should_merge_at_boundary(boundary_pos: int) -> bool:
         if boundary_pos < 0 or boundary_pos >= len(text):
@@ -3238,62 +3988,147 @@ def spacy_parse(text):
         nxt = text[j]
         return (nxt in {",", ";", ":", ")", "]"} or nxt.islower() or nxt.isdigit())
 
-    # Merge pass 1: merge sentences split inside double quotes
-    if len(raw_sentences) >= 2:
-        merged = []
-        cur_start, cur_end = raw_sentences[0]
-        for ns, ne in raw_sentences[1:]:
-            boundary_pos = cur_end - 1
-            if _should_merge_at_boundary(boundary_pos):
-                cur_end = ne
-            else:
-                merged.append((cur_start, cur_end))
-                cur_start, cur_end = ns, ne
-        merged.append((cur_start, cur_end))
-        raw_sentences = merged
-
-    # Merge pass 2: merge sentences split on single-letter abbreviations.
-    # Catches initials ("F." in "John F. Kennedy") and acronym components
-    # ("U." in "U.S.") that spaCy may incorrectly treat as sentence endings.
-    _single_letter_end_re = re.compile(r"(?:^|[\s.])[A-Za-z]\.\s*$")
-    if len(raw_sentences) >= 2:
-        merged2 = []
+    # One left-to-right sweep over the spaCy boundaries. A boundary is
+    # merged away when it falls inside double quotes (pass 1) or right after
+    # a single-letter abbreviation such as "F." or "U." (pass 2); each
+    # resulting sentence is then cut where . ? ! runs straight into an
+    # uppercase letter ("sentence.Next"); and cuts landing inside a known
+    # author/title name are merged back.
+    missing_space_cuts = _missing_space_cuts(text)
+    boundary_in_name = _ProtectedBoundaries(known_name_spans(text, known_names))
+    sentences: list[tuple[int, int]] = []
+    pending: list[int] | None = None
+
+    def _emit(start: int, end: int) -> None:
+        nonlocal pending
+        if pending is not None and boundary_in_name(pending[1]):
+            pending[1] = end
+            return
+        if pending is not None:
+            sentences.append((pending[0], pending[1]))
+        pending = [start, end]
+
+    def _emit_split(start: int, end: int) -> None:
+        cur_start = start
+        lo = bisect_left(missing_space_cuts, start + 1)
+        hi = bisect_right(missing_space_cuts, end - 1)
+        for cut_end in missing_space_cuts[lo:hi]:
+            _emit(cur_start, cut_end)
+            cur_start = cut_end
+        if cur_start < end:
+            _emit(cur_start, end)
+
+    if raw_sentences:
         cur_start, cur_end = raw_sentences[0]
         for ns, ne in raw_sentences[1:]:
-            sent_text = text[cur_start:cur_end]
-            if _single_letter_end_re.search(sent_text):
+            if _should_merge_at_boundary(cur_end - 1) or _ends_with_single_letter_abbrev(text, cur_start, cur_end):
                 cur_end = ne
             else:
-                merged2.append((cur_start, cur_end))
+                _emit_split(cur_start, cur_end)
                 cur_start, cur_end = ns, ne
-        merged2.append((cur_start, cur_end))
-        raw_sentences = merged2
+        _emit_split(cur_start, cur_end)
+    if pending is not None:
+        sentences.append((pending[0], pending[1]))
 
-    sentences: list[tuple[int, int]] = []
+    return doc, tokens, sentences
 
-    for s_start, s_end in raw_sentences:
-        cur_start = s_start
-        i = s_start
-        # Look for . ? ! immediately followed by an uppercase letter with no space
-        # (catches missing spaces like "sentence.Next") but skip single-letter
-        # abbreviations like "U.S." where the period follows a single letter.
-        while i < s_end - 1:
-            ch = text[i]
-            nxt = text[i + 1]
-            if ch in ".?!" and not nxt.isspace() and nxt.isalpha() and nxt.isupper():
-                # Don't split if period follows a single letter (abbreviation/acronym)
-                if ch == "." and i >= 1 and text[i - 1].isalpha() and (i < 2 or not text[i - 2].isalpha()):
-                    i += 1
-                    continue
-                cut_end = i + 1
-                if cur_start < cut_end:
-                    sentences.append((cur_start, cut_end))
-                cur_start = cut_end
-            i += 1
-        if cur_start < s_end:
-            sentences.append((cur_start, s_end))
 
-    return doc, tokens, sentences
+# ── Parse-once essay analysis ──────────────────────────────────────────
+
+class EssayAnalysis:
+    """
+    The original (unmarked) essay plus every spaCy parse made of it during
+    one mark_docx_bytes (or run_marker) call.
+
+    The docx is read once, and parses are memoized by exact text: lexis
+    detection, positive events and the techniques list all look at the
+    same full-essay text, so they now share one Doc (and one device scan)
+    instead of calling nlp() three times. run_marker batch-parses the
+    paragraphs with parse_many before analyze_text asks for them.
+    Memoizing by exact text keeps results identical to calling nlp()
+    directly — a paragraph whose text has been mutated by earlier marking
+    is simply a different key.
+    """
+
+    def __init__(self, paragraphs: list[str] | None = None):
+        # Raw .text of every non-blank paragraph, in document order
+        self.paragraphs = paragraphs or []
+        self._docs: dict[tuple[str, str], "spacy.tokens.Doc"] = {}
+        self._device_spans: dict[str, list[tuple[str, int, int]]] = {}
+        self._guesses: dict | None = None
+
+    @classmethod
+    def from_docx_bytes(cls, docx_bytes: bytes) -> "EssayAnalysis":
+        document = Document(BytesIO(docx_bytes))
+        return cls([p.text for p in document.paragraphs if p.text and p.text.strip()])
+
+    @property
+    def full_text(self) -> str:
+        """Stripped paragraphs joined by newlines (lexis, positive events, guessing)."""
+        return "\n".join(p.strip() for p in self.paragraphs)
+
+    @property
+    def raw_full_text(self) -> str:
+        """Unstripped paragraphs joined by newlines (techniques list)."""
+        return "\n".join(self.paragraphs).strip()
+
+    def doc(self, text: str, profile: str = "full"):
+        """cached_parse(text, profile), parsed at most once per distinct text.
+
+        A "full" parse of the same text satisfies any lighter profile.
+        """
+        doc = self._docs.get((profile, text))
+        if doc is None and profile != "full":
+            doc = self._docs.get(("full", text))
+        if doc is None:
+            doc = self._docs[(profile, text)] = cached_parse(text, profile)
+        return doc
+
+    def parse_many(
+        self,
+        texts,
+        profile: str = "full",
+        batch_size: int = SPACY_PIPE_BATCH_SIZE,
+        n_process: int = SPACY_PIPE_N_PROCESS,
+    ) -> None:
+        """Parse every not-yet-seen text in one nlp.pipe batch so later doc() calls are memo hits.
+
+        Texts already in the parse cache (unchanged since an earlier mark)
+        are restored from it and left out of the batch.
+        """
+        cache = get_parse_cache()
+        pending = []
+        for text in dict.fromkeys(texts):
+            if (profile, text) in self._docs:
+                continue
+            doc = cache.get(text, profile)
+            if doc is not None:
+                self._docs[(profile, text)] = doc
+            else:
+                pending.append(text)
+        if not pending:
+            return
+        docs = nlp.pipe(
+            pending,
+            batch_size=batch_size,
+            n_process=min(n_process, len(pending)),
+            disable=_profile_disable(profile),
+        )
+        for text, doc in zip(pending, docs):
+            self._docs[(profile, text)] = doc
+            cache.put(text, doc, profile)
+
+    def device_spans(self, text: str) -> list[tuple[str, int, int]]:
+        """list(iter_device_spans(doc(text, "lemma"))), computed once per text."""
+        spans = self._device_spans.get(text)
+        if spans is None:
+            spans = self._device_spans[text] = list(iter_device_spans(self.doc(text, "lemma")))
+        return spans
+
+    def guess_author_and_title(self) -> dict:
+        if self._guesses is None:
+            self._guesses = guess_author_and_title(self.full_text)
+        return dict(self._guesses)
 
 
 def classify_sentence_type(doc, sent_start: int, sent_end: int) -> str:
@@ -3307,7 +4142,7 @@ def classify_sentence_type(doc, sent_start: int, sent_end: int) -> str:
       - compound-complex: both compound and complex features
       - simple: none of the above
     """
-    sent_tokens = [t for t in doc if sent_start <= t.idx < sent_end]
+    sent_tokens = token_span(doc, sent_start, sent_end)
     if not sent_tokens:
         return "simple"
 
@@ -3343,7 +4178,7 @@ def should_flag_sentence_initial_this(doc, s_start, s_end, tok_start) -> bool:
     Return True when sentence-initial "This" behaves like a vague pronoun.
     If a NOUN/PROPN appears before the first VERB/AUX (or before ,/;), do not flag.
     """
-    sent_tokens = [t for t in doc if s_start <= t.idx < s_end]
+    sent_tokens = list(token_span(doc, s_start, s_end))
     this_index = None
     for i, t in enumerate(sent_tokens):
         if t.idx == tok_start:
@@ -3458,7 +4293,7 @@ WEAK_TRANSITIONS_SINGLE = [
 def _build_weak_transition_lemmas() -> set[str]:
     lemmas: set[str] = set()
     for phrase in WEAK_TRANSITIONS_MULTI + WEAK_TRANSITIONS_SINGLE:
-        for tok in nlp(phrase):
+        for tok in parse_text(phrase, "lemma"):
             if tok.is_space or tok.is_punct:
                 continue
             lemma = tok.lemma_.lower().strip()
@@ -3477,11 +4312,7 @@ def extract_content_lemmas(doc, start_char, end_char, extra_exclude=None) -> set
         exclude |= {lemma for lemma in extra_exclude if lemma}
 
     lemmas: set[str] = set()
-    for tok in doc:
-        if tok.idx < start_char:
-            continue
-        if tok.idx >= end_char:
-            break
+    for tok in token_span(doc, start_char, end_char):
         if tok.is_stop or tok.is_punct or tok.is_space:
             continue
         if tok.pos_ not in CONTENT_POS:
@@ -3572,7 +4403,7 @@ def compute_teacher_title_spans(flat_text: str, config: MarkerConfig | None) ->
             continue
 
         # Match the teacher title text in a case-insensitive way
-        pattern = re.compile(re.escape(title_text), re.IGNORECASE)
+        pattern = _title_regex(title_text)
 
         for m in pattern.finditer(flat_text):
             start, end = m.start(), m.end()
@@ -3652,7 +4483,7 @@ def collect_text_title_format_marks(
             continue
         if title_key in labels_used:
             continue
-        pattern = re.compile(re.escape(title_text), re.IGNORECASE)
+        pattern = _title_regex(title_text)
 
         # IMPORTANT: we want to skip clearly non-title uses where the matched
         # substring is entirely lowercase (e.g. "young hunger" used as evidence).
@@ -3818,6 +4649,241 @@ def collect_text_title_format_marks(
     return marks
 
 
+# ── Compiled rule patterns ──────────────────────────────────────────────
+# Every static pattern analyze_text scans a paragraph with is compiled once
+# here instead of on each call. Exception collocations share one alternation
+# per keyword and position (keyword first / keyword last); the keyword's
+# offset is always the ``kw`` group. RULE_PATTERNS indexes them for
+# bench_rule_patterns.py.
+RULE_PATTERNS: dict[str, re.Pattern] = {}
+
+
+def _rule_pattern(name: str, pattern: str, flags: int = re.IGNORECASE) -> re.Pattern:
+    compiled = re.compile(pattern, flags)
+    RULE_PATTERNS[name] = compiled
+    return compiled
+
+
+@lru_cache(maxsize=64)
+def _word_alternation_regex(words: tuple[str, ...]) -> re.Pattern:
+    """``\b(w1|w2|...)\b`` (case-insensitive) for a rule word list, in the given order."""
+    return re.compile(r"\b(" + "|".join(map(re.escape, words)) + r")\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
+def _title_regex(title: str) -> re.Pattern:
+    """Case-insensitive literal matcher for a teacher-supplied title."""
+    return re.compile(re.escape(title), re.IGNORECASE)
+
+
+# Subjective evaluation words that are part of a fixed name ("Great Migration")
+_SUBJECTIVE_EXCEPTION_RES = (
+    _rule_pattern("subjective_great", (
+        r"\b(?P<kw>great)\s+(?:"
+        # Historical events / eras
+        r"migration|depression|war|recession|society|awakening|leap\s+forward|"
+        r"schism|famine|plains|wall|barrier\s+reef|pyramid|fire|plague|"
+        r"reform\s+act|compromise|purge|terror|"
+        # Literary works / titles
+        r"gatsby|expectations|"
+        # Other named concepts
+        r"chain\s+of\s+being|powers?"
+        r")\b"
+    )),
+    _rule_pattern("subjective_the_great", r"\b(?:alexander|peter|catherine)\s+the\s+(?P<kw>great)\b"),
+    # "Brilliant" in named/technical contexts
+    _rule_pattern("subjective_brilliant", r"\b(?P<kw>brilliant)\s+cut\b"),
+    # "Extraordinary" in formal/legal contexts
+    _rule_pattern("subjective_extraordinary", r"\b(?P<kw>extraordinary)\s+(?:rendition|measures|session)\b"),
+    # "Magnificent" in proper nouns
+    _rule_pattern("subjective_magnificent", r"\b(?P<kw>magnificent)\s+seven\b"),
+    # "Beautiful" in named concepts
+    _rule_pattern("subjective_beautiful", r"\b(?P<kw>beautiful)\s+(?:game|soul)\b"),
+    # "Genius" in formal/Latin usage
+    _rule_pattern("subjective_genius", r"\b(?P<kw>genius)\s+loci\b"),
+)
+
+# Technical / idiomatic uses of the vague general nouns. Patterns with an
+# ``obj`` group are only exceptions when obj isn't itself a cosmic noun.
+_REALITY_EXCEPTION_RES = (
+    _rule_pattern("reality_before", r"\b(?P<kw>reality)\s+principle\b"),
+    _rule_pattern("reality_after", (
+        r"\b(?:objective|social|material|virtual|constructed|lived|on-the-ground|"
+        r"appearance\s+and)\s+(?P<kw>reality)\b"
+    )),
+    # the reality of X, but avoid cosmic X like "life", "existence", etc.
+    # No required "the" so we allow "reality of adolescent hunger" etc.
+    _rule_pattern("reality_of", r"\b(?P<kw>reality)\s+of\s+(?P<obj>[A-Za-z][A-Za-z-]*)\b"),
+)
+_TRUTH_EXCEPTION_RES = (
+    _rule_pattern("truth_of_the_matter", r"\bthe\s+(?P<kw>truth)\s+of\s+the\s+matter\b"),
+    _rule_pattern("truth_before", r"\b(?P<kw>truth)\s+(?:value|claims|conditions|content|and\s+reconciliation)\b"),
+    _rule_pattern("truth_after", r"\b(?:tell[- ]tale|hard)\s+(?P<kw>truth)\b"),
+    # the truth behind X, again with a concrete-ish X
+    _rule_pattern("truth_behind", r"\bthe\s+(?P<kw>truth)\s+behind\s+(?P<obj>[A-Za-z][A-Za-z-]*)\b"),
+)
+_LIFE_EXCEPTION_RES = (
+    _rule_pattern("life_after", (
+        r"\b(?:everyday|inner|private|public|political|social|way\s+of|stages\s+of)"
+        r"\s+(?P<kw>life)\b"
+    )),
+    _rule_pattern("life_before", r"\b(?P<kw>life)(?:\s+(?:cycle|expectancy|stages)|\s*[- ]and[- ]death)\b"),
+    _rule_pattern("life_of_the_mind", r"\bthe\s+(?P<kw>life)\s+of\s+the\s+mind\b"),
+)
+_SOCIETY_EXCEPTION_RES = (
+    _rule_pattern("society_after", (
+        r"\b(?:patriarchal|industrial|consumer|modern|contemporary|civil|high)"
+        r"\s+(?P<kw>society)\b"
+    )),
+    _rule_pattern("society_at_large", r"\b(?P<kw>society)\s+at\s+large\b"),
+)
+_UNIVERSE_EXCEPTION_RES = (
+    _rule_pattern("universe_after", r"\b(?:observable|known|narrative|diegetic|marvel)\s+(?P<kw>universe)\b"),
+    _rule_pattern("universe_of_discourse", r"\b(?P<kw>universe)\s+of\s+discourse\b"),
+)
+# Generic "specific society/universe": adjective + noun, or noun + of X
+_ADJ_SOCIETY_RE = _rule_pattern("adj_society", r"\b(?P<adj>[A-Za-z][A-Za-z-]*)\s+(?P<kw>society)\b")
+_SOCIETY_OF_RE = _rule_pattern("society_of", r"\b(?P<kw>society)\s+of\s+(?P<obj>[A-Za-z][A-Za-z-]*)\b")
+_ADJ_UNIVERSE_RE = _rule_pattern("adj_universe", r"\b(?P<adj>[A-Za-z][A-Za-z-]*)\s+(?P<kw>universe)\b")
+_UNIVERSE_OF_RE = _rule_pattern("universe_of", r"\b(?P<kw>universe)\s+of\s+(?P<obj>[A-Za-z][A-Za-z-]*)\b")
+_NONSPECIFIC_DETERMINERS = frozenset({
+    "a", "an", "the",
+    "this", "that", "these", "those",
+    "any", "some", "each", "every",
+    "many", "few", "several", "no",
+    "our", "my", "your", "their", "his", "her", "its",
+})
+_HUMAN_PHRASE_RE = _rule_pattern("human_phrase", r"\b(?P<kw>human)\s+(?:rights|nature|condition)\b")
+
+# "the very beginning", "the very end", "the very fact that", ...
+_VERY_IDIOM_RE = _rule_pattern("very_idiom", (
+    r"\b(?:the\s+)?(?P<very>very)\s+("
+    r"outset|beginning|end|moment|instant|idea|thought|"
+    r"fact\s+that|same|heart\s+of|center|core|essence|"
+    r"reason|point|place|man|person|thing|process"
+    r")\b"
+))
+
+_ABSOLUTE_RE = _rule_pattern("absolute", r"\b(always|never)\b")
+
+_CONTRACTIONS = {
+    "don't", "doesn't", "didn't",
+    "can't", "couldn't", "won't", "wouldn't", "shouldn't",
+    "isn't", "aren't", "wasn't", "weren't",
+    "hasn't", "haven't", "hadn't",
+    "mustn't", "mightn't", "shan't",
+    "it's", "that's", "there's", "what's", "who's", "where's",
+    "when's", "why's", "how's",
+    "i'm", "you're", "we're", "they're", "he's", "she's",
+    "i've", "you've", "we've", "they've",
+    "i'd", "you'd", "he'd", "she'd", "we'd", "they'd",
+    "i'll", "you'll", "he'll", "she'll", "we'll", "they'll",
+    "let's",
+    "could've", "would've", "should've", "must've",
+    "ain't",
+}
+_CONTRACTION_RE = _rule_pattern("contraction", r"\b(" + "|".join(map(re.escape, _CONTRACTIONS)) + r")\b")
+
+_ARTICLE_RE = _rule_pattern("article", r"\b(a|an)\s+([A-Za-z]+)")
+
+_DELETE_PHRASES = sorted(
+    {
+        "vividly",
+        "vivid",
+        "all in all",
+        "in summary",
+        "to conclude",
+        "to summarize",
+        "the use of",
+        "successfully",
+        "masterfully",
+    },
+    key=len,
+    reverse=True,
+)
+_DELETE_PHRASE_RE = _rule_pattern(
+    "delete_phrase", r"\b(" + "|".join(re.escape(p) for p in _DELETE_PHRASES) + r")\b"
+)
+
+_THE_AUTHOR_RE = _rule_pattern("the_author", r"\bthe\s+author(?:'s)?\b")
+_LOGICAL_CONNECTOR_RE = _rule_pattern("logical_connector", r"\b(therefore|thereby|hence|thus)\b")
+
+# Checked one phrase at a time, in this order (overlapping phrases each get a mark)
+_TEXT_AS_TEXT_PHRASES = [
+    "in this paragraph",
+    "in the paragraph",
+    "this paragraph",
+    "in this sentence",
+    "in the sentence",
+    "this sentence",
+    "in this quotation",
+    "in the quotation",
+    "this quotation",
+    "in this passage",
+    "in the passage",
+    "this passage",
+    "in this essay",
+    "in the essay",
+    "within the reading",
+    "throughout the essay",
+    "throughout the article",
+    "throughout the short story",
+    "throughout the novel",
+    "throughout the story",
+    "throughout the poem",
+    "throughout the narrative",
+    "throughout the passage",
+    "through this essay",
+    "through the essay",
+    "throughout the text",
+    "in the text",
+    "in this quote",
+    "the quote",
+    "the text",
+    "the paragraph",
+    "the passage",
+    "quote",
+    "quotation",
+    "paragraphs",
+]
+_TEXT_AS_TEXT_RES = [
+    (phrase, _rule_pattern(f"text_as_text:{phrase}", r"\b" + re.escape(phrase) + r"\b"))
+    for phrase in _TEXT_AS_TEXT_PHRASES
+]
+
+_WEAK_VERB_RE = _rule_pattern("weak_verb", (
+    r"\b("
+    r"show|shows|showed|showing|shown|"
+    r"use|uses|used|using|"
+    r"demonstrate|demonstrates|demonstrated|demonstrating|"
+    r"emphasize|emphasizes|emphasized|emphasizing|"
+    r"represent|represents|represented|representing|"
+    r"state|states|stated|stating|"
+    r"symbolize|symbolizes|symbolized|symbolizing"
+    r")\b"
+))
+_LEADING_WORD_RE = _rule_pattern("leading_word", r"(\w+)", 0)
+
+# Number rule (1–10) and the spans that exempt a number from it
+_SMALL_NUMBER_RE = _rule_pattern("small_number", r"\b(1|2|3|4|5|6|7|8|9|10)\b", 0)
+_MONTH_RE = r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\.?"
+_DATE_RE = _rule_pattern("date", rf"\b{_MONTH_RE}\s+(?:[1-9]|[12]\d|3[01])(?:st|nd|rd|th)?\b", 0)
+_LINE_REF_RE = _rule_pattern("line_ref", r"\b[Ll]ines?\s+\d+(?:\s*[-–—]\s*\d+)?\b", 0)
+_PAREN_CITE_RE = _rule_pattern("paren_cite", r"\(\s*\d+(?:\s*[-–—]\s*\d+)?\s*\)", 0)
+
+# MLA check: a parenthetical with a digit somewhere inside
+_PAREN_CITATION_RE = _rule_pattern("paren_citation", r'\([^)]*\d+[^)]*\)', 0)
+
+
+def noun_repetition_threshold(word_count: int) -> int:
+    """How many times a noun may appear before "Noun repetition", for an essay of ``word_count`` words."""
+    if word_count < 300:
+        return max(3, word_count // 100)
+    if word_count <= 700:
+        return 5
+    return 6 + (word_count - 700) // 200
+
+
 def analyze_text(
     paragraph,
     paragraph_index=None,
@@ -3827,6 +4893,7 @@ def analyze_text(
     config: MarkerConfig | None = None,
     prev_body_last_sentence_content_words: set[str] | None = None,
     doc_total_word_count: int | None = None,
+    ctx: MarkingContext | None = None,
 ):
     """
     Phase 1 — Forbidden Words
@@ -3839,16 +4906,12 @@ def analyze_text(
     IMPORTANT: This function recomputes flat_text from the paragraph to ensure
     it reflects any mutations (e.g., intro quotation marks) that occurred before
     this function was called. Uses flatten_paragraph_without_labels to ignore previous Vysti labels.
+
+    `ctx` carries document-level state (thesis devices, bridge paragraphs,
+    repetition counts, ...) between paragraphs of the same essay.
     """
-    global THESIS_TOPIC_ORDER
-    global THESIS_DEVICE_SEQUENCE
-    global THESIS_ALL_DEVICE_KEYS
-    global BODY_PARAGRAPH_COUNT
-    global BRIDGE_PARAGRAPHS
-    global BRIDGE_DEVICE_KEYS
-    global FOUNDATION1_LABEL_TARGET
-    global THESIS_TEXT_LOWER
-    global DOC_FIRST_SENTENCE_COMPONENTS
+    if ctx is None:
+        ctx = MarkingContext()
 
     if labels_used is None:
         labels_used = []
@@ -3866,9 +4929,8 @@ def analyze_text(
     # -----------------------
     # SPACY PROCESSING
     # -----------------------
-    doc, tokens, sentences = spacy_parse(flat_text)
-
-    # Merge sentences that were split within known author/title names
+    # Sentences split within known author/title names are merged back
+    _known_names = None
     if config is not None:
         _known_names = [n for n in (
             getattr(config, "author_name", None),
@@ -3878,13 +4940,15 @@ def analyze_text(
             getattr(config, "text_title_2", None),
             getattr(config, "text_title_3", None),
         ) if n]
-        if _known_names:
-            sentences = merge_sentences_around_known_names(sentences, flat_text, _known_names)
+    doc, tokens, sentences = spacy_parse(
+        flat_text,
+        doc=ctx.analysis.doc(flat_text) if ctx.analysis is not None else None,
+        known_names=_known_names,
+    )
 
     # Classify sentence types for this paragraph (simple/compound/complex/compound-complex)
-    global DOC_SENTENCE_TYPES
     if paragraph_index is not None and sentences:
-        DOC_SENTENCE_TYPES[paragraph_index] = [
+        ctx.sentence_types[paragraph_index] = [
             {"type": classify_sentence_type(doc, s_start, s_end),
              "text": flat_text[s_start:s_end].strip()}
             for s_start, s_end in sentences
@@ -3915,8 +4979,8 @@ def analyze_text(
 
         if is_first_content_para and sentences:
             # Keep a copy of the paragraph text in lowercase (harmless here, but
-            # consistent with how intros store THESIS_TEXT_LOWER)
-            THESIS_TEXT_LOWER = flat_text.lower()
+            # consistent with how intros store ctx.thesis_text_lower)
+            ctx.thesis_text_lower = flat_text.lower()
 
             # ---------- First Sentence of analysis: author + genre + title + summary ----------
             if config.text_title:
@@ -3956,7 +5020,7 @@ def analyze_text(
                     author_target = config.author_name
 
                     # Collect tokens in the first sentence
-                    first_tokens = [t for t in doc if first_start <= t.idx < first_end]
+                    first_tokens = list(token_span(doc, first_start, first_end))
 
                     def looks_name_like(tok):
                         txt = tok.text
@@ -4047,7 +5111,7 @@ def analyze_text(
                     })
             else:
                 fs_check = missing_intro_first_sentence_signals(doc, sentences, flat_text)
-                DOC_FIRST_SENTENCE_COMPONENTS = fs_check
+                ctx.first_sentence_components = fs_check
                 if fs_check["missing"]:
                     first_start, first_end = sentences[0]
                     anchor_pos = first_end
@@ -4112,8 +5176,7 @@ def analyze_text(
         norm_title = normalize_title_for_exact_match(title_text)
         if not norm_title:
             continue
-        pattern = re.compile(re.escape(norm_title), re.IGNORECASE)
-        for m in pattern.finditer(flat_text):
+        for m in _title_regex(norm_title).finditer(flat_text):
             teacher_title_spans.append((m.start(), m.end()))
 
     def in_teacher_title(pos: int) -> bool:
@@ -4260,7 +5323,7 @@ def analyze_text(
             # Track this extra sentence's end position for label placement
             # Each extra sentence overwrites the previous target, so we end up
             # with the position of the LAST extra sentence in the intro paragraph
-            FOUNDATION1_LABEL_TARGET = (paragraph_index, s_end)
+            ctx.foundation1_label_target = (paragraph_index, s_end)
 
     # Map each quote interior span to the sentence index that contains it
     quote_sentence_indices = []
@@ -4311,51 +5374,7 @@ def analyze_text(
     # fixed name (e.g. "Great Migration", "Great Gatsby").  We record
     # allowed character positions so only that specific token is skipped.
     _subjective_allowed_positions: set[int] = set()
-    _subjective_collocations = [
-        # Historical events / eras
-        re.compile(r"\b(?P<kw>great)\s+migration\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+depression\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+war\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+recession\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+society\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+awakening\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+leap\s+forward\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+schism\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+famine\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+plains\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+wall\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+barrier\s+reef\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+pyramid\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+fire\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+plague\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+reform\s+act\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+compromise\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+purge\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+terror\b", re.IGNORECASE),
-        # Literary works / titles
-        re.compile(r"\b(?P<kw>great)\s+gatsby\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+expectations\b", re.IGNORECASE),
-        # Other named concepts
-        re.compile(r"\b(?P<kw>great)\s+chain\s+of\s+being\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>great)\s+powers?\b", re.IGNORECASE),
-        re.compile(r"\balexander\s+the\s+(?P<kw>great)\b", re.IGNORECASE),
-        re.compile(r"\bpeter\s+the\s+(?P<kw>great)\b", re.IGNORECASE),
-        re.compile(r"\bcatherine\s+the\s+(?P<kw>great)\b", re.IGNORECASE),
-        # "Brilliant" in named/technical contexts
-        re.compile(r"\b(?P<kw>brilliant)\s+cut\b", re.IGNORECASE),
-        # "Extraordinary" in formal/legal contexts
-        re.compile(r"\b(?P<kw>extraordinary)\s+rendition\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>extraordinary)\s+measures\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>extraordinary)\s+session\b", re.IGNORECASE),
-        # "Magnificent" in proper nouns
-        re.compile(r"\b(?P<kw>magnificent)\s+seven\b", re.IGNORECASE),
-        # "Beautiful" in named concepts
-        re.compile(r"\b(?P<kw>beautiful)\s+game\b", re.IGNORECASE),
-        re.compile(r"\b(?P<kw>beautiful)\s+soul\b", re.IGNORECASE),
-        # "Genius" in formal/Latin usage
-        re.compile(r"\b(?P<kw>genius)\s+loci\b", re.IGNORECASE),
-    ]
-    for pat in _subjective_collocations:
+    for pat in _SUBJECTIVE_EXCEPTION_RES:
         for m in pat.finditer(flat_text):
             _subjective_allowed_positions.add(m.start("kw"))
 
@@ -4402,13 +5421,12 @@ def analyze_text(
     # Apply structural quotation rules based on paragraph role
     if paragraph_role == "intro":
         # Remember the full introduction paragraph text for on-thesis checks
-        THESIS_TEXT_LOWER = flat_text.lower()
+        ctx.thesis_text_lower = flat_text.lower()
 
         # Capture noun lemmas from the thesis sentence (heuristically the
         # LAST sentence of the intro paragraph). These are exempted from
         # the Noun repetition rule so a student's central thesis terms
         # aren't punished for being central to the argument.
-        global THESIS_NOUN_LEMMAS
         if sentences:
             _thesis_start, _thesis_end = sentences[-1]
             _t_lemmas = set()
@@ -4422,7 +5440,7 @@ def analyze_text(
                 _t_lemmas.add(_tok.lemma_.lower())
             # Union so re-marking after edits accumulates rather than replaces
             # (also harmless when called once).
-            THESIS_NOUN_LEMMAS |= _t_lemmas
+            ctx.thesis_noun_lemmas |= _t_lemmas
 
         # ---------------------------------------------
         # First-sentence TITLE check (teacher-supplied text_title)
@@ -4477,7 +5495,7 @@ def analyze_text(
                 author_target = config.author_name
 
                 # Collect tokens in the first sentence
-                first_tokens = [t for t in doc if first_start <= t.idx < first_end]
+                first_tokens = list(token_span(doc, first_start, first_end))
 
                 def looks_name_like(tok):
                     txt = tok.text
@@ -4597,7 +5615,7 @@ def analyze_text(
             and not getattr(config, "text_title", None)
         ):
             fs_check = missing_intro_first_sentence_signals(doc, sentences, flat_text)
-            DOC_FIRST_SENTENCE_COMPONENTS = fs_check
+            ctx.first_sentence_components = fs_check
             if fs_check["missing"]:
                 first_start, first_end = sentences[0]
                 anchor_pos = first_end
@@ -4784,9 +5802,8 @@ def analyze_text(
             thesis_start, thesis_end = sentences[-1]
             thesis_text = flat_text[thesis_start:thesis_end].strip()
 
-            # Store thesis text globally for dynamic guidance
-            global THESIS_TEXT
-            THESIS_TEXT = thesis_text
+            # Store thesis text on the context for dynamic guidance
+            ctx.thesis_text = thesis_text
 
             # Anchor for label-only comment placed "after" the paragraph.
             # For Foundation 2, anchor at the end of the thesis sentence instead.
@@ -4828,12 +5845,11 @@ def analyze_text(
             else:
                 # Foundation 4: Record thesis location for assignment-completion rule
                 if config.mode == "foundation_4":
-                    global THESIS_PARAGRAPH_INDEX, THESIS_ANCHOR_POS
-                    THESIS_PARAGRAPH_INDEX = paragraph_index
-                    THESIS_ANCHOR_POS = thesis_end
+                    ctx.thesis_paragraph_index = paragraph_index
+                    ctx.thesis_anchor_pos = thesis_end
                 
                 # Collect spaCy tokens that lie in the thesis sentence span
-                thesis_tokens = [t for t in doc if thesis_start <= t.idx < thesis_end]
+                thesis_tokens = list(token_span(doc, thesis_start, thesis_end))
 
                 device_count = 0
                 clarifier_devices = 0
@@ -4963,9 +5979,9 @@ def analyze_text(
 
                 # Persist the ordered thesis devices for later body-paragraph checks
                 if thesis_devices_in_order:
-                    THESIS_DEVICE_SEQUENCE = thesis_devices_in_order
+                    ctx.thesis_device_sequence = thesis_devices_in_order
                 else:
-                    THESIS_DEVICE_SEQUENCE = []
+                    ctx.thesis_device_sequence = []
 
                 # Build a set of all device lemmas that appear anywhere in the thesis
                 all_thesis_devices = set()
@@ -4975,13 +5991,13 @@ def analyze_text(
                         all_thesis_devices.add(key)
 
                 # Persist for body-paragraph checks
-                THESIS_ALL_DEVICE_KEYS = all_thesis_devices
+                ctx.thesis_all_device_keys = all_thesis_devices
 
                 # Only extract thesis topics when we have a valid, non-question, closed thesis
                 if device_count > 0 and clarifier_devices == device_count and not ends_with_question:
-                    THESIS_TOPIC_ORDER = extract_thesis_topics(thesis_tokens)
+                    ctx.thesis_topic_order = extract_thesis_topics(thesis_tokens)
                 else:
-                    THESIS_TOPIC_ORDER = []
+                    ctx.thesis_topic_order = []
 
                 # --- Organization of thesis statement: devices/strategies should come
                 #     before the main argumentative verb in the thesis.
@@ -5035,7 +6051,7 @@ def analyze_text(
 
         # Remember bridge paragraphs by index so run_marker can avoid praising them
         if is_topic_only_bridge and paragraph_index is not None:
-            BRIDGE_PARAGRAPHS.add(paragraph_index)
+            ctx.bridge_paragraphs.add(paragraph_index)
 
             # Record any thesis-device keywords that appear in this bridge line
             bridge_keys: set[str] = set()
@@ -5044,12 +6060,12 @@ def analyze_text(
                 if key is not None:
                     bridge_keys.add(key)
             if bridge_keys:
-                BRIDGE_DEVICE_KEYS[paragraph_index] = bridge_keys
+                ctx.bridge_device_keys[paragraph_index] = bridge_keys
 
         # Compute topic sentence span using character offsets (not spaCy sentence boundaries)
         # This handles cases like "When describing the grandeur of the mall, Guterson contrasts..."
         # where spaCy might split at a colon, but we want the entire first sentence.
-        topic_start, topic_end = compute_topic_sentence_span(flat_text, spans)
+        topic_start, topic_end = compute_topic_sentence_span(flat_text, spans, doc=doc)
         topic_sentence_text = flat_text[topic_start:topic_end]
         last_sentence_text = ""
         if 0 <= last_idx < len(sentences):
@@ -5178,8 +6194,8 @@ def analyze_text(
                 is_body_for_alignment = is_body_for_alignment and paragraph_index < (total_paragraphs - 1)
             
             if is_body_for_alignment:
-                BODY_PARAGRAPH_COUNT += 1
-                body_idx = BODY_PARAGRAPH_COUNT
+                ctx.body_paragraph_count += 1
+                body_idx = ctx.body_paragraph_count
 
             # If this paragraph doesn't map to a thesis "slot", skip thesis-topic labels entirely.
             if body_idx is not None:
@@ -5201,13 +6217,13 @@ def analyze_text(
                         topic_device_positions[key] = (dev_start, dev_end)
 
                 # OUTSIDE loop → build thesis device set once
-                thesis_device_set = set(THESIS_DEVICE_SEQUENCE)
+                thesis_device_set = set(ctx.thesis_device_sequence)
 
                 # Also treat any device that appears anywhere in the thesis as "in thesis"
                 # This prevents mislabeling cases like BP2 "symbolism" when the thesis contains
                 # "allegorical symbolism" but that device was treated as embedded.
-                if THESIS_ALL_DEVICE_KEYS:
-                    thesis_device_set |= THESIS_ALL_DEVICE_KEYS
+                if ctx.thesis_all_device_keys:
+                    thesis_device_set |= ctx.thesis_all_device_keys
 
                 anchor_pos = topic_end  # default anchor for label-only comments
 
@@ -5227,17 +6243,17 @@ def analyze_text(
                         return
 
                     if "Put this topic in the thesis statement" in label_text or label_text == "Off-topic":
-                        thesis_device_set = set(THESIS_DEVICE_SEQUENCE)
-                        if THESIS_ALL_DEVICE_KEYS:
-                            thesis_device_set |= THESIS_ALL_DEVICE_KEYS
+                        thesis_device_set = set(ctx.thesis_device_sequence)
+                        if ctx.thesis_all_device_keys:
+                            thesis_device_set |= ctx.thesis_all_device_keys
 
                         # NEW: If every device in the topic sentence already appears
                         # textually in the thesis paragraph, do NOT treat it as a new topic.
-                        if THESIS_TEXT_LOWER and topic_devices:
+                        if ctx.thesis_text_lower and topic_devices:
                             all_in_thesis_text = True
                             for d in topic_devices:
                                 token = d.lower()
-                                if token and token not in THESIS_TEXT_LOWER:
+                                if token and token not in ctx.thesis_text_lower:
                                     all_in_thesis_text = False
                                     break
                             if all_in_thesis_text:
@@ -5265,16 +6281,16 @@ def analyze_text(
                         if label_text == "Follow the organization of the thesis":
                             # Get the expected device for this body paragraph
                             expected_device = None
-                            if body_idx is not None and 0 <= (body_idx - 1) < len(THESIS_DEVICE_SEQUENCE):
-                                expected_device = THESIS_DEVICE_SEQUENCE[body_idx - 1]
+                            if body_idx is not None and 0 <= (body_idx - 1) < len(ctx.thesis_device_sequence):
+                                expected_device = ctx.thesis_device_sequence[body_idx - 1]
 
-                            # Build topics list from THESIS_TOPIC_ORDER or THESIS_DEVICE_SEQUENCE
-                            topics_list = THESIS_TOPIC_ORDER if THESIS_TOPIC_ORDER else THESIS_DEVICE_SEQUENCE
+                            # Build topics list from ctx.thesis_topic_order or ctx.thesis_device_sequence
+                            topics_list = ctx.thesis_topic_order if ctx.thesis_topic_order else ctx.thesis_device_sequence
 
                             context = {
                                 "found_value": expected_device,
                                 "topics": topics_list,
-                                "thesis": THESIS_TEXT,
+                                "thesis": ctx.thesis_text,
                                 "confidence": "high"
                             }
 
@@ -5296,8 +6312,8 @@ def analyze_text(
                 # topic sentence" label should be added.
                 # Example: In Foundation_HW7_Darren, BP1's topic sentence contains "contrasts"
                 # and the first thesis device is "contrast". These should match, so no label.
-                if 0 <= expected_idx < len(THESIS_DEVICE_SEQUENCE):
-                    expected_device = THESIS_DEVICE_SEQUENCE[expected_idx]
+                if 0 <= expected_idx < len(ctx.thesis_device_sequence):
+                    expected_device = ctx.thesis_device_sequence[expected_idx]
 
                     # NEW: treat the topic as present in the topic sentence if EITHER:
                     #   - the canonical device key appears in topic_devices, OR
@@ -5314,7 +6330,7 @@ def analyze_text(
                     # appears in a one-line bridge paragraph immediately before this one.
                     expected_in_bridge = False
                     if paragraph_index is not None:
-                        bridge_keys = BRIDGE_DEVICE_KEYS.get(paragraph_index - 1)
+                        bridge_keys = ctx.bridge_device_keys.get(paragraph_index - 1)
                         if bridge_keys and expected_device in bridge_keys:
                             expected_in_bridge = True
 
@@ -5329,10 +6345,7 @@ def analyze_text(
                         expected_start = None
                         expected_end = None
 
-                        for tok in doc:
-                            if tok.idx < topic_end:
-                                continue
-                            
+                        for tok in token_span(doc, topic_end):
                             # Use canonical_device_key to check if this token matches expected_device
                             key = canonical_device_key(tok)
                             if key == expected_device:
@@ -5492,8 +6505,6 @@ def analyze_text(
         # verify that the sentence also contains a parenthetical citation
         # of the form (...digit...) after the last closing quote mark.
         if getattr(config, "enforce_mla_citation", False):
-            import re as _re
-            _citation_re = _re.compile(r'\([^)]*\d+[^)]*\)')
             # Group quotes by sentence
             _sent_quotes = {}
             for (q_start, q_end), q_si in zip(spans, quote_sentence_indices):
@@ -5515,7 +6526,7 @@ def analyze_text(
                 last_q_end = max(q_e for _, q_e in qs)
                 # Check text from after the last closing quote to end of sentence
                 after_quote = flat_text[last_q_end:s_end]
-                if not _citation_re.search(after_quote):
+                if not _PAREN_CITATION_RE.search(after_quote):
                     # Place label at the last quotation in this sentence
                     last_q_start = [q_s for q_s, q_e in qs if q_e == last_q_end][0]
                     add_structural_mark(
@@ -5603,9 +6614,7 @@ def analyze_text(
 
             # Collect content-word lemmas inside this quotation
             quote_lemmas = set()
-            for tok in doc:
-                if tok.idx < q_start or tok.idx >= q_end:
-                    continue
+            for tok in token_span(doc, q_start, q_end):
                 # Only count content words as "evidence" tokens
                 if tok.pos_ in {"NOUN", "PROPN", "VERB", "ADJ", "ADV"}:
                     lemma = tok.lemma_.lower().strip()
@@ -5656,9 +6665,7 @@ def analyze_text(
 
             # Find the first comma before this quotation, inside the same sentence
             first_comma_pos = None
-            for tok in doc:
-                if tok.idx < s_start or tok.idx >= q_start:
-                    continue
+            for tok in token_span(doc, s_start, q_start):
                 if tok.text == ",":
                     first_comma_pos = tok.idx
                     break
@@ -5671,9 +6678,7 @@ def analyze_text(
 
             # Opening phrase: from sentence start up to that comma
             opening_tokens = []
-            for tok in doc:
-                if tok.idx < s_start or tok.idx >= first_comma_pos:
-                    continue
+            for tok in token_span(doc, s_start, first_comma_pos):
                 if not any(ch.isalpha() for ch in tok.text):
                     continue
                 # Ignore anything inside direct quotations (paranoid, but cheap)
@@ -5695,9 +6700,7 @@ def analyze_text(
                 tok.text.lower() in transition_openers for tok in opening_tokens
             ):
                 post_comma_tokens = []
-                for tok in doc:
-                    if tok.idx <= first_comma_pos or tok.idx >= q_start:
-                        continue
+                for tok in token_span(doc, first_comma_pos + 1, q_start):
                     if not any(ch.isalpha() for ch in tok.text):
                         continue
                     tok_start = tok.idx
@@ -5732,9 +6735,7 @@ def analyze_text(
             # (nouns/verbs/adjectives/proper nouns) there, we treat that
             # as adequate context and do NOT flag.
             content_tokens = []
-            for tok in doc:
-                if tok.idx <= first_comma_pos or tok.idx >= q_start:
-                    continue
+            for tok in token_span(doc, first_comma_pos + 1, q_start):
                 if not any(ch.isalpha() for ch in tok.text):
                     continue
                 if tok.pos_ in {"NOUN", "PROPN", "ADJ", "VERB"}:
@@ -5816,9 +6817,7 @@ def analyze_text(
             # and tokens inside other quote spans.
             in_parens = False
             post_quote_words = 0
-            for tok in doc:
-                if tok.idx < last_q_end or tok.idx >= s_end:
-                    continue
+            for tok in token_span(doc, last_q_end, s_end):
                 # Track parentheses to skip MLA citations like (Smith 45)
                 if tok.text == "(":
                     in_parens = True
@@ -6303,27 +7302,7 @@ def analyze_text(
 
         # --- REALITY exceptions ---
         if "reality" in forbidden:
-            reality_patterns = [
-                re.compile(r"\b(?P<kw>reality)\s+principle\b", re.IGNORECASE),
-                re.compile(r"\bobjective\s+(?P<kw>reality)\b", re.IGNORECASE),
-                re.compile(r"\bsocial\s+(?P<kw>reality)\b", re.IGNORECASE),
-                re.compile(r"\bmaterial\s+(?P<kw>reality)\b", re.IGNORECASE),
-                re.compile(r"\bvirtual\s+(?P<kw>reality)\b", re.IGNORECASE),
-                re.compile(r"\bconstructed\s+(?P<kw>reality)\b", re.IGNORECASE),
-                re.compile(r"\blived\s+(?P<kw>reality)\b", re.IGNORECASE),
-                re.compile(r"\bon-the-ground\s+(?P<kw>reality)\b", re.IGNORECASE),
-                re.compile(
-                    r"\bappearance\s+and\s+(?P<kw>reality)\b",
-                    re.IGNORECASE,
-                ),
-                # the reality of X, but avoid cosmic X like "life", "existence", etc.
-                # No required "the" so we allow "reality of adolescent hunger" etc.
-                re.compile(
-                    r"\b(?P<kw>reality)\s+of\s+(?P<obj>[A-Za-z][A-Za-z-]*)\b",
-                    re.IGNORECASE,
-                ),
-            ]
-            for pat in reality_patterns:
+            for pat in _REALITY_EXCEPTION_RES:
                 for m in pat.finditer(flat_text):
                     if "obj" in m.groupdict():
                         obj = m.group("obj").lower()
@@ -6333,28 +7312,7 @@ def analyze_text(
 
         # --- TRUTH exceptions ---
         if "truth" in forbidden:
-            truth_patterns = [
-                re.compile(
-                    r"\bthe\s+(?P<kw>truth)\s+of\s+the\s+matter\b",
-                    re.IGNORECASE,
-                ),
-                re.compile(r"\b(?P<kw>truth)\s+value\b", re.IGNORECASE),
-                re.compile(r"\b(?P<kw>truth)\s+claims\b", re.IGNORECASE),
-                re.compile(r"\b(?P<kw>truth)\s+conditions\b", re.IGNORECASE),
-                re.compile(r"\b(?P<kw>truth)\s+content\b", re.IGNORECASE),
-                re.compile(r"\btell[- ]tale\s+(?P<kw>truth)\b", re.IGNORECASE),
-                re.compile(r"\bhard\s+(?P<kw>truth)\b", re.IGNORECASE),
-                re.compile(
-                    r"\b(?P<kw>truth)\s+and\s+reconciliation\b",
-                    re.IGNORECASE,
-                ),
-                # the truth behind X, again with a concrete-ish X
-                re.compile(
-                    r"\bthe\s+(?P<kw>truth)\s+behind\s+(?P<obj>[A-Za-z][A-Za-z-]*)\b",
-                    re.IGNORECASE,
-                ),
-            ]
-            for pat in truth_patterns:
+            for pat in _TRUTH_EXCEPTION_RES:
                 for m in pat.finditer(flat_text):
                     if "obj" in m.groupdict():
                         obj = m.group("obj").lower()
@@ -6364,142 +7322,57 @@ def analyze_text(
 
         # --- LIFE exceptions ---
         if "life" in forbidden:
-            life_patterns = [
-                re.compile(r"\beveryday\s+(?P<kw>life)\b", re.IGNORECASE),
-                re.compile(r"\binner\s+(?P<kw>life)\b", re.IGNORECASE),
-                re.compile(r"\bprivate\s+(?P<kw>life)\b", re.IGNORECASE),
-                re.compile(r"\bpublic\s+(?P<kw>life)\b", re.IGNORECASE),
-                re.compile(r"\bpolitical\s+(?P<kw>life)\b", re.IGNORECASE),
-                re.compile(r"\bsocial\s+(?P<kw>life)\b", re.IGNORECASE),
-                re.compile(r"\b(?P<kw>life)\s+cycle\b", re.IGNORECASE),
-                re.compile(r"\b(?P<kw>life)\s+expectancy\b", re.IGNORECASE),
-                re.compile(r"\b(?P<kw>life)\s+stages\b", re.IGNORECASE),
-                re.compile(r"\bway\s+of\s+(?P<kw>life)\b", re.IGNORECASE),
-                re.compile(r"\bstages\s+of\s+(?P<kw>life)\b", re.IGNORECASE),
-                re.compile(
-                    r"\b(?P<kw>life)\s*[- ]and[- ]death\b",
-                    re.IGNORECASE,
-                ),
-                re.compile(
-                    r"\bthe\s+(?P<kw>life)\s+of\s+the\s+mind\b",
-                    re.IGNORECASE,
-                ),
-            ]
-            for pat in life_patterns:
+            for pat in _LIFE_EXCEPTION_RES:
                 for m in pat.finditer(flat_text):
                     general_allowed_positions["life"].add(m.start("kw"))
 
         # --- SOCIETY exceptions ---
         if "society" in forbidden:
-            society_patterns = [
-                re.compile(r"\bpatriarchal\s+(?P<kw>society)\b", re.IGNORECASE),
-                re.compile(r"\bindustrial\s+(?P<kw>society)\b", re.IGNORECASE),
-                re.compile(r"\bconsumer\s+(?P<kw>society)\b", re.IGNORECASE),
-                re.compile(r"\bmodern\s+(?P<kw>society)\b", re.IGNORECASE),
-                re.compile(r"\bcontemporary\s+(?P<kw>society)\b", re.IGNORECASE),
-                re.compile(r"\bcivil\s+(?P<kw>society)\b", re.IGNORECASE),
-                re.compile(r"\bhigh\s+(?P<kw>society)\b", re.IGNORECASE),
-                re.compile(
-                    r"\b(?P<kw>society)\s+at\s+large\b",
-                    re.IGNORECASE,
-                ),
-            ]
-            for pat in society_patterns:
+            for pat in _SOCIETY_EXCEPTION_RES:
                 for m in pat.finditer(flat_text):
                     general_allowed_positions["society"].add(m.start("kw"))
 
             # Generic "specific society" patterns:
             #   - adjective + society  ("American society")
             #   - society of X         ("the society of Shanghai in the 1920s")
-            adj_society_pattern = re.compile(
-                r"\b(?P<adj>[A-Za-z][A-Za-z-]*)\s+(?P<kw>society)\b",
-                re.IGNORECASE,
-            )
-            for m in adj_society_pattern.finditer(flat_text):
+            for m in _ADJ_SOCIETY_RE.finditer(flat_text):
                 adj = m.group("adj").lower()
                 # Skip bare determiners/pronouns like "the society", "our society"
-                if adj in {
-                    "a", "an", "the",
-                    "this", "that", "these", "those",
-                    "any", "some", "each", "every",
-                    "many", "few", "several", "no",
-                    "our", "my", "your", "their", "his", "her", "its",
-                }:
+                if adj in _NONSPECIFIC_DETERMINERS:
                     continue
                 general_allowed_positions["society"].add(m.start("kw"))
 
-            society_of_pattern = re.compile(
-                r"\b(?P<kw>society)\s+of\s+(?P<obj>[A-Za-z][A-Za-z-]*)\b",
-                re.IGNORECASE,
-            )
-            for m in society_of_pattern.finditer(flat_text):
+            for m in _SOCIETY_OF_RE.finditer(flat_text):
                 general_allowed_positions["society"].add(m.start("kw"))
 
         # --- UNIVERSE exceptions ---
         if "universe" in forbidden:
-            universe_patterns = [
-                re.compile(r"\bobservable\s+(?P<kw>universe)\b", re.IGNORECASE),
-                re.compile(r"\bknown\s+(?P<kw>universe)\b", re.IGNORECASE),
-                re.compile(r"\bnarrative\s+(?P<kw>universe)\b", re.IGNORECASE),
-                re.compile(r"\bdiegetic\s+(?P<kw>universe)\b", re.IGNORECASE),
-                re.compile(r"\bmarvel\s+(?P<kw>universe)\b", re.IGNORECASE),
-                re.compile(
-                    r"\b(?P<kw>universe)\s+of\s+discourse\b",
-                    re.IGNORECASE,
-                ),
-            ]
-            for pat in universe_patterns:
+            for pat in _UNIVERSE_EXCEPTION_RES:
                 for m in pat.finditer(flat_text):
                     general_allowed_positions["universe"].add(m.start("kw"))
 
             # Generic "specific universe" patterns:
             #   - adjective + universe ("fictional universe", "Marvel universe")
             #   - universe of X        ("universe of the NBA")
-            adj_universe_pattern = re.compile(
-                r"\b(?P<adj>[A-Za-z][A-Za-z-]*)\s+(?P<kw>universe)\b",
-                re.IGNORECASE,
-            )
-            for m in adj_universe_pattern.finditer(flat_text):
+            for m in _ADJ_UNIVERSE_RE.finditer(flat_text):
                 adj = m.group("adj").lower()
-                if adj in {
-                    "a", "an", "the",
-                    "this", "that", "these", "those",
-                    "any", "some", "each", "every",
-                    "many", "few", "several", "no",
-                    "our", "my", "your", "their", "his", "her", "its",
-                }:
+                if adj in _NONSPECIFIC_DETERMINERS:
                     continue
                 general_allowed_positions["universe"].add(m.start("kw"))
 
-            universe_of_pattern = re.compile(
-                r"\b(?P<kw>universe)\s+of\s+(?P<obj>[A-Za-z][A-Za-z-]*)\b",
-                re.IGNORECASE,
-            )
-            for m in universe_of_pattern.finditer(flat_text):
+            for m in _UNIVERSE_OF_RE.finditer(flat_text):
                 general_allowed_positions["universe"].add(m.start("kw"))
 
         # --- HUMAN exceptions ---
         # Allow fixed phrases "human rights" and "human nature" even though "human" is normally forbidden.
         if "human" in forbidden:
-            human_phrase_pattern = re.compile(
-                r"\b(?P<kw>human)\s+(?:rights|nature|condition)\b",
-                re.IGNORECASE,
-            )
-            for m in human_phrase_pattern.finditer(flat_text):
+            for m in _HUMAN_PHRASE_RE.finditer(flat_text):
                 general_allowed_positions.setdefault("human", set()).add(m.start("kw"))
 
         # Precompute positions where 'very' is allowed in fixed idioms like
     # "the very beginning", "the very end", "the very fact that", etc.
-    very_ok_pattern = re.compile(
-        r"\b(?:the\s+)?(?P<very>very)\s+("
-        r"outset|beginning|end|moment|instant|idea|thought|"
-        r"fact\s+that|same|heart\s+of|center|core|essence|"
-        r"reason|point|place|man|person|thing|process"
-        r")\b",
-        re.IGNORECASE,
-    )
     allowed_very_positions = {
-        m.start("very") for m in very_ok_pattern.finditer(flat_text)
+        m.start("very") for m in _VERY_IDIOM_RE.finditer(flat_text)
     }
 
     # Also allow "very" when it directly modifies a noun:
@@ -6517,8 +7390,8 @@ def analyze_text(
                     allowed_very_positions.add(tok.idx)
 
 
-    fw_pattern = r"\b(" + "|".join(map(re.escape, forbidden.keys())) + r")\b"
-    fw_regex = re.compile(fw_pattern, re.IGNORECASE)
+    # Compiled once per distinct rule configuration (forbidden depends on config)
+    fw_regex = _word_alternation_regex(tuple(forbidden))
 
     for match in fw_regex.finditer(flat_text):
         match_start = match.start()
@@ -6569,15 +7442,10 @@ def analyze_text(
     # -----------------------
     # ABSOLUTE LANGUAGE (Precision Imprecise)
     # -----------------------
-    absolute_terms = ["always", "never"]
     rule_note_absolute = "Qualify language"  # Changed to match Excel file
-    absolute_regex = re.compile(
-        r"\b(" + "|".join(re.escape(term) for term in absolute_terms) + r")\b",
-        re.IGNORECASE,
-    )
     absolute_labeled = rule_note_absolute in labels_used
 
-    for match in absolute_regex.finditer(flat_text):
+    for match in _ABSOLUTE_RE.finditer(flat_text):
         match_start = match.start()
         match_end = match.end()
         if pos_in_spans(match_start, spans) or pos_in_spans(match_end - 1, spans):
@@ -6669,9 +7537,8 @@ def analyze_text(
             }
 
         try:
-            lt = get_language_tool()
-            if lt is not None:
-                lt_matches = lt.check(flat_text)
+            lt_matches = check_grammar(flat_text, ctx)
+            if lt_matches is not None:
                 for match in lt_matches:
                     rid = match.rule_id
                     start = match.offset
@@ -6726,7 +7593,7 @@ def analyze_text(
                         if _is_british_variant(flagged_word, match.replacements):
                             continue
                         # Skip valid morphological derivations (e.g. questionability → questionable)
-                        if _is_valid_derivation(flagged_word, lt):
+                        if _is_valid_derivation(flagged_word, get_language_tool(), ctx):
                             continue
                         _sp_mark = _lt_mark(SPELLING_LABEL, SPELLING_SHORT, start, end)
                         # Always show full label (not "sp") so students see "Spelling error" every time
@@ -6896,29 +7763,9 @@ def analyze_text(
     # PHASE 2 — CONTRACTIONS
     # -----------------------
     if getattr(config, "enforce_contractions_rule", True):
-        contractions = {
-            "don't", "doesn't", "didn't",
-            "can't", "couldn't", "won't", "wouldn't", "shouldn't",
-            "isn't", "aren't", "wasn't", "weren't",
-            "hasn't", "haven't", "hadn't",
-            "mustn't", "mightn't", "shan't",
-            "it's", "that's", "there's", "what's", "who's", "where's",
-            "when's", "why's", "how's",
-            "i'm", "you're", "we're", "they're", "he's", "she's",
-            "i've", "you've", "we've", "they've",
-            "i'd", "you'd", "he'd", "she'd", "we'd", "they'd",
-            "i'll", "you'll", "he'll", "she'll", "we'll", "they'll",
-            "let's",
-            "could've", "would've", "should've", "must've",
-            "ain't",
-        }
-
         contractions_note = "No contractions in academic writing"
 
-        contr_pattern = r"\b(" + "|".join(map(re.escape, contractions)) + r")\b"
-        contr_regex = re.compile(contr_pattern, re.IGNORECASE)
-
-        for match in contr_regex.finditer(flat_text):
+        for match in _CONTRACTION_RE.finditer(flat_text):
             match_start = match.start()
             match_end = match.end()
 
@@ -6946,8 +7793,7 @@ def analyze_text(
     # -----------------------
     # PHASE 2.1 — Article errors (a/an)
     # -----------------------
-    article_regex = re.compile(r"\b(a|an)\s+([A-Za-z]+)", re.IGNORECASE)
-    for match in article_regex.finditer(flat_text):
+    for match in _ARTICLE_RE.finditer(flat_text):
         article = match.group(1) or ""
         next_word = match.group(2) or ""
         if not article or not next_word:
@@ -6991,28 +7837,6 @@ def analyze_text(
     # -----------------------
     # PHASE 5A — Delete-phrases
     # -----------------------
-    delete_phrases = [
-        "vividly",
-        "vivid",
-        "all in all",
-        "in summary",
-        "to conclude",
-        "to summarize",
-        "the use of",
-        "successfully",
-        "masterfully",
-    ]
-    delete_phrases = sorted(
-        set(p.strip() for p in delete_phrases if p.strip()),
-        key=len,
-        reverse=True,
-    )
-
-    delete_pattern = re.compile(
-        r"\b(" + "|".join(re.escape(p) for p in delete_phrases) + r")\b",
-        re.IGNORECASE,
-    )
-
     # These should only be deleted in the conclusion paragraph
     conclusion_only_delete_phrases = {
         "all in all",
@@ -7021,7 +7845,7 @@ def analyze_text(
         "to summarize",
     }
 
-    for match in delete_pattern.finditer(flat_text):
+    for match in _DELETE_PHRASE_RE.finditer(flat_text):
         match_start, match_end = match.start(1), match.end(1)
 
         # Phrase text in lowercase so we can compare
@@ -7086,9 +7910,7 @@ def analyze_text(
     # PHASE 5A — "The author" references (replace, don't delete)
     # -----------------------
     rule_note_author_ref = AUTHOR_REF_LABEL
-    author_regex = re.compile(r"\bthe\s+author(?:'s)?\b", re.IGNORECASE)
-
-    for match in author_regex.finditer(flat_text):
+    for match in _THE_AUTHOR_RE.finditer(flat_text):
         match_start, match_end = match.start(), match.end()
 
         # Skip matches inside direct quotations
@@ -7116,9 +7938,7 @@ def analyze_text(
     # PHASE 5A.1 — Logical connectors: therefore/thereby/hence/thus
     # -----------------------
     rule_note_logical = "Avoid the words 'therefore', 'thereby', 'hence', and 'thus'"
-    logical_regex = re.compile(r"\b(therefore|thereby|hence|thus)\b", re.IGNORECASE)
-
-    for match in logical_regex.finditer(flat_text):
+    for match in _LOGICAL_CONNECTOR_RE.finditer(flat_text):
         match_start, match_end = match.start(1), match.end(1)
 
         # Skip matches inside direct quotations
@@ -7142,50 +7962,9 @@ def analyze_text(
     # -----------------------
     # PHASE 5B — TEXT-AS-TEXT RULES
     # -----------------------
-    text_as_text_phrases = [
-        "in this paragraph",
-        "in the paragraph",
-        "this paragraph",
-        "in this sentence",
-        "in the sentence",
-        "this sentence",
-        "in this quotation",
-        "in the quotation",
-        "this quotation",
-        "in this passage",
-        "in the passage",
-        "this passage",
-        "in this essay",
-        "in the essay",
-        "within the reading",
-        "throughout the essay",
-        "throughout the article",
-        "throughout the short story",
-        "throughout the novel",
-        "throughout the story",
-        "throughout the poem",
-        "throughout the narrative",
-        "throughout the passage",
-        "through this essay",
-        "through the essay",
-        "throughout the text",
-        "in the text",
-        "in this quote",
-        "the quote",
-        "the text",
-        "the paragraph",
-        "the passage",
-        "quote",
-        "quotation",
-        "paragraphs",
-    ]
-
     rule_note_text_as_text = "Do not refer to the text as a text; refer to context instead"
 
-    for phrase in text_as_text_phrases:
-        pattern = r'\b' + re.escape(phrase) + r'\b'
-        phrase_regex = re.compile(pattern, re.IGNORECASE)
-
+    for phrase, phrase_regex in _TEXT_AS_TEXT_RES:
         for match in phrase_regex.finditer(flat_text):
             match_start = match.start()
             match_end = match.end()
@@ -7243,22 +8022,9 @@ def analyze_text(
     # PHASE 6 — WEAK VERBS
     # -----------------------
     if getattr(config, "enforce_weak_verbs_rule", True):
-        weak_verbs_regex = re.compile(
-            r"\b("
-            r"show|shows|showed|showing|shown|"
-            r"use|uses|used|using|"
-            r"demonstrate|demonstrates|demonstrated|demonstrating|"
-            r"emphasize|emphasizes|emphasized|emphasizing|"
-            r"represent|represents|represented|representing|"
-            r"state|states|stated|stating|"
-            r"symbolize|symbolizes|symbolized|symbolizing"
-            r")\b",
-            re.IGNORECASE
-        )
-
         rule_note_weak_verbs = "Avoid weak verbs"
 
-        for match in weak_verbs_regex.finditer(flat_text):
+        for match in _WEAK_VERB_RE.finditer(flat_text):
             match_start = match.start()
             match_end = match.end()
 
@@ -7278,7 +8044,7 @@ def analyze_text(
                 # Check word after "use"
                 after_space = flat_text[match_end:match_end + 1]
                 if after_space == " ":
-                    after_word_match = re.match(r"(\w+)", flat_text[match_end + 1:])
+                    after_word_match = _LEADING_WORD_RE.match(flat_text, match_end + 1)
                     if after_word_match and after_word_match.group(1).lower() in _use_noun_after:
                         continue
                 # Check word before "use"
@@ -7331,7 +8097,6 @@ def analyze_text(
     # PHASE 6B — NOUN REPETITION
     # -----------------------
     if getattr(config, "enforce_noun_repetition_rule", True):
-        global DOC_REPEATED_NOUNS
         from collections import defaultdict
         noun_occurrences = defaultdict(list)
 
@@ -7361,21 +8126,16 @@ def analyze_text(
 
             # Skip key terms from THIS student's thesis sentence — those
             # are the argument's load-bearing nouns and should be allowed
-            # to repeat without penalty. THESIS_NOUN_LEMMAS is populated
+            # to repeat without penalty. ctx.thesis_noun_lemmas is populated
             # during intro paragraph processing above.
-            if THESIS_NOUN_LEMMAS and lemma in THESIS_NOUN_LEMMAS:
+            if ctx.thesis_noun_lemmas and lemma in ctx.thesis_noun_lemmas:
                 continue
 
             noun_occurrences[lemma].append((token.text, tok_start, tok_end))
 
         # Determine threshold based on DOCUMENT word count (not paragraph)
         word_count = doc_total_word_count if doc_total_word_count else len(flat_text.split())
-        if word_count < 300:
-            threshold = max(3, word_count // 100)
-        elif word_count <= 700:
-            threshold = 5
-        else:
-            threshold = 6 + (word_count - 700) // 200
+        threshold = noun_repetition_threshold(word_count)
 
         rule_note_repetition = "Noun repetition"
 
@@ -7411,7 +8171,7 @@ def analyze_text(
 
         # Accumulate ALL noun occurrences across paragraphs (no threshold gate).
         # Document-level threshold filtering happens after the paragraph loop.
-        existing_nouns = {item["lemma"]: item for item in DOC_REPEATED_NOUNS}
+        existing_nouns = {item["lemma"]: item for item in ctx.repeated_nouns}
 
         for lemma, occurrences in noun_occurrences.items():
             if lemma in existing_nouns:
@@ -7425,21 +8185,14 @@ def analyze_text(
                     "forms": list(set(occ[0] for occ in occurrences))
                 }
 
-        DOC_REPEATED_NOUNS = list(existing_nouns.values())
-        DOC_REPEATED_NOUNS.sort(key=lambda x: -x["count"])
+        ctx.repeated_nouns = list(existing_nouns.values())
+        ctx.repeated_nouns.sort(key=lambda x: -x["count"])
 
     # -----------------------
     # PHASE 7 — NUMBER RULE (1–10)
     # -----------------------
-    number_regex = re.compile(r"\b(1|2|3|4|5|6|7|8|9|10)\b")
-
     rule_note_number = NUMBER_RULE_LABEL
 
-    MONTH_RE = r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\.?"
-    DATE_RE = re.compile(rf"\b{MONTH_RE}\s+(?:[1-9]|[12]\d|3[01])(?:st|nd|rd|th)?\b")
-    LINE_REF_RE = re.compile(r"\b[Ll]ines?\s+\d+(?:\s*[-–—]\s*\d+)?\b")
-    PAREN_CITE_RE = re.compile(r"\(\s*\d+(?:\s*[-–—]\s*\d+)?\s*\)")
-
     def _match_span_contains(abs_start: int, abs_end: int, m_start: int, m_end: int) -> bool:
         return m_start <= abs_start and abs_end <= m_end
 
@@ -7451,21 +8204,21 @@ def analyze_text(
         window = text[left:right]
 
         # Check date spans
-        for m in DATE_RE.finditer(window):
+        for m in _DATE_RE.finditer(window):
             m_start = left + m.start()
             m_end = left + m.end()
             if _match_span_contains(start, end, m_start, m_end):
                 return True
 
         # Check poetry line references
-        for m in LINE_REF_RE.finditer(window):
+        for m in _LINE_REF_RE.finditer(window):
             m_start = left + m.start()
             m_end = left + m.end()
             if _match_span_contains(start, end, m_start, m_end):
                 return True
 
         # Check parenthetical numeric citations
-        for m in PAREN_CITE_RE.finditer(window):
+        for m in _PAREN_CITE_RE.finditer(window):
             m_start = left + m.start()
             m_end = left + m.end()
             if _match_span_contains(start, end, m_start, m_end):
@@ -7587,7 +8340,7 @@ def analyze_text(
         ]
         for sample_text, should_flag in checks:
             flagged = False
-            for m in number_regex.finditer(sample_text):
+            for m in _SMALL_NUMBER_RE.finditer(sample_text):
                 if is_exempt_one_through_ten(sample_text, m.start(), m.end()):
                     continue
                 if is_parenthetical_citation(sample_text, m.start(), m.end()):
@@ -7604,7 +8357,7 @@ def analyze_text(
                 file=sys.stderr,
             )
 
-    for match in number_regex.finditer(flat_text):
+    for match in _SMALL_NUMBER_RE.finditer(flat_text):
         match_start = match.start()
         match_end = match.end()
 
@@ -7784,7 +8537,11 @@ def analyze_text(
             else:
                 weak_transition_lemmas = set()
                 if matched_phrase:
-                    for tok in nlp(matched_phrase):
+                    phrase_doc = (
+                        ctx.analysis.doc(matched_phrase, "lemma") if ctx.analysis is not None
+                        else parse_text(matched_phrase, "lemma")
+                    )
+                    for tok in phrase_doc:
                         if tok.is_space or tok.is_punct:
                             continue
                         lemma = tok.lemma_.lower().strip()
@@ -7973,7 +8730,7 @@ LABEL_SKIP_CHARS = {
 }
 
 
-def apply_marks(paragraph, flat_text, segments, marks, sentences=None, paragraph_index=None):
+def apply_marks(paragraph, flat_text, segments, marks, sentences=None, paragraph_index=None, ctx=None):
     """
     Rebuild `paragraph` from `flat_text` and a list of `marks`.
 
@@ -8003,9 +8760,12 @@ def apply_marks(paragraph, flat_text, segments, marks, sentences=None, paragraph
 
       * Preserves italic formatting from the original student text character-by-character.
 
+      * Records example sentences (and filters unapproved labels) via `ctx`.
+
     """
-    global DOC_EXAMPLES, DOC_EXAMPLE_COUNTS, DOC_EXAMPLE_SENT_HASHES
-    
+    if ctx is None:
+        ctx = MarkingContext()
+
     # Collect example sentences from marks before mutating paragraph
     sentences_for_examples = sentences
     if sentences_for_examples is None and paragraph_index is not None:
@@ -8057,14 +8817,14 @@ def apply_marks(paragraph, flat_text, segments, marks, sentences=None, paragraph
             # Normalize whitespace: collapse \s+ to single spaces
             sentence_text = re.sub(r'\s+', ' ', sentence_text)
             
-            # Dedupe: compute md5(sentence_text) and use a set key (note, md5) in DOC_EXAMPLE_SENT_HASHES
+            # Dedupe: compute md5(sentence_text) and use a set key (note, md5) in ctx.example_sent_hashes
             sentence_hash = hashlib.md5(sentence_text.encode('utf-8')).hexdigest()
             hash_key = (note, sentence_hash)
-            if hash_key in DOC_EXAMPLE_SENT_HASHES:
+            if hash_key in ctx.example_sent_hashes:
                 continue  # Skip if already seen
             
-            # Cap: only store up to MAX_EXAMPLES_PER_LABEL per label using DOC_EXAMPLE_COUNTS
-            current_count = DOC_EXAMPLE_COUNTS.get(note, 0)
+            # Cap: only store up to MAX_EXAMPLES_PER_LABEL per label using ctx.example_counts
+            current_count = ctx.example_counts.get(note, 0)
             if current_count >= MAX_EXAMPLES_PER_LABEL:
                 continue  # Skip if we've reached the cap for this label
             
@@ -8076,14 +8836,14 @@ def apply_marks(paragraph, flat_text, segments, marks, sentences=None, paragraph
             }
 
             # Transfer context fields from mark to example for dynamic guidance
-            for field in ["found_value", "topics", "thesis", "confidence", "original_phrase", "suggestions", "count"]:
-                if field in mark:
-                    example[field] = mark[field]
+            for attr in ["found_value", "topics", "thesis", "confidence", "original_phrase", "suggestions", "count"]:
+                if attr in mark:
+                    example[attr] = mark[attr]
 
-            DOC_EXAMPLES.append(example)
+            ctx.examples.append(example)
             # Update counts and hashes
-            DOC_EXAMPLE_COUNTS[note] = current_count + 1
-            DOC_EXAMPLE_SENT_HASHES.add(hash_key)
+            ctx.example_counts[note] = current_count + 1
+            ctx.example_sent_hashes.add(hash_key)
     
     def append_text_with_italics(
         paragraph,
@@ -8307,8 +9067,8 @@ def apply_marks(paragraph, flat_text, segments, marks, sentences=None, paragraph
 
         # Handle labels
         if note and is_label:
-            if not mark.get("praise") and APPROVED_LABELS is not None and note not in APPROVED_LABELS:
-                print(f"[LABEL DEBUG] SKIPPED (not in APPROVED_LABELS): '{note}'")
+            if not mark.get("praise") and ctx.approved_labels is not None and note not in ctx.approved_labels:
+                print(f"[LABEL DEBUG] SKIPPED (not in approved labels): '{note}'")
                 continue
             print(f"[LABEL DEBUG] RENDERING label: '{note}' at pos {mark_start}-{mark_end} para={paragraph_index}")
             # Praise labels (e.g. "Good paragraph.") get green; all others stay yellow.
@@ -8498,7 +9258,7 @@ def topic_segment_is_too_thin(topic_segment: str) -> bool:
     return not content_words
 
 
-def is_probable_title_paragraph(paragraph, config: MarkerConfig | None = None):
+def is_probable_title_paragraph(paragraph, config: MarkerConfig | None = None, flat_text: str | None = None):
     """
     Decide if a paragraph is likely the student's title line.
 
@@ -8512,6 +9272,9 @@ def is_probable_title_paragraph(paragraph, config: MarkerConfig | None = None):
          - and either:
              • truly centered via Word alignment, OR
              • manually centered via 2+ leading TABs.
+
+    Pass ``flat_text`` (flatten_paragraph_without_labels output) to skip
+    flattening the paragraph again.
     """
     # Raw Word text, including true tabs at the margin
     raw = paragraph.text or ""
@@ -8531,7 +9294,8 @@ def is_probable_title_paragraph(paragraph, config: MarkerConfig | None = None):
     tab_centered = leading_tabs >= 2
 
     # Use flattened text that strips labels and normalizes quotes/dashes, etc.
-    flat_text, _ = flatten_paragraph_without_labels(paragraph)
+    if flat_text is None:
+        flat_text, _ = flatten_paragraph_without_labels(paragraph)
     # For title detection, ignore all leading tabs (titles shouldn't "look indented")
     text = normalize_leading_whitespace(flat_text, strip_all_tabs_for_title=True).strip()
     if not text:
@@ -8668,10 +9432,7 @@ def looks_like_full_sentence(t: str) -> bool:
 
     # Any sentence-ending punctuation at all makes this look like a sentence
     quote_spans = compute_quote_spans(t)
-    for i, ch in enumerate(t):
-        if ch in ".?!" and not pos_in_spans(i, quote_spans):
-            return True
-    return False
+    return next(sentence_ends_outside_quotes(t, quote_spans), None) is not None
 
 
 
@@ -8829,7 +9590,103 @@ def is_probable_mla_header_line(text: str, config: MarkerConfig | None = None) -
     return False
 
 
-def detect_mla_header_indices(real_paragraphs, config: MarkerConfig | None = None):
+# ── Paragraph feature table ─────────────────────────────────────────────
+# run_marker's structural passes (title split and merge, PEEL merge, header,
+# bibliography, intro and frame detection, the main loop) used to flatten and
+# classify the same paragraphs over and over. A ParagraphFeatureTable computes
+# each paragraph's features once per document and keeps them until the pass
+# that splits or merges that paragraph invalidates them. The main loop reads
+# each paragraph's features before apply_marks rebuilds it and never after.
+
+
+@dataclass
+class ParagraphFeatures:
+    flat_text: str            # flatten_paragraph_without_labels()
+    segments: list
+    text: str                 # flat_text.strip()
+    tab_centered: bool        # 2+ leading tabs (manual centering)
+    centered: bool            # Word-centered or tab-centered
+    is_title: bool | None = None          # filled in by ParagraphFeatureTable
+    is_header_line: bool | None = None    # ditto (None also for blank lines)
+    _quote_spans: QuoteSpans | None = None
+
+    @property
+    def quote_spans(self) -> QuoteSpans:
+        """compute_quote_spans(text), computed on first use."""
+        if self._quote_spans is None:
+            self._quote_spans = compute_quote_spans(self.text)
+        return self._quote_spans
+
+
+class ParagraphFeatureTable:
+    """Per-document ParagraphFeatures, keyed by paragraph element.
+
+    Code that changes a paragraph's runs or text must call invalidate() on
+    it before the table is read again.
+    """
+
+    def __init__(self, config: MarkerConfig | None = None):
+        self.config = config
+        # w:p element -> features
+        self._entries: dict = {}
+
+    def get(self, paragraph) -> ParagraphFeatures:
+        element = paragraph._element
+        features = self._entries.get(element)
+        if features is None:
+            features = self._compute(paragraph)
+            self._entries[element] = features
+        return features
+
+    def invalidate(self, paragraph) -> None:
+        """Forget ``paragraph``'s features (after it was split, merged into or removed)."""
+        self._entries.pop(paragraph._element, None)
+
+    def is_title(self, paragraph) -> bool:
+        """is_probable_title_paragraph() for the table's config."""
+        features = self.get(paragraph)
+        if features.is_title is None:
+            features.is_title = is_probable_title_paragraph(
+                paragraph, config=self.config, flat_text=features.flat_text
+            )
+        return features.is_title
+
+    def is_header_line(self, paragraph) -> bool | None:
+        """is_probable_mla_header_line() on the raw Word text; None for a blank line."""
+        features = self.get(paragraph)
+        if features.is_header_line is None:
+            raw_text, _ = flatten_paragraph(paragraph, skip_vysti=False)
+            if raw_text.strip() == "":
+                return None
+            features.is_header_line = is_probable_mla_header_line(raw_text, config=self.config)
+        return features.is_header_line
+
+    @staticmethod
+    def _compute(paragraph) -> ParagraphFeatures:
+        flat_text, segments = flatten_paragraph_without_labels(paragraph)
+        leading_tabs = 0
+        for ch in paragraph.text or "":
+            if ch == "\t":
+                leading_tabs += 1
+            elif ch in (" ", "\u00A0"):
+                continue
+            else:
+                break
+        tab_centered = leading_tabs >= 2
+        return ParagraphFeatures(
+            flat_text=flat_text,
+            segments=segments,
+            text=flat_text.strip(),
+            tab_centered=tab_centered,
+            centered=paragraph.alignment == WD_PARAGRAPH_ALIGNMENT.CENTER or tab_centered,
+        )
+
+
+def detect_mla_header_indices(
+    real_paragraphs,
+    config: MarkerConfig | None = None,
+    features: ParagraphFeatureTable | None = None,
+):
     """
     Return a set of paragraph indices (in the real_paragraphs list) that form
     a top-of-document MLA-style header block (name, teacher, course, date, etc.).
@@ -8845,7 +9702,9 @@ def detect_mla_header_indices(real_paragraphs, config: MarkerConfig | None = Non
     Args:
         real_paragraphs: List of (old_idx, paragraph) pairs
         config: MarkerConfig to access teacher-supplied title
-        
+        features: Optional ParagraphFeatureTable (built with the same config)
+            that memoizes the per-paragraph check
+
     Returns:
         Set of new_idx values that are part of the MLA header block
     """
@@ -8856,6 +9715,11 @@ def detect_mla_header_indices(real_paragraphs, config: MarkerConfig | None = Non
         if new_idx > 5:
             break
 
+        if features is not None:
+            if features.is_header_line(p):
+                header_indices.add(new_idx)
+            continue
+
         # Get text via flatten_paragraph so we see the actual Word text
         # (including any tabs, but normalization happens in is_probable_mla_header_line)
         flat_text, _ = flatten_paragraph(p, skip_vysti=False)
@@ -8899,7 +9763,7 @@ _CITATION_ENTRY_RE = _re.compile(
 )
 
 
-def detect_bibliography_indices(real_paragraphs, config=None):
+def detect_bibliography_indices(real_paragraphs, config=None, features: ParagraphFeatureTable | None = None):
     """
     Return a set of paragraph indices (in the real_paragraphs list) that form
     a bibliography / Works Cited / References section at the end of the document.
@@ -8913,6 +9777,11 @@ def detect_bibliography_indices(real_paragraphs, config=None):
     As a fallback, if no heading is found but the last few paragraphs look like
     MLA/APA citation entries, those are included too.
     """
+    def stripped_text(p):
+        if features is not None:
+            return features.get(p).text
+        return flatten_paragraph_without_labels(p)[0].strip()
+
     total = len(real_paragraphs)
     if total < 3:
         return set()
@@ -8925,8 +9794,7 @@ def detect_bibliography_indices(real_paragraphs, config=None):
         if new_idx <= half:
             continue
 
-        flat_text, _ = flatten_paragraph_without_labels(p)
-        text = flat_text.strip()
+        text = stripped_text(p)
         if not text:
             continue
 
@@ -8941,8 +9809,7 @@ def detect_bibliography_indices(real_paragraphs, config=None):
         trailing_citations = []
         for new_idx in range(max(half, total - 5), total):
             _, p = real_paragraphs[new_idx]
-            flat_text, _ = flatten_paragraph_without_labels(p)
-            text = flat_text.strip()
+            text = stripped_text(p)
             if text and _CITATION_ENTRY_RE.match(text):
                 trailing_citations.append(new_idx)
 
@@ -8969,10 +9836,9 @@ def _find_last_sentence_start(text, quote_spans):
     """
     prev_end = 0   # position after the second-to-last sentence ending
     last_end = 0   # position after the most recent sentence ending
-    for i, ch in enumerate(text):
-        if ch in {".", "?", "!"} and not pos_in_spans(i, quote_spans):
-            prev_end = last_end
-            last_end = i + 1
+    for i in sentence_ends_outside_quotes(text, quote_spans):
+        prev_end = last_end
+        last_end = i + 1
     # The last sentence starts after the second-to-last ending
     start = prev_end
     while start < len(text) and text[start] in {" ", "\t", "\n", "\r"}:
@@ -8994,7 +9860,14 @@ def _text_has_device_words(text):
     return False
 
 
-def detect_frame_intro_shift(real_paragraphs, intro_idx, header_indices, bibliography_indices, config):
+def detect_frame_intro_shift(
+    real_paragraphs,
+    intro_idx,
+    header_indices,
+    bibliography_indices,
+    config,
+    features: ParagraphFeatureTable | None = None,
+):
     """
     Detect a Frame essay where paragraph 1 is a literary frame (philosophical,
     quotation-based, or narrative) and the real introduction — with author,
@@ -9016,6 +9889,8 @@ def detect_frame_intro_shift(real_paragraphs, intro_idx, header_indices, bibliog
     """
     if config is None or intro_idx is None:
         return intro_idx
+    if features is None:
+        features = ParagraphFeatureTable(config)
 
     # Gate: only run when intro quote rule is disabled
     if getattr(config, "enforce_intro_quote_rule", True):
@@ -9023,8 +9898,8 @@ def detect_frame_intro_shift(real_paragraphs, intro_idx, header_indices, bibliog
 
     # ── Extract current intro paragraph text ──
     _, intro_para = real_paragraphs[intro_idx]
-    intro_text, _ = flatten_paragraph_without_labels(intro_para)
-    intro_text = intro_text.strip()
+    intro_features = features.get(intro_para)
+    intro_text = intro_features.text
     if not intro_text:
         return intro_idx
 
@@ -9056,7 +9931,7 @@ def detect_frame_intro_shift(real_paragraphs, intro_idx, header_indices, bibliog
     intro_has_title = bool(TITLE_QUOTE_PATTERN.search(intro_text))
 
     # Check if last sentence has device/strategy words (thesis candidate)
-    intro_quote_spans = compute_quote_spans(intro_text)
+    intro_quote_spans = intro_features.quote_spans
     last_sent_start = _find_last_sentence_start(intro_text, intro_quote_spans)
     last_sentence = intro_text[last_sent_start:] if last_sent_start < len(intro_text) else intro_text
     intro_has_thesis = _text_has_device_words(last_sentence)
@@ -9079,10 +9954,9 @@ def detect_frame_intro_shift(real_paragraphs, intro_idx, header_indices, bibliog
         if idx in header_indices or idx in bibliography_indices:
             continue
         _, p = real_paragraphs[idx]
-        flat, _ = flatten_paragraph_without_labels(p)
-        if not flat.strip():
+        if not features.get(p).text:
             continue
-        if is_probable_title_paragraph(p, config=config):
+        if features.is_title(p):
             continue
         candidate_idx = idx
         break
@@ -9092,19 +9966,17 @@ def detect_frame_intro_shift(real_paragraphs, intro_idx, header_indices, bibliog
 
     # ── Analyze candidate paragraph ──
     _, cand_para = real_paragraphs[candidate_idx]
-    cand_text, _ = flatten_paragraph_without_labels(cand_para)
-    cand_text = cand_text.strip()
+    cand_features = features.get(cand_para)
+    cand_text = cand_features.text
     if not cand_text:
         return intro_idx
 
-    cand_quote_spans = compute_quote_spans(cand_text)
+    cand_quote_spans = cand_features.quote_spans
 
     # Find first sentence of candidate (text up to first sentence-ending outside quotes)
-    first_sent_end = None
-    for i, ch in enumerate(cand_text):
-        if ch in {".", "?", "!"} and not pos_in_spans(i, cand_quote_spans):
-            first_sent_end = i + 1
-            break
+    first_sent_end = next(sentence_ends_outside_quotes(cand_text, cand_quote_spans), None)
+    if first_sent_end is not None:
+        first_sent_end += 1
     first_sentence = cand_text[:first_sent_end] if first_sent_end else cand_text
 
     # Condition 3: first sentence has intro character
@@ -9411,28 +10283,32 @@ def extract_richer_examples(doc: Document) -> list[dict]:
     return list(examples_map.values())
 
 
-def build_techniques_discussed(docx_bytes: bytes, mode: str) -> list[dict]:
+def build_techniques_discussed(
+    docx_bytes: bytes,
+    mode: str,
+    ctx: MarkingContext | None = None,
+) -> list[dict]:
     """Count every rhetorical/literary device the student deployed across
     the entire essay. Previously this filtered to only thesis-declared
-    devices (THESIS_ALL_DEVICE_KEYS), which caused the downloaded
+    devices (thesis_all_device_keys), which caused the downloaded
     "Techniques used" list to undercount what the student actually used
     in their body paragraphs. Now counts every detected device span.
     """
     if mode == "argumentation":
         return []
     try:
-        base_doc = Document(BytesIO(docx_bytes))
-        paragraphs = [p.text for p in base_doc.paragraphs if p.text and p.text.strip()]
-        if not paragraphs:
+        analysis = ctx.analysis if ctx is not None else None
+        if analysis is None:
+            analysis = EssayAnalysis.from_docx_bytes(docx_bytes)
+        if not analysis.paragraphs:
             return []
-        full_text = "\n".join(paragraphs).strip()
+        full_text = analysis.raw_full_text
         if not full_text:
             return []
 
-        doc_spacy = nlp(full_text)
         from collections import Counter
         counts = Counter()
-        for device_key, _, _ in iter_device_spans(doc_spacy):
+        for device_key, _, _ in analysis.device_spans(full_text):
             counts[device_key] += 1
 
         if not counts:
@@ -9441,7 +10317,7 @@ def build_techniques_discussed(docx_bytes: bytes, mode: str) -> list[dict]:
         # Order: thesis-declared devices first (in thesis order), then
         # any other devices ranked by count desc.
         ordered_keys = []
-        for key in THESIS_TOPIC_ORDER:
+        for key in (ctx.thesis_topic_order if ctx is not None else []):
             if key in counts and key not in ordered_keys:
                 ordered_keys.append(key)
         remaining = sorted(
@@ -9465,6 +10341,8 @@ def mark_docx_bytes(
     teacher_config: dict | None = None,
     rules_path: str = "Vysti Rules for Writing.xlsx",
     include_summary_table: bool = True,
+    grammar_matches: dict | None = None,
+    paragraph_marks: dict | None = None,
 ) -> tuple[bytes, dict]:
     """
     High-level engine API for web/backend use.
@@ -9484,6 +10362,18 @@ def mark_docx_bytes(
             "text_title": "Young Hunger",
             "text_is_minor_work": True,
         }
+
+    'grammar_matches' lets a repeat check of the same essay skip
+    LanguageTool for unchanged paragraphs: pass the dict returned in
+    metadata["grammar_matches"] by the previous call ({paragraph text:
+    [GrammarMatch, ...]}). When given, metadata["grammar_matches"] is set
+    to the matches for this essay's paragraphs.
+
+    'paragraph_marks' does the same for the marks themselves: pass the
+    dict returned in metadata["paragraph_marks"] by the previous call, and
+    paragraphs whose text and document-level inputs are unchanged reuse
+    their analysis (see analyze_paragraph). When given,
+    metadata["paragraph_marks"] is set to this essay's results.
     """
     # 1. Build a MarkerConfig
     config = get_preset_config(mode)
@@ -9501,20 +10391,28 @@ def mark_docx_bytes(
 
     config.student_mode = not include_summary_table
 
+    # Per-call engine state; nothing is shared with concurrent marks.
+    ctx = MarkingContext()
+    if grammar_matches:
+        ctx.grammar_reuse = grammar_matches
+    if paragraph_marks is not None:
+        ctx.marks_reuse = paragraph_marks
+        ctx.paragraph_marks = {}
+
+    # Read the original essay once; guessing, the techniques list, lexis
+    # and positive events all share its text and spaCy parses.
+    try:
+        ctx.analysis = EssayAnalysis.from_docx_bytes(docx_bytes)
+    except Exception:
+        ctx.analysis = None
+
     # 1b. Auto-detect author/title from the essay text so that
     #     is_teacher_title_interior() can exempt the guessed title
     #     during the FIRST mark (not only on recheck).
     #     Only fills in values that weren't already teacher-supplied.
-    if not config.text_title:
+    if not config.text_title and ctx.analysis is not None:
         try:
-            pre_doc = Document(BytesIO(docx_bytes))
-            pre_text_parts = []
-            for para in pre_doc.paragraphs:
-                t = para.text.strip()
-                if t:
-                    pre_text_parts.append(t)
-            pre_text = "\n".join(pre_text_parts)
-            guesses = guess_author_and_title(pre_text)
+            guesses = ctx.analysis.guess_author_and_title()
             if guesses["guessed_title"]:
                 config.text_title = guesses["guessed_title"]
                 config.text_is_minor_work = guesses["guessed_is_minor"]
@@ -9533,16 +10431,15 @@ def mark_docx_bytes(
     try:
         # 3. Call the existing path-based engine
         #    (this keeps run_marker unchanged for CLI/legacy use)
-        tmp_out_path = run_marker(tmp_in_path, rules_path=rules_path, config=config)
+        tmp_out_path = run_marker(tmp_in_path, rules_path=rules_path, config=config, ctx=ctx)
 
         # 4. Read the marked .docx back into memory
         with open(tmp_out_path, "rb") as f:
             marked_bytes = f.read()
 
-        # 5. Build metadata directly from globals (no summary table needed)
-        global DOC_ISSUES_METADATA
-        metadata = {"issues": DOC_ISSUES_METADATA if DOC_ISSUES_METADATA else []}
-        techniques_discussed = build_techniques_discussed(docx_bytes, mode)
+        # 5. Build metadata directly from the marking context (no summary table needed)
+        metadata = {"issues": ctx.issues_metadata if ctx.issues_metadata else []}
+        techniques_discussed = build_techniques_discussed(docx_bytes, mode, ctx=ctx)
         if isinstance(metadata, dict):
             metadata["techniques_discussed"] = techniques_discussed
         try:
@@ -9611,53 +10508,44 @@ def mark_docx_bytes(
                     or HARDCODED_SHARED_EXPLANATIONS.get(label, "")
                 )
         
-        # 6. Always use DOC_EXAMPLES (the multi-example list collected during marking)
+        # 6. Always use ctx.examples (the multi-example list collected during marking)
         # DO NOT overwrite with extract_richer_examples() which can only capture
         # one example per label (from yellow label runs " → ") and misses all
         # occurrences that don't have yellow labels.
-        global DOC_EXAMPLES
-        metadata["examples"] = DOC_EXAMPLES if DOC_EXAMPLES else []
+        metadata["examples"] = ctx.examples if ctx.examples else []
 
-        global DOC_SENTENCE_TYPES
-        metadata["sentence_types"] = DOC_SENTENCE_TYPES if DOC_SENTENCE_TYPES else {}
+        metadata["sentence_types"] = ctx.sentence_types if ctx.sentence_types else {}
 
-        global DOC_FIRST_SENTENCE_COMPONENTS
-        metadata["first_sentence_components"] = DOC_FIRST_SENTENCE_COMPONENTS or {}
+        metadata["first_sentence_components"] = ctx.first_sentence_components or {}
 
-        global DOC_REPEATED_NOUNS
         # Filter accumulated nouns by document-level threshold
-        if DOC_REPEATED_NOUNS and DOC_TOTAL_WORD_COUNT:
-            if DOC_TOTAL_WORD_COUNT < 300:
-                rep_threshold = max(3, DOC_TOTAL_WORD_COUNT // 100)
-            elif DOC_TOTAL_WORD_COUNT <= 700:
-                rep_threshold = 5
-            else:
-                rep_threshold = 6 + (DOC_TOTAL_WORD_COUNT - 700) // 200
-            DOC_REPEATED_NOUNS = [n for n in DOC_REPEATED_NOUNS if n["count"] >= rep_threshold]
-        metadata["repeated_nouns"] = DOC_REPEATED_NOUNS if DOC_REPEATED_NOUNS else []
-        metadata["word_count"] = DOC_TOTAL_WORD_COUNT
+        if ctx.repeated_nouns and ctx.total_word_count:
+            rep_threshold = noun_repetition_threshold(ctx.total_word_count)
+            ctx.repeated_nouns = [n for n in ctx.repeated_nouns if n["count"] >= rep_threshold]
+        metadata["repeated_nouns"] = ctx.repeated_nouns if ctx.repeated_nouns else []
+        metadata["word_count"] = ctx.total_word_count
+        metadata["grammar_checks"] = grammar_check_status(ctx)
+        if grammar_matches is not None:
+            metadata["grammar_matches"] = ctx.grammar_matches
+        if paragraph_marks is not None:
+            metadata["paragraph_marks"] = ctx.paragraph_marks
 
         # 7. Detect lexis terms in the original document text
         # Extract clean text from the original (unmarked) document for lexis detection
         try:
-            original_doc = Document(BytesIO(docx_bytes))
-            full_text_parts = []
-            for para in original_doc.paragraphs:
-                para_text = para.text.strip()
-                if para_text:
-                    full_text_parts.append(para_text)
-            full_text = "\n".join(full_text_parts)
+            analysis = ctx.analysis or EssayAnalysis.from_docx_bytes(docx_bytes)
+            full_text = analysis.full_text
 
             # Detect lexis terms (filters to concept, device, event, person by default)
-            detected_lexis = detect_lexis_in_text(full_text)
+            detected_lexis = detect_lexis_in_text(full_text, doc=analysis.doc(full_text, "lemma"))
             metadata["detected_lexis"] = detected_lexis
             # Positive-signal aggregation for the Progress Report:
             # power verbs, devices, and lexis terms used in the essay.
             # Stored on mark_events.positive_events JSONB column.
-            metadata["positive_events"] = _compute_positive_events(full_text, detected_lexis)
+            metadata["positive_events"] = _compute_positive_events(full_text, detected_lexis, analysis)
             # Guess author and title from the first body paragraph
             try:
-                guesses = guess_author_and_title(full_text)
+                guesses = analysis.guess_author_and_title()
                 metadata["guessed_author"] = guesses["guessed_author"]
                 metadata["guessed_title"] = guesses["guessed_title"]
                 metadata["guessed_is_minor"] = guesses["guessed_is_minor"]
@@ -9689,48 +10577,185 @@ def mark_docx_bytes(
     return marked_bytes, metadata
 
 
+# ── Paragraph mark reuse ────────────────────────────────────────────────
+# Re-analyzing every paragraph is most of a /check_text call, and the Write
+# page sends the whole essay after every pause in typing. analyze_text's
+# result for a paragraph depends on the paragraph itself and on
+# document-level inputs: its index, the paragraph count and intro index
+# (which set its role), the thesis read from the intro, the body-paragraph
+# count and bridge keys, the first-use labels earlier paragraphs already
+# placed, the previous body paragraph's last sentence, the noun-repetition
+# threshold set by the essay's word count, and the config. analyze_paragraph
+# keys each result by a digest of all of them, so a paragraph whose text and
+# inputs are unchanged since the previous check replays its marks and its
+# effect on the MarkingContext instead of being analyzed again.
+
+# MarkingContext fields analyze_text reads or overwrites: part of the key,
+# and their new values are replayed.
+_PARAGRAPH_STATE_FIELDS = (
+    "thesis_device_sequence", "thesis_topic_order", "thesis_all_device_keys",
+    "thesis_noun_lemmas", "thesis_text_lower", "thesis_text",
+    "body_paragraph_count", "bridge_paragraphs", "bridge_device_keys",
+    "thesis_paragraph_index", "thesis_anchor_pos", "foundation1_label_target",
+    "first_sentence_components",
+)
+
+
+def _stable_json(value) -> str:
+    """JSON that is identical in every process (sets sorted, not in hash order)."""
+    def _default(obj):
+        if isinstance(obj, (set, frozenset)):
+            return sorted(obj, key=str)
+        return repr(obj)
+    return json.dumps(value, sort_keys=True, default=_default, separators=(",", ":"))
+
+
+def config_digest(config: MarkerConfig) -> str:
+    """Digest of every MarkerConfig setting, for keys of cached per-paragraph results."""
+    return hashlib.sha256(_stable_json(vars(config)).encode("utf-8")).hexdigest()
+
+
+def _merge_repeated_nouns(repeated_nouns: list[dict], additions: list[dict]) -> list[dict]:
+    """repeated_nouns with one paragraph's noun tallies added, as analyze_text accumulates them."""
+    merged = {item["lemma"]: item for item in repeated_nouns}
+    for item in additions:
+        existing = merged.get(item["lemma"])
+        if existing is None:
+            merged[item["lemma"]] = item
+        else:
+            existing["count"] += item["count"]
+            existing["forms"] = list(set(existing["forms"] + item["forms"]))
+    return sorted(merged.values(), key=lambda x: -x["count"])
+
+
+def analyze_paragraph(
+    paragraph,
+    *,
+    paragraph_index,
+    total_paragraphs,
+    labels_used,
+    intro_idx,
+    config: MarkerConfig,
+    config_key: str,
+    prev_body_last_sentence_content_words: set[str] | None,
+    doc_total_word_count: int,
+    ctx: MarkingContext,
+):
+    """
+    analyze_text(), reusing the paragraph's result from ctx.marks_reuse
+    when the paragraph and every document-level input it reads are
+    unchanged. Results are recorded in ctx.paragraph_marks (when not None);
+    a paragraph that missed any LanguageTool check is not recorded, so a
+    degraded result is never replayed.
+    """
+    if ctx.paragraph_marks is None:
+        return analyze_text(
+            paragraph,
+            paragraph_index=paragraph_index,
+            total_paragraphs=total_paragraphs,
+            labels_used=labels_used,
+            intro_idx=intro_idx,
+            config=config,
+            prev_body_last_sentence_content_words=prev_body_last_sentence_content_words,
+            doc_total_word_count=doc_total_word_count,
+            ctx=ctx,
+        )
+
+    flat_text, segments = flatten_paragraph_without_labels(paragraph)
+    state_before = {name: _stable_json(getattr(ctx, name)) for name in _PARAGRAPH_STATE_FIELDS}
+    key = hashlib.sha256(_stable_json({
+        "paragraph": paragraph._element.xml,  # formatting too: title rules read italics
+        "index": paragraph_index,
+        "total": total_paragraphs,
+        "intro": intro_idx,
+        "config": config_key,
+        "labels_used": set(labels_used),
+        "prev_body": prev_body_last_sentence_content_words,
+        "noun_threshold": noun_repetition_threshold(doc_total_word_count or len(flat_text.split())),
+        "state": state_before,
+    }).encode("utf-8")).hexdigest()
+
+    blob = ctx.marks_reuse.get(key)
+    if blob is not None:
+        entry = pickle.loads(blob)
+        labels_used.extend(label for label in entry["labels"] if label not in labels_used)
+        for name, value in entry["state"].items():
+            setattr(ctx, name, value)
+        if entry["sentence_types"] is not None:
+            ctx.sentence_types[paragraph_index] = entry["sentence_types"]
+        ctx.repeated_nouns = _merge_repeated_nouns(ctx.repeated_nouns, entry["nouns"])
+        if flat_text in ctx.grammar_reuse:
+            ctx.grammar_matches[flat_text] = ctx.grammar_reuse[flat_text]
+        ctx.paragraph_marks[key] = blob
+        return entry["marks"], flat_text, segments, entry["sentences"], entry["last_words"]
+
+    # Run with an empty noun tally so this paragraph's contribution can be
+    # stored and merged on its own
+    labels_before = len(labels_used)
+    skipped_before = ctx.grammar_skipped
+    repeated_nouns = ctx.repeated_nouns
+    ctx.repeated_nouns = []
+    try:
+        marks, flat_text, segments, sentences, last_words = analyze_text(
+            paragraph,
+            paragraph_index=paragraph_index,
+            total_paragraphs=total_paragraphs,
+            labels_used=labels_used,
+            intro_idx=intro_idx,
+            config=config,
+            prev_body_last_sentence_content_words=prev_body_last_sentence_content_words,
+            doc_total_word_count=doc_total_word_count,
+            ctx=ctx,
+        )
+    finally:
+        paragraph_nouns = ctx.repeated_nouns
+        ctx.repeated_nouns = _merge_repeated_nouns(repeated_nouns, paragraph_nouns)
+
+    # A derivation check cut short by the breaker or the budget isn't
+    # counted in grammar_skipped; don't keep results from then either.
+    grammar_complete = (
+        ctx.grammar_skipped == skipped_before
+        and _LT_BREAKER.state == "closed"
+        and ctx.grammar_seconds < LT_BUDGET_SECONDS
+    )
+    if grammar_complete:
+        entry = {
+            "marks": marks,
+            "sentences": sentences,
+            "last_words": last_words,
+            "labels": labels_used[labels_before:],
+            "state": {
+                name: getattr(ctx, name) for name in _PARAGRAPH_STATE_FIELDS
+                if _stable_json(getattr(ctx, name)) != state_before[name]
+            },
+            "sentence_types": ctx.sentence_types.get(paragraph_index),
+            "nouns": paragraph_nouns,
+        }
+        try:
+            ctx.paragraph_marks[key] = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            print(f"[paragraph marks] not caching paragraph {paragraph_index}: {e!r}")
+    return marks, flat_text, segments, sentences, last_words
+
+
 def run_marker(
     essay_path: str,
     rules_path: str = "Vysti Rules for Writing.xlsx",
     config: MarkerConfig | None = None,
+    ctx: MarkingContext | None = None,
 ) -> str:
     """
     Runs the Vysti marker on the given essay and returns the path
     to the saved *_marked.docx file.
+
+    Per-document state (thesis topics, examples, issue counts, ...) is kept
+    on `ctx`; pass a fresh MarkingContext to read it back after the call.
     """
-    # Reset global state for this document
     print("Vysti marker: audience/use-of/red-label version loaded")
-    global THESIS_DEVICE_SEQUENCE, THESIS_TOPIC_ORDER, BODY_PARAGRAPH_COUNT, BRIDGE_PARAGRAPHS, BRIDGE_DEVICE_KEYS
-    global BOOKMARK_ID_COUNTER, FOUNDATION1_LABEL_TARGET
-    global APPROVED_LABELS
-    global THESIS_PARAGRAPH_INDEX, THESIS_ANCHOR_POS, THESIS_ALL_DEVICE_KEYS, THESIS_TEXT_LOWER, THESIS_TEXT, THESIS_NOUN_LEMMAS
-    global DOC_EXAMPLES, DOC_EXAMPLE_COUNTS, DOC_EXAMPLE_SENT_HASHES
-    global DOC_SENTENCE_TYPES
-    global DOC_FIRST_SENTENCE_COMPONENTS
-    global DOC_TOTAL_WORD_COUNT
-    global DOC_ISSUES_METADATA
-
-    THESIS_DEVICE_SEQUENCE = []
-    THESIS_TOPIC_ORDER = []
-    THESIS_ALL_DEVICE_KEYS = set()
-    THESIS_NOUN_LEMMAS = set()
-    THESIS_TEXT_LOWER = ""
-    THESIS_TEXT = ""
-    BODY_PARAGRAPH_COUNT = 0
-    BRIDGE_PARAGRAPHS = set()
-    BRIDGE_DEVICE_KEYS = {}
-    BOOKMARK_ID_COUNTER = 1
-    FOUNDATION1_LABEL_TARGET = None
-    THESIS_PARAGRAPH_INDEX = None
-    THESIS_ANCHOR_POS = None
-    DOC_EXAMPLES = []
-    DOC_EXAMPLE_COUNTS = {}
-    DOC_EXAMPLE_SENT_HASHES = set()
-    DOC_SENTENCE_TYPES = {}
-    DOC_FIRST_SENTENCE_COMPONENTS = None
-    DOC_REPEATED_NOUNS = []
-    DOC_TOTAL_WORD_COUNT = 0
-    DOC_ISSUES_METADATA = []
+    # Fresh per-document state unless the caller wants to read it back
+    # afterwards (mark_docx_bytes builds metadata from it).
+    if ctx is None:
+        ctx = MarkingContext()
 
     if config is None:
         # Default behavior remains the existing full analytic mode
@@ -9762,7 +10787,7 @@ def run_marker(
     for _lbl, _expl in _hardcoded_explanations.items():
         if _lbl not in rules:
             rules[_lbl] = _expl
-    APPROVED_LABELS = set(rules.keys()) | INLINE_LABEL_ALLOWLIST
+    ctx.approved_labels = set(rules.keys()) | INLINE_LABEL_ALLOWLIST
     doc = Document(essay_path)
 
     # Clear Word document headers/footers in student mode to remove MLA info
@@ -9783,6 +10808,10 @@ def run_marker(
     from collections import Counter
     issue_counts = Counter()
 
+    # Flattened text, centering, title/header classification and quote spans
+    # per paragraph, shared by every structural pass below.
+    features = ParagraphFeatureTable(config)
+
 
         # ------------------------------------------------------------------
     # TITLE PRE-PROCESSING:
@@ -9795,7 +10824,7 @@ def run_marker(
         if p.text.strip() and not _is_hidden_paragraph(p)
     ]
 
-    tmp_header_indices = detect_mla_header_indices(tmp_real_paragraphs, config=config)
+    tmp_header_indices = detect_mla_header_indices(tmp_real_paragraphs, config=config, features=features)
 
     # ---------- (1) Split combined title + intro in one centered paragraph ----------
     for new_idx, (old_idx, p) in enumerate(tmp_real_paragraphs):
@@ -9803,26 +10832,13 @@ def run_marker(
             continue
 
         # Look only at non-empty paragraphs
-        flat_text, _ = flatten_paragraph_without_labels(p)
-        text = flat_text.strip()
+        p_features = features.get(p)
+        text = p_features.text
         if not text:
             continue
 
         # Quick centering heuristic: true center alignment OR manual 2+ tab center
-        raw = p.text or ""
-        leading_tabs = 0
-        for ch in raw:
-            if ch == "\t":
-                leading_tabs += 1
-            elif ch in (" ", "\u00A0"):
-                continue
-            else:
-                break
-        tab_centered = leading_tabs >= 2
-        is_centered = (
-            p.alignment == WD_PARAGRAPH_ALIGNMENT.CENTER
-            or tab_centered
-        )
+        is_centered = p_features.centered
 
         # We only split when the student has effectively "made everything the title"
         # by centering it.
@@ -9910,6 +10926,7 @@ def run_marker(
             new_p.append(r)
             parent.insert(parent.index(p._element) + 1, new_p)
 
+        features.invalidate(p)
         # We only need to fix the first combined title+intro; bail out.
         break
 
@@ -9918,7 +10935,7 @@ def run_marker(
         (i, p) for i, p in enumerate(doc.paragraphs)
         if p.text.strip() and not _is_hidden_paragraph(p)
     ]
-    tmp_header_indices = detect_mla_header_indices(tmp_real_paragraphs, config=config)
+    tmp_header_indices = detect_mla_header_indices(tmp_real_paragraphs, config=config, features=features)
 
     # ---------- (2) Flatten multi-paragraph title block (your existing logic) ----------
     title_start_idx = None
@@ -9928,7 +10945,7 @@ def run_marker(
         if new_idx in tmp_header_indices:
             continue
         # Find first non-header paragraph that looks like a title
-        if is_probable_title_paragraph(p, config=config):
+        if features.is_title(p):
             title_start_idx = new_idx
             title_end_idx = new_idx
             # Extend the title block through all immediately following paragraphs
@@ -9936,8 +10953,7 @@ def run_marker(
             # or continue the title phrase.
             for look_ahead in range(new_idx + 1, len(tmp_real_paragraphs)):
                 _, q = tmp_real_paragraphs[look_ahead]
-                flat_q, _ = flatten_paragraph_without_labels(q)
-                text_q = flat_q.strip()
+                text_q = features.get(q).text
                 if not text_q:
                     continue
 
@@ -9974,10 +10990,12 @@ def run_marker(
             parent = para._element.getparent()
             if parent is not None:
                 parent.remove(para._element)
+            features.invalidate(para)
 
         # Ensure the base paragraph's original runs also use Times New Roman 12
         for run in base_para.runs:
             enforce_font(run)
+        features.invalidate(base_para)
 
 
     # ------------------------------------------------------------------
@@ -9994,6 +11012,7 @@ def run_marker(
         tmp_header_indices = detect_mla_header_indices(
             tmp_real_paragraphs,
             config=config,
+            features=features,
         )
 
         # Find the first non-header, non-title paragraph.
@@ -10003,12 +11022,10 @@ def run_marker(
             if new_idx in tmp_header_indices:
                 continue
 
-            flat_text, _ = flatten_paragraph_without_labels(p)
-            text = flat_text.strip()
-            if not text:
+            if not features.get(p).text:
                 continue
 
-            if is_probable_title_paragraph(p, config=config):
+            if features.is_title(p):
                 continue
 
             peel_start_idx = new_idx
@@ -10040,6 +11057,8 @@ def run_marker(
                 # Physically remove this paragraph node from the document
                 parent = p._element.getparent()
                 parent.remove(p._element)
+                features.invalidate(p)
+            features.invalidate(base_para)
 
     # After optional PEEL flattening, recompute real_paragraphs as usual.
     real_paragraphs = [
@@ -10054,14 +11073,14 @@ def run_marker(
     # ====================================================================
     # Detect top-of-document MLA-style header lines (name, teacher, course, date).
     # These "garbage" lines should not confuse title/intro detection.
-    header_indices = detect_mla_header_indices(real_paragraphs, config=config)
+    header_indices = detect_mla_header_indices(real_paragraphs, config=config, features=features)
 
     # ====================================================================
     # STEP 1b: DETECT AND SKIP BIBLIOGRAPHY / WORKS CITED SECTION
     # ====================================================================
     # Detect end-of-document bibliography sections (Works Cited, References,
     # Bibliography, etc.) so they are not analyzed or labelled.
-    bibliography_indices = detect_bibliography_indices(real_paragraphs, config=config)
+    bibliography_indices = detect_bibliography_indices(real_paragraphs, config=config, features=features)
 
     # Adjust total_real_paras so get_paragraph_role correctly identifies the
     # conclusion as the last non-bibliography paragraph.
@@ -10082,21 +11101,18 @@ def run_marker(
         if new_idx in header_indices:
             continue
 
-        flat_text, _ = flatten_paragraph_without_labels(p)
-        text = flat_text.strip()
-        if not text:
+        p_features = features.get(p)
+        if not p_features.text:
             continue
 
-        if is_probable_title_paragraph(p, config=config):
+        if features.is_title(p):
             continue
 
         # Count true sentences based on .?! outside quotes
-        quote_spans = compute_quote_spans(text)
-        sentence_ending_count = 0
-        for i, ch in enumerate(text):
-            if ch in {".", "?", "!"} and not pos_in_spans(i, quote_spans):
-                    sentence_ending_count += 1
-        
+        sentence_ending_count = sum(
+            1 for _ in sentence_ends_outside_quotes(p_features.text, p_features.quote_spans)
+        )
+
         if sentence_ending_count > 1:
             intro_idx = new_idx
             break
@@ -10106,13 +11122,11 @@ def run_marker(
         for new_idx, (old_idx, p) in enumerate(real_paragraphs):
             if new_idx in header_indices:
                 continue
-        
-            flat_text, _ = flatten_paragraph_without_labels(p)
-            text = flat_text.strip()
-            if not text:
+
+            if not features.get(p).text:
                 continue
 
-            if is_probable_title_paragraph(p, config=config):
+            if features.is_title(p):
                 continue
 
             intro_idx = new_idx
@@ -10129,7 +11143,7 @@ def run_marker(
     # the next paragraph looks like a real introduction (author, title, genre,
     # thesis with device words), shift intro_idx to that paragraph.
     intro_idx = detect_frame_intro_shift(
-        real_paragraphs, intro_idx, header_indices, bibliography_indices, config
+        real_paragraphs, intro_idx, header_indices, bibliography_indices, config, features=features
     )
 
     # ====================================================================
@@ -10145,12 +11159,34 @@ def run_marker(
 
     # Pre-compute total document word count for noun repetition threshold
     # Exclude bibliography paragraphs so citation text doesn't inflate the count.
-    DOC_TOTAL_WORD_COUNT = sum(
+    ctx.total_word_count = sum(
         len(p.text.split())
         for idx, (_, p) in enumerate(real_paragraphs)
         if p.text.strip() and idx not in bibliography_indices
     )
 
+    # Parse every paragraph analyze_text will see in one nlp.pipe batch and
+    # grammar-check them in one LanguageTool request; analyze_text picks both
+    # up by exact text, so a paragraph that changes before its turn is simply
+    # parsed and checked again.
+    if ctx.analysis is None:
+        ctx.analysis = EssayAnalysis()
+    analyzed_texts = [
+        features.get(p).flat_text
+        for new_idx, (_, p) in enumerate(real_paragraphs)
+        if new_idx not in header_indices
+        and new_idx not in bibliography_indices
+        and not features.is_title(p)
+        and (
+            config.mode not in ("foundation_1", "foundation_2")
+            or get_paragraph_role(new_idx, intro_idx, total_real_paras, config=config) == "intro"
+        )
+    ]
+    ctx.analysis.parse_many(analyzed_texts)
+    prefetch_grammar(analyzed_texts, ctx, config)
+    # Key for reusing per-paragraph results (see analyze_paragraph)
+    config_key = config_digest(config) if ctx.paragraph_marks is not None else ""
+
     for new_idx, (old_idx, p) in enumerate(real_paragraphs):
         # Skip MLA-style header lines entirely (name, teacher, class, date, etc.)
         # These should not be analyzed or marked in any way.
@@ -10163,8 +11199,9 @@ def run_marker(
 
         # If this is a title-like paragraph, enforce essay title format
         # and title capitalization, then skip other rules
-        if is_probable_title_paragraph(p, config=config):
-            flat_text, seg = flatten_paragraph_without_labels(p)
+        if features.is_title(p):
+            p_features = features.get(p)
+            flat_text, seg = p_features.flat_text, list(p_features.segments)
             title_text = flat_text.strip()
 
             # Strip any existing Vysti label if we're re-running on a marked doc
@@ -10187,7 +11224,7 @@ def run_marker(
                 )
                 # Always rebuild the paragraph so any stale labels disappear
                 title_sentences = [(0, len(flat_text))] if flat_text else None
-                apply_marks(p, flat_text, seg, title_marks, sentences=title_sentences, paragraph_index=new_idx)
+                apply_marks(p, flat_text, seg, title_marks, sentences=title_sentences, paragraph_index=new_idx, ctx=ctx)
                 continue
 
             title_marks = []
@@ -10396,7 +11433,7 @@ def run_marker(
             # Apply title-related marks and always rebuild the title paragraph,
             # even when there are no new title issues, so stale labels disappear.
             title_sentences = [(0, len(flat_text))] if flat_text else None
-            apply_marks(p, flat_text, seg, title_marks, sentences=title_sentences, paragraph_index=new_idx)
+            apply_marks(p, flat_text, seg, title_marks, sentences=title_sentences, paragraph_index=new_idx, ctx=ctx)
 
             # Skip further analysis of the title paragraph
             continue
@@ -10451,11 +11488,11 @@ def run_marker(
                 # Track this extra paragraph's end position for label placement
                 # Each extra paragraph overwrites the previous target, so we end up
                 # with the position of the LAST extra paragraph in the document
-                FOUNDATION1_LABEL_TARGET = (new_idx, len(flat_text))
+                ctx.foundation1_label_target = (new_idx, len(flat_text))
                 
                 # Apply the marks and skip normal analysis entirely
                 # (no weak verbs, no quotation rules, no off-topic checks, etc.)
-                apply_marks(p, flat_text, seg, marks, sentences=None, paragraph_index=new_idx)
+                apply_marks(p, flat_text, seg, marks, sentences=None, paragraph_index=new_idx, ctx=ctx)
                 continue
             else:
                 # Empty paragraph (only whitespace) - skip it entirely
@@ -10473,17 +11510,19 @@ def run_marker(
 
         # All structural quotation rules now live inside analyze_text,
         # using paragraph_index, total_paragraphs, and intro_idx.
-        marks, flat_text, seg, sentences, last_sentence_content_words = analyze_text(
+        marks, flat_text, seg, sentences, last_sentence_content_words = analyze_paragraph(
             p,
             paragraph_index=new_idx,
             total_paragraphs=total_real_paras,
             labels_used=labels_used,
             intro_idx=intro_idx,
             config=config,
+            config_key=config_key,
             prev_body_last_sentence_content_words=(
                 prev_body_last_sentence_content_words if paragraph_role == "body" else None
             ),
-            doc_total_word_count=DOC_TOTAL_WORD_COUNT,
+            doc_total_word_count=ctx.total_word_count,
+            ctx=ctx,
         )
         if paragraph_role == "body":
             prev_body_last_sentence_content_words = last_sentence_content_words
@@ -10518,7 +11557,7 @@ def run_marker(
         needs_rewrite_practice = rule_break_count >= 5
 
         if marks:
-            apply_marks(p, flat_text, seg, marks, sentences=sentences, paragraph_index=new_idx)
+            apply_marks(p, flat_text, seg, marks, sentences=sentences, paragraph_index=new_idx, ctx=ctx)
 
         # If this paragraph has many rule-breaks, add a red "rewrite" label
         # at the very end of the paragraph, after other yellow labels.
@@ -10541,9 +11580,9 @@ def run_marker(
     # END of the thesis sentence.
     # =====================================================================
     if config.mode == "foundation_4":
-        if THESIS_PARAGRAPH_INDEX is not None and not saw_body_para:
+        if ctx.thesis_paragraph_index is not None and not saw_body_para:
             # Get the paragraph that contains the thesis
-            _, thesis_paragraph = real_paragraphs[THESIS_PARAGRAPH_INDEX]
+            _, thesis_paragraph = real_paragraphs[ctx.thesis_paragraph_index]
             
             # Flatten the paragraph to get its text
             flat_text, _ = flatten_paragraph_without_labels(thesis_paragraph)
@@ -10573,8 +11612,8 @@ def run_marker(
     # single yellow label at the end of the last piece of extra content
     # (whether that's an extra sentence in the intro or an extra paragraph).
     # =====================================================================
-    if config.mode == "foundation_1" and FOUNDATION1_LABEL_TARGET is not None:
-        target_para_idx, target_char_pos = FOUNDATION1_LABEL_TARGET
+    if config.mode == "foundation_1" and ctx.foundation1_label_target is not None:
+        target_para_idx, target_char_pos = ctx.foundation1_label_target
         
         # Get the actual docx paragraph for that target
         _, target_paragraph = real_paragraphs[target_para_idx]
@@ -10604,7 +11643,7 @@ def run_marker(
         if lbl and lbl not in unique_labels and not lbl.startswith("__"):
             unique_labels.append(lbl)
     unique_labels.sort(key=lambda s: s.split()[0].lower())
-    DOC_ISSUES_METADATA = [
+    ctx.issues_metadata = [
         {"label": lbl, "explanation": rules.get(lbl, ""), "count": issue_counts.get(lbl, 0)}
         for lbl in unique_labels
     ]
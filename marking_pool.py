@@ -0,0 +1,188 @@
+"""
+Process pool for the marking engine.
+
+mark_docx_bytes() is CPU-bound (spaCy + LanguageTool) and takes seconds per
+essay. Called directly inside an ``async def`` handler it froze the whole
+uvicorn worker, so health checks, profile fetches and downloads queued
+behind every mark. The API now awaits marks from a pool of pre-warmed
+worker processes instead; the event loop stays free while marking runs on
+the other cores.
+
+Config (env):
+    VYSTI_MARK_POOL_SIZE        worker processes (default: CPU count - 1, min 1).
+                                0 runs marks on a thread in the API process
+                                instead (local dev, single-core boxes).
+    VYSTI_MARK_MAX_TASKS        marks per worker before the workers are
+                                replaced (default 100; 0 = never recycle).
+    VYSTI_MARK_TIMEOUT_SECONDS  per-mark timeout (default 120).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from env_config import env_int
+
+
+# ── Config ───────────────────────────────────────────────────────────────
+POOL_SIZE = env_int("VYSTI_MARK_POOL_SIZE", max(1, (os.cpu_count() or 2) - 1))
+MAX_TASKS_PER_WORKER = env_int("VYSTI_MARK_MAX_TASKS", 100)
+TASK_TIMEOUT_SECONDS = env_int("VYSTI_MARK_TIMEOUT_SECONDS", 120)
+RULES_PATH = "Vysti Rules for Writing.xlsx"
+
+
+class MarkingPoolError(Exception):
+    """Raised when the pool cannot run a mark (engine failed to load, worker died)."""
+
+
+class MarkingTimeout(MarkingPoolError):
+    """Raised when a single mark runs longer than the per-task timeout."""
+
+
+# ── Worker side ─────────────────────────────────────────────────────────
+# These run inside the pool processes. Everything the engine loads lazily
+# is loaded here once, so no request pays the cold-start cost.
+
+def _init_worker(rules_path: str) -> None:
+    """Import the engine and prime its caches (spaCy, rules sheet, lexis, power verbs)."""
+    import marker  # loads spaCy + thesis devices at import
+
+    try:
+        marker.load_rules(rules_path)
+    except Exception as e:
+        print(f"[marking_pool] rules warm-up failed: {e!r}")
+    try:
+        marker.detect_lexis_in_text("")  # loads the lexis CSV and lemma index
+        marker._load_power_verb_lemmas()
+    except Exception as e:
+        print(f"[marking_pool] lexis warm-up failed: {e!r}")
+
+
+def _mark_in_worker(docx_bytes: bytes, kwargs: dict) -> tuple[bytes, dict]:
+    from marker import mark_docx_bytes
+
+    return mark_docx_bytes(docx_bytes, **kwargs)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+# ── API side ────────────────────────────────────────────────────────────
+
+class MarkingPool:
+    """Awaitable front-end over a ProcessPoolExecutor of marking workers.
+
+    Workers are spawned (not forked) so each one starts from a clean
+    interpreter and loads the engine in ``_init_worker``. A worker that
+    crashes breaks the executor; the next call builds a fresh one.
+
+    Recycling swaps in a fresh executor once the current one has run
+    ``max_tasks_per_worker * size`` marks; the old one drains its in-flight
+    marks and exits. (ProcessPoolExecutor's own max_tasks_per_child can
+    deadlock on early 3.12 releases, so we don't rely on it.)
+
+    A mark that times out after it has started keeps its worker busy until
+    it finishes — processes can't be interrupted safely mid-task — but the
+    caller gets MarkingTimeout immediately.
+    """
+
+    def __init__(
+        self,
+        size: int = POOL_SIZE,
+        max_tasks_per_worker: int = MAX_TASKS_PER_WORKER,
+        timeout: float = TASK_TIMEOUT_SECONDS,
+        rules_path: str = RULES_PATH,
+    ):
+        self.size = size
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.timeout = timeout
+        self.rules_path = rules_path
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_tasks = 0
+        self._lock = threading.Lock()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.rules_path,),
+        )
+        # Start every worker now so the first marks don't pay engine load time.
+        for _ in range(self.size):
+            executor.submit(_ping)
+        return executor
+
+    def _get_executor(self, *, count_task: bool = False) -> ProcessPoolExecutor:
+        retired = None
+        with self._lock:
+            recycle_after = self.max_tasks_per_worker * self.size
+            if self._executor is not None and recycle_after and self._executor_tasks >= recycle_after:
+                retired, self._executor = self._executor, None
+            if self._executor is None:
+                self._executor = self._new_executor()
+                self._executor_tasks = 0
+            if count_task:
+                self._executor_tasks += 1
+            executor = self._executor
+        if retired is not None:
+            retired.shutdown(wait=False)  # in-flight marks still finish
+        return executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def warm(self) -> None:
+        """Create the executor (and spawn its workers) ahead of the first mark."""
+        if self.size > 0:
+            self._get_executor()
+
+    async def mark(self, docx_bytes: bytes, **kwargs) -> tuple[bytes, dict]:
+        """Run mark_docx_bytes(docx_bytes, **kwargs) off the event loop.
+
+        Exceptions raised by the engine itself propagate unchanged; pool
+        failures surface as MarkingPoolError / MarkingTimeout.
+        """
+        if self.size <= 0:
+            try:
+                return await asyncio.wait_for(
+                    asyncio.to_thread(_mark_in_worker, docx_bytes, kwargs),
+                    timeout=self.timeout,
+                )
+            except asyncio.TimeoutError as e:
+                raise MarkingTimeout(f"Marking exceeded {self.timeout}s") from e
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor(count_task=True)
+        try:
+            future = loop.run_in_executor(executor, _mark_in_worker, docx_bytes, kwargs)
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError as e:
+            raise MarkingTimeout(f"Marking exceeded {self.timeout}s") from e
+        except BrokenProcessPool as e:
+            self._discard_executor(executor)
+            raise MarkingPoolError("Marking worker pool is broken") from e
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_POOL: MarkingPool | None = None
+
+
+def get_marking_pool() -> MarkingPool:
+    """Process-wide MarkingPool, created on first use."""
+    global _POOL
+    if _POOL is None:
+        _POOL = MarkingPool()
+    return _POOL
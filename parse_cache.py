@@ -0,0 +1,237 @@
+"""
+Paragraph-level spaCy parse cache.
+
+The live Write page and teacher rechecks send /check_text and /mark_text
+again and again with mostly unchanged paragraphs, and every call re-ran
+spaCy on all of them. Parses are now cached, so only paragraphs the
+student actually edited are parsed again:
+
+  * a bounded in-process LRU of serialized Docs (``Doc.to_bytes``), sized
+    in bytes rather than entries so one long essay can't blow the budget;
+  * an optional on-disk tier of ``DocBin`` files shared by every worker
+    process on the host (the marking pool's workers each have their own
+    memory tier, so a repeat request that lands on another worker still
+    hits disk). Files older than a TTL, and the oldest files beyond a size
+    budget, are deleted by a sweep that runs as new ones are written, so
+    neither disk use nor the retention of essay text is unbounded;
+  * hit / miss / eviction counters for /health-style introspection.
+
+Keys are a SHA-256 of the model name and version, the pipeline profile and
+the paragraph text. The text is hashed exactly as given: marks are placed
+by character offset, so a Doc built from differently normalized text would
+put them in the wrong place.
+
+Config (env):
+    VYSTI_PARSE_CACHE_MB     memory tier budget in MB (default 64; 0 disables the cache).
+    VYSTI_PARSE_CACHE_DIR    directory for the on-disk DocBin tier (default: off).
+    VYSTI_PARSE_CACHE_DISK_MB        disk tier budget in MB, oldest files dropped first (default 512).
+    VYSTI_PARSE_CACHE_DISK_TTL_DAYS  drop disk tier files older than this (default 7).
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from spacy.tokens import Doc, DocBin
+
+from env_config import env_int
+
+
+# ── Config ───────────────────────────────────────────────────────────────
+CACHE_MB = max(0, env_int("VYSTI_PARSE_CACHE_MB", 64))
+CACHE_DIR = os.getenv("VYSTI_PARSE_CACHE_DIR", "").strip() or None
+CACHE_DISK_MB = max(0, env_int("VYSTI_PARSE_CACHE_DISK_MB", 512))
+CACHE_DISK_TTL_SECONDS = max(0, env_int("VYSTI_PARSE_CACHE_DISK_TTL_DAYS", 7)) * 86400
+
+# Sweep the disk tier at most this often (per process)
+_SWEEP_INTERVAL_SECONDS = 600
+
+# Nothing in the engine reads tensors or user data; leaving them out keeps
+# entries at a fraction of their in-memory size.
+_EXCLUDE = ["tensor", "user_data"]
+
+
+class ParseCache:
+    """Byte-bounded LRU of serialized spaCy Docs with an optional DocBin disk tier."""
+
+    def __init__(
+        self,
+        nlp,
+        max_bytes: int = CACHE_MB * 1024 * 1024,
+        disk_dir: str | None = CACHE_DIR,
+        disk_max_bytes: int = CACHE_DISK_MB * 1024 * 1024,
+        disk_ttl_seconds: int = CACHE_DISK_TTL_SECONDS,
+    ):
+        self.nlp = nlp
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self._next_sweep = 0.0
+        meta = getattr(nlp, "meta", {}) or {}
+        self.model_id = f"{meta.get('lang', 'xx')}_{meta.get('name', 'pipeline')}-{meta.get('version', '0')}"
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def key(self, text: str, profile: str = "full") -> str:
+        h = hashlib.sha256()
+        for part in (self.model_id, profile, text):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    # -- lookups -------------------------------------------------------
+    def get(self, text: str, profile: str = "full") -> Doc | None:
+        """The cached parse of exactly ``text``, or None (counted as a miss)."""
+        if not self.enabled:
+            return None
+        key = self.key(text, profile)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if data is not None:
+            return Doc(self.nlp.vocab).from_bytes(data)
+
+        doc = self._read_disk(key)
+        with self._lock:
+            if doc is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._remember(key, doc.to_bytes(exclude=_EXCLUDE))
+        return doc
+
+    def put(self, text: str, doc: Doc, profile: str = "full") -> None:
+        if not self.enabled:
+            return
+        key = self.key(text, profile)
+        self._remember(key, doc.to_bytes(exclude=_EXCLUDE))
+        self._write_disk(key, doc)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # -- memory tier ---------------------------------------------------
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    # -- disk tier -----------------------------------------------------
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.spacy")
+
+    def _read_disk(self, key: str) -> Doc | None:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                docs = list(DocBin().from_bytes(f.read()).get_docs(self.nlp.vocab))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[parse_cache] unreadable disk entry {key}: {e!r}")
+            return None
+        return docs[0] if docs else None
+
+    def _write_disk(self, key: str, doc: Doc) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = DocBin(docs=[doc], store_user_data=False).to_bytes()
+            # Write-then-rename so concurrent workers never read a partial file.
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[parse_cache] disk write failed for {key}: {e!r}")
+            return
+        now = time.time()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + _SWEEP_INTERVAL_SECONDS
+        self._sweep_disk(now)
+
+    def _sweep_disk(self, now: float) -> None:
+        """Delete disk files past the TTL, then the oldest files beyond the size budget."""
+        files = []
+        try:
+            for shard in os.scandir(self.disk_dir):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue  # removed by another worker's sweep
+                    files.append((st.st_mtime, st.st_size, entry.path))
+        except OSError as e:
+            print(f"[parse_cache] disk sweep failed: {e!r}")
+            return
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            expired = self.disk_ttl_seconds and now - mtime > self.disk_ttl_seconds
+            over_budget = self.disk_max_bytes and total > self.disk_max_bytes
+            if not (expired or over_budget):
+                break  # oldest first: nothing later is expired either
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"[parse_cache] can't remove {path}: {e!r}")
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            print(f"[parse_cache] disk sweep removed {removed} files ({total // (1024 * 1024)} MB kept)")
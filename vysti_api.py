@@ -6,6 +6,8 @@ load_dotenv()
 import os
 import io
 import json
+import asyncio
+import zipfile
 import base64
 import hashlib
 import time
@@ -14,7 +16,20 @@ import pathlib
 from io import BytesIO
 from scoring import compute_scores as _compute_scores
 from pdf_extract import extract_text_from_pdf, PDFExtractionError
+from env_config import env_int
 from ocr_transcribe import transcribe_scanned_pdf
+from marking_pool import get_marking_pool, MarkingPoolError, MarkingTimeout
+from lt_service import start_language_tool_service, stop_language_tool_watch
+from mark_jobs import get_mark_job_queue, job_status_payload, JobQueueFull, JOB_DONE
+from mark_scheduler import get_mark_scheduler, MarkQueueFull, MarkQueueTimeout, TIER_WEIGHTS
+from lexis_lookup import get_lexis_az_payload, get_lexis_lookup
+from check_sessions import (
+    CheckSession,
+    changed_paragraphs,
+    get_check_sessions,
+    revision_hash,
+    split_paragraphs,
+)
 import urllib.parse
 
 import httpx
@@ -293,7 +308,6 @@ _DEBUG = os.getenv("VYSTI_DEBUG", "").strip() in ("1", "true", "yes")
 _HARD_WORD_LIMIT = 10_000       # Reject essays exceeding this word count
 _SOFT_WORD_LIMIT = 5_000        # Warn (in metadata) for essays above this
 _MARK_EVENTS_SOFT_LIMIT = 5_000 # Surface a "consider cleaning up" notice when a user crosses this — purely advisory; no auto-deletion. The previous 200-row hard cap was silently pruning teachers' historical gradebook data; teachers do 100 students × 12 essays × 4 quarters ≈ 4,800/year, so even one academic year would have hit the old cap. Now: keep everything, let the teacher decide when to clean up.
-_active_marks: set[str] = set() # Concurrency guard: one mark at a time per user
 
 # ===== Lazy engine loader =====
 _ENGINE = None
@@ -318,6 +332,104 @@ def get_engine():
             detail="Marker engine is temporarily unavailable. Please try again later.",
         )
 
+
+# Subscription tier per user id, so scheduling a mark doesn't cost a
+# Supabase round trip each time. A tier change takes effect within the TTL.
+_TIER_CACHE_TTL_SECONDS = 60
+_tier_cache: dict[str, tuple[str, float]] = {}  # user_id -> (tier, expires_at)
+
+
+async def _mark_tenant(user: dict | None) -> tuple[str, int]:
+    """
+    Scheduler tenant key and round-robin weight for a caller: API clients
+    are keyed by key id, everyone else by user id, weighted by tier.
+    """
+    user_id = user.get("id") if isinstance(user, dict) else None
+    if not user_id:
+        return "anonymous", TIER_WEIGHTS["free"]
+    if user.get("_is_api_client"):
+        return user_id, TIER_WEIGHTS["api"]
+    now = time.time()
+    cached = _tier_cache.get(user_id)
+    if cached is not None and cached[1] > now:
+        tier = cached[0]
+    else:
+        profile = await get_user_profile(user_id) if user_id != "local-dev" else None
+        tier = (profile or {}).get("subscription_tier") or "free"
+        if len(_tier_cache) > 10_000:
+            _tier_cache.clear()
+        _tier_cache[user_id] = (tier, now + _TIER_CACHE_TTL_SECONDS)
+    return user_id, TIER_WEIGHTS.get(tier, TIER_WEIGHTS["free"])
+
+
+def _busy_exception(exc: MarkQueueFull) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail={"message": str(exc), "code": "MARK_QUEUE_FULL", "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+async def run_mark_docx_bytes(
+    docx_bytes: bytes,
+    *,
+    user: dict | None = None,
+    on_start=None,
+    **kwargs,
+) -> tuple[bytes, dict]:
+    """
+    Await mark_docx_bytes in the marking process pool (see marking_pool.py)
+    so CPU-bound marking never blocks the event loop. The mark first waits
+    for a fair-share slot from the scheduler (mark_scheduler.py); on_start,
+    if given, is awaited once it has one. A full queue is a 429 with
+    Retry-After, pool failures become 503/504s, and errors raised by the
+    engine itself propagate unchanged.
+    """
+    tenant, weight = await _mark_tenant(user)
+    try:
+        async with get_mark_scheduler().slot(tenant, weight):
+            if on_start is not None:
+                await on_start()
+            return await get_marking_pool().mark(docx_bytes, **kwargs)
+    except MarkQueueFull as e:
+        raise _busy_exception(e)
+    except MarkQueueTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The marker is very busy right now. Please try again shortly.",
+            headers={"Retry-After": str(get_mark_scheduler().retry_after())},
+        )
+    except MarkingTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Marking took too long. Please try again.",
+        )
+    except MarkingPoolError as e:
+        print("Marking pool failure:", repr(e))
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Marker engine is temporarily unavailable. Please try again later.",
+        )
+
+
+@app.on_event("startup")
+async def _start_marking_pool():
+    # Start the host's shared LanguageTool servers first: the marking workers
+    # pick their URLs up from the environment when they spawn.
+    await asyncio.to_thread(start_language_tool_service)
+    # Spawn and warm workers at boot so the first marks don't pay spaCy load time.
+    get_marking_pool().warm()
+    get_mark_job_queue().start()
+
+
+@app.on_event("shutdown")
+async def _stop_marking_pool():
+    await get_mark_job_queue().stop()
+    get_marking_pool().shutdown()
+    # The LanguageTool servers are shared with the host's other workers;
+    # they are left running (see lt_service.py), just no longer watched.
+    stop_language_tool_watch()
+
 # ===== Supabase config (from environment variables) =====
 # ===== Supabase config (from environment variables) =====
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -364,6 +476,7 @@ class MarkTextRequest(BaseModel):
     include_summary_table: bool | None = False
     return_metadata: bool = False
     source: str | None = None  # "mobile" when sent from mobile app
+    session_id: str | None = None  # Write page session: makes /check_text incremental
     # Teacher rule overrides (optional — sent by teacher recheck)
     forbid_personal_pronouns: bool | None = None
     forbid_audience_reference: bool | None = None
@@ -921,10 +1034,10 @@ async def _bump_lifetime_marks(user_id: str) -> None:
 
     Falls back to the legacy GET-then-PATCH if the RPC is missing (e.g.
     the migration hasn't been run yet) so a Python deploy never lands
-    in a state where the counter stops bumping. /mark also serializes
-    per-user via _active_marks, so the legacy path's tiny race window
-    is mostly theoretical there; /mark_text doesn't serialize, which
-    is the main reason the RPC matters.
+    in a state where the counter stops bumping. Neither /mark nor
+    /mark_text serializes a user's marks any more (the scheduler runs
+    them concurrently when cores are free), which is the main reason
+    the RPC matters.
     """
     if not user_id or not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
         return
@@ -2183,42 +2296,14 @@ async def get_all_lexis(request: Request):
     Returns a compact list: [{term, term_norm, focus_type, definition,
     part_of_speech, tags}, ...] sorted alphabetically by term.
     Full detail for any term can be fetched via GET /api/lexis/{term_norm}.
-    """
-    from marker import load_lexis_database
-    import math
 
-    lexis_df = load_lexis_database()
-    if lexis_df.empty:
+    The payload is built and compressed once per worker and served with a
+    strong ETag, so revalidations get a 304 (see lexis_lookup.py).
+    """
+    payload = get_lexis_az_payload()
+    if payload is None:
         return JSONResponse({"error": "Lexis database not loaded"}, status_code=503)
-
-    # Only active terms
-    active_df = lexis_df[lexis_df["active"] == True]  # noqa: E712
-    # Sort alphabetically (case-insensitive)
-    active_df = active_df.copy()
-    active_df["_sort"] = active_df["term"].str.lower()
-    active_df = active_df.sort_values("_sort")
-
-    # Return compact fields for the A-Z list (keeps payload small)
-    compact_cols = [
-        "term", "term_norm", "focus_type", "definition",
-        "part_of_speech", "tags", "etymology", "application",
-    ]
-    result = []
-    for _, row in active_df.iterrows():
-        entry = {}
-        for col in compact_cols:
-            val = row.get(col)
-            if val is None:
-                continue
-            if hasattr(val, "item"):
-                val = val.item()
-            if isinstance(val, float) and math.isnan(val):
-                continue
-            entry[col] = val
-        if entry.get("term"):
-            result.append(entry)
-
-    return JSONResponse({"terms": result, "count": len(result)})
+    return payload.response(request.headers)
 
 
 @app.get("/api/lexis/{term_norm}")
@@ -2229,104 +2314,20 @@ async def get_lexis_term(request: Request, term_norm: str):
     Lookup is forgiving — handles common data quality issues in the
     Related Terms chips (article prefixes, stray brackets/quotes,
     plural/singular mismatches, and minor typos via edit distance).
+    The lookup structures are built once per worker (see lexis_lookup.py).
     """
-    from marker import load_lexis_database
-    import math
-
-    lexis_df = load_lexis_database()
-    if lexis_df.empty:
+    lookup = get_lexis_lookup()
+    if lookup is None:
         return JSONResponse({"error": "Lexis database not loaded"}, status_code=503)
 
-    import re
-
-    import unicodedata
-
-    def _normalize(s: str, strip_article: bool = False) -> str:
-        # Transliterate accents (é→e, è→e, ä→a, …) so accented queries match the
-        # transliterated term_norm convention; strip stray brackets/quotes; collapse
-        # non-alphanumerics (incl. hyphens) to underscore; lower-case. Only strip a
-        # leading article ("the/a/an ") when asked — terms like "the Real"/"the
-        # Symbolic" legitimately keep it in their term_norm.
-        s = unicodedata.normalize("NFKD", s or "").encode("ascii", "ignore").decode("ascii")
-        s = re.sub(r"['\"\[\]]+", "", s).strip().lower()
-        if strip_article:
-            s = re.sub(r"^(the|a|an)\s+", "", s)
-        return re.sub(r"[^a-z0-9]+", "_", s).strip("_")
-
-    query_full = _normalize(term_norm)                       # keeps "the Real" -> the_real
-    query = _normalize(term_norm, strip_article=True)        # article-stripped fallback
-    if not query_full and not query:
+    pos = lookup.find(term_norm)
+    if pos is None:
         return JSONResponse({"error": "Term not found"}, status_code=404)
+    return JSONResponse(lookup.record(pos))
 
-    # Exact match on the FULL form first (so "the Real" doesn't collapse to "real"),
-    # then fall back to the article-stripped form.
-    matches = lexis_df[lexis_df["term_norm"].str.lower() == query_full]
-    if matches.empty and query != query_full:
-        matches = lexis_df[lexis_df["term_norm"].str.lower() == query]
 
-    # Plural/singular and prefix containment fallback
-    if matches.empty:
-        candidates = []
-        for variant in (query, query.rstrip("s"), query + "s",
-                        query.rstrip("es"), query + "es"):
-            if not variant:
-                continue
-            hit = lexis_df[lexis_df["term_norm"].str.lower() == variant]
-            if not hit.empty:
-                candidates.append(hit)
-                break
-        if candidates:
-            matches = candidates[0]
-
-    # Substring containment (term_norm contains query, or vice versa)
-    if matches.empty:
-        matches = lexis_df[
-            lexis_df["term_norm"].apply(
-                lambda t: bool(t) and (
-                    t.lower().startswith(query) or
-                    query.startswith(t.lower()) or
-                    query in t.lower() or
-                    t.lower() in query
-                )
-            )
-        ]
-
-    # Fuzzy edit-distance fallback for short typos (e.g., "feminity" → "femininity")
-    if matches.empty and len(query) >= 5:
-        try:
-            from difflib import get_close_matches
-            all_norms = lexis_df["term_norm"].astype(str).str.lower().tolist()
-            close = get_close_matches(query, all_norms, n=1, cutoff=0.82)
-            if close:
-                matches = lexis_df[lexis_df["term_norm"].str.lower() == close[0]]
-        except Exception:
-            pass
-
-    if matches.empty:
-        return JSONResponse({"error": "Term not found"}, status_code=404)
-
-    row = matches.iloc[0]
-    result = {}
-    for col in matches.columns:
-        val = row.get(col)
-        if val is None:
-            continue
-        # Convert numpy/pandas types to native Python
-        if hasattr(val, "item"):
-            val = val.item()
-        if isinstance(val, float) and math.isnan(val):
-            continue
-        result[col] = val
-    return JSONResponse(result)
-
-
-@app.post("/mark")
-@limiter.limit("40/minute")
-async def mark_essay(
-    request: Request,
-    file: UploadFile = File(...),
+async def _mark_form_fields(
     mode: str = Form("textual_analysis"),
-    user: dict = Depends(require_product("mark", "revise")),
     include_summary_table: bool = Form(True),
     student_mode: bool | None = Form(None),
     return_metadata: bool = Form(False),  # NEW: Return JSON with metadata
@@ -2372,79 +2373,73 @@ async def mark_essay(
     enforce_apostrophe_rule: bool | None = Form(None),
     enforce_present_tense_rule: bool | None = Form(None),
     highlight_thesis_devices: bool | None = Form(None),
-):
-    """
-    Mark a .docx essay using the Vysti engine.
+) -> dict:
+    """Form fields shared by /mark and /mark/jobs, as a plain dict."""
+    return dict(locals())
+
+
+# Form field → MarkerConfig key for the works / titles.
+_MARK_WORK_FIELDS = {
+    "author": "author_name",
+    "title": "text_title",
+    "author2": "author_name_2",
+    "title2": "text_title_2",
+    "author3": "author_name_3",
+    "title3": "text_title_3",
+}
 
-    Accepts up to three works (author/title) plus:
-      - text_is_minor_work, text_is_minor_work_2, text_is_minor_work_3
-      - forbid_personal_pronouns
-      - enforce_closed_thesis
+# Optional booleans passed straight through to MarkerConfig when set.
+# These override the defaults chosen by get_preset_config(mode).
+_MARK_FLAG_FIELDS = (
+    "text_is_minor_work",
+    "text_is_minor_work_2",
+    "text_is_minor_work_3",
+    "forbid_personal_pronouns",
+    "forbid_audience_reference",
+    "enforce_closed_thesis",
+    "require_body_evidence",
+    "allow_intro_summary_quotes",
+    "enforce_intro_quote_rule",
+    "enforce_long_quote_rule",
+    "enforce_contractions_rule",
+    "enforce_which_rule",
+    "enforce_weak_verbs_rule",
+    "enforce_fact_proof_rule",
+    "enforce_human_people_rule",
+    "enforce_vague_terms_rule",
+    "enforce_sva_rule",
+    "enforce_spelling_rule",
+    "enforce_confused_words_rule",
+    "enforce_intro_comma_rule",
+    "enforce_apostrophe_rule",
+    "enforce_present_tense_rule",
+    "highlight_thesis_devices",
+)
 
-    These map directly onto MarkerConfig in marker.py.
-    """
-    # 0. Product-level access check based on calling context
-    await _enforce_product_for_mode(user, bool(student_mode))
 
-    # 0a. If the teacher didn't supply a student_name, guess from the
-    # filename's first token (matches the convention of putting the
-    # student's first name at the start of every upload). Without this,
-    # gradebook rows land with student_name = NULL, which then can't
-    # be aggregated by name in the Roster / Progress Report and the
-    # Final Comment feature has nothing to attach to.
-    if not (student_name or "").strip() and file.filename:
-        guessed = _guess_student_name_from_filename(file.filename)
-        if guessed:
-            student_name = guessed
-
-    # 1. Basic validation
-    _fname_lower = file.filename.lower() if file.filename else ""
-    _is_pdf = _fname_lower.endswith(".pdf")
-    _is_docx = _fname_lower.endswith(".docx")
-    if not _is_docx and not _is_pdf:
-        return JSONResponse(
-            status_code=400,
-            content={"error": "Please upload a .docx or .pdf file."},
-        )
-
-    # 1b. File size limit (10 MB)
-    _MAX_UPLOAD_BYTES = 10 * 1024 * 1024
-    contents = await file.read()
-    if len(contents) > _MAX_UPLOAD_BYTES:
-        return JSONResponse(
-            status_code=400,
-            content={"error": "File exceeds the 10 MB size limit."},
-        )
-    await file.seek(0)  # reset for downstream readers
+def _build_teacher_config(form: dict) -> dict:
+    """Build teacher_config from /mark form fields (matches MarkerConfig)."""
+    teacher_config: dict = {}
+    for field_name, config_key in _MARK_WORK_FIELDS.items():
+        if form.get(field_name):
+            teacher_config[config_key] = form[field_name]
+    for field_name in _MARK_FLAG_FIELDS:
+        if form.get(field_name) is not None:
+            teacher_config[field_name] = form[field_name]
+    if form.get("student_mode") is True:
+        teacher_config["student_mode"] = True
+    return teacher_config
 
-    # 1c. PDF → docx conversion (extract text, build synthetic docx)
-    _pdf_converted = False
-    if _is_pdf:
-        try:
-            _pdf_text = extract_text_from_pdf(contents)
-        except PDFExtractionError as exc:
-            # Scanned/image PDF → try OCR transcription
-            if "scanned" in str(exc).lower() or "image-based" in str(exc).lower():
-                try:
-                    _pdf_text = await transcribe_scanned_pdf(contents)
-                except Exception as ocr_exc:
-                    return JSONResponse(
-                        status_code=400,
-                        content={"error": str(ocr_exc)},
-                    )
-            else:
-                return JSONResponse(status_code=400, content={"error": str(exc)})
-        contents = build_doc_from_text(_pdf_text)
-        _pdf_converted = True
 
-    # 1c. Free-tier usage check
+async def _check_free_tier_marks(user: dict, essays: int = 1) -> None:
+    """Raise 402 unless a free-tier user has ``essays`` included marks left."""
     _mark_user_id = user.get("id") if isinstance(user, dict) else None
     if _mark_user_id:
         _profile = await get_user_profile(_mark_user_id)
         _tier = (_profile or {}).get("subscription_tier", "free")
         if _tier == "free":
             _marks_used = await count_user_marks(_mark_user_id)
-            if _marks_used >= _FREE_TIER_MARK_LIMIT:
+            if _marks_used + essays > _FREE_TIER_MARK_LIMIT:
                 raise HTTPException(
                     status_code=402,
                     detail={
@@ -2453,7 +2448,12 @@ async def mark_essay(
                     },
                 )
 
-    # 2. Validate class_id if provided
+
+async def _validate_mark_class(user: dict, class_id: str | None):
+    """
+    Check that class_id (if any) is one of the user's active classes.
+    Returns the validated id (None when not supplied) or a JSONResponse.
+    """
     class_id_validated = None
     if class_id:
         user_id = user.get("id") if isinstance(user, dict) else None
@@ -2462,7 +2462,7 @@ async def mark_essay(
                 status_code=400,
                 content={"error": "Invalid user"},
             )
-        
+
         # Verify class exists and belongs to user
         if SUPABASE_URL and SUPABASE_SERVICE_KEY:
             db_url = f"{SUPABASE_URL}/rest/v1/classes"
@@ -2487,20 +2487,70 @@ async def mark_essay(
                         status_code=400,
                         content={"error": "Failed to validate class"},
                     )
+    return class_id_validated
+
+
+_MAX_UPLOAD_BYTES = 10 * 1024 * 1024  # per essay (10 MB)
+
+
+def _docx_word_count(contents: bytes) -> int:
+    doc = Document(BytesIO(contents))
+    return len(" ".join(p.text.strip() for p in doc.paragraphs if p.text.strip()).split())
+
+
+async def _prepare_essay(file_name: str | None, contents: bytes, student_name: str | None):
+    """
+    Validate one uploaded essay and convert PDFs to .docx.
+
+    Returns an error message string for anything the client must fix,
+    otherwise the per-essay part of an upload dict (see _prepare_mark_upload).
+    """
+    # 0a. If the teacher didn't supply a student_name, guess from the
+    # filename's first token (matches the convention of putting the
+    # student's first name at the start of every upload). Without this,
+    # gradebook rows land with student_name = NULL, which then can't
+    # be aggregated by name in the Roster / Progress Report and the
+    # Final Comment feature has nothing to attach to.
+    if not (student_name or "").strip() and file_name:
+        guessed = _guess_student_name_from_filename(file_name)
+        if guessed:
+            student_name = guessed
+
+    # 1. Basic validation
+    _fname_lower = file_name.lower() if file_name else ""
+    _is_pdf = _fname_lower.endswith(".pdf")
+    _is_docx = _fname_lower.endswith(".docx")
+    if not _is_docx and not _is_pdf:
+        return "Please upload a .docx or .pdf file."
+
+    # 1b. File size limit (10 MB)
+    if len(contents) > _MAX_UPLOAD_BYTES:
+        return "File exceeds the 10 MB size limit."
+
+    # 1c. PDF → docx conversion (extract text, build synthetic docx).
+    # Parsing runs in a thread so a batch of PDFs doesn't stall the event loop.
+    if _is_pdf:
+        try:
+            _pdf_text = await asyncio.to_thread(extract_text_from_pdf, contents)
+        except PDFExtractionError as exc:
+            # Scanned/image PDF → try OCR transcription
+            if "scanned" in str(exc).lower() or "image-based" in str(exc).lower():
+                try:
+                    _pdf_text = await transcribe_scanned_pdf(contents)
+                except Exception as ocr_exc:
+                    return str(ocr_exc)
+            else:
+                return str(exc)
+        contents = await asyncio.to_thread(build_doc_from_text, _pdf_text)
 
     # 2b. Word count check (hard cap rejects, soft cap warns in metadata)
     _wc = 0
     try:
-        _tmp_doc = Document(BytesIO(contents))
-        _essay_words = " ".join(p.text.strip() for p in _tmp_doc.paragraphs if p.text.strip()).split()
-        _wc = len(_essay_words)
+        _wc = await asyncio.to_thread(_docx_word_count, contents)
         if _wc > _HARD_WORD_LIMIT:
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "error": f"Essay exceeds the {_HARD_WORD_LIMIT:,} word limit ({_wc:,} words). "
-                             "Please check that you've uploaded the correct file."
-                },
+            return (
+                f"Essay exceeds the {_HARD_WORD_LIMIT:,} word limit ({_wc:,} words). "
+                "Please check that you've uploaded the correct file."
             )
         _word_count_warning = (
             f"This essay is {_wc:,} words — above the typical range. Marking may take longer."
@@ -2509,32 +2559,56 @@ async def mark_essay(
     except Exception:
         _word_count_warning = None  # if we can't parse it, let the marker handle the error
 
-    # 2c. Concurrency guard — one active mark per user
-    _mark_user_id = user.get("id") if isinstance(user, dict) else None
-    if _mark_user_id and _mark_user_id in _active_marks:
-        return JSONResponse(
-            status_code=429,
-            content={"error": "A marking request is already in progress. Please wait for it to finish."},
-        )
-    if _mark_user_id:
-        _active_marks.add(_mark_user_id)
+    return {
+        "file_name": file_name,
+        "is_pdf": _is_pdf,
+        "docx_bytes": contents,
+        "student_name": student_name,
+        "word_count_warning": _word_count_warning,
+    }
 
-    # 3. Read file bytes
-    if _pdf_converted:
-        docx_bytes = contents  # already converted to docx bytes above
-    else:
-        docx_bytes = await file.read()
+
+async def _prepare_mark_upload(user: dict, file: UploadFile, form: dict):
+    """
+    Validate an uploaded essay for /mark and /mark/jobs.
+
+    Returns a JSONResponse for anything the client must fix, otherwise a
+    dict with the docx bytes and the values later stages need. Access and
+    usage-limit failures raise HTTPException.
+    """
+    # 0. Product-level access check based on calling context
+    await _enforce_product_for_mode(user, bool(form["student_mode"]))
+
+    upload = await _prepare_essay(file.filename, await file.read(), form["student_name"])
+    if isinstance(upload, str):
+        return JSONResponse(status_code=400, content={"error": upload})
+
+    # 1c. Free-tier usage check
+    await _check_free_tier_marks(user)
+
+    # 2. Validate class_id if provided
+    class_id_validated = await _validate_mark_class(user, form["class_id"])
+    if isinstance(class_id_validated, JSONResponse):
+        return class_id_validated
+    upload["class_id"] = class_id_validated
+    return upload
+
+
+async def _run_mark_engine(user: dict, upload: dict, form: dict, on_start=None) -> tuple[bytes, dict]:
+    """Store the original upload, then run the engine. Returns (marked_bytes, metadata)."""
+    docx_bytes = upload["docx_bytes"]
+    file_name = upload["file_name"]
 
     # 3b. Upload original to Supabase Storage (best-effort)
     try:
         if SUPABASE_URL and SUPABASE_SERVICE_KEY:
             upload_user_id = user.get("id") if isinstance(user, dict) else None
-            if upload_user_id and file.filename:
-                safe_upload_name = _sanitize_filename(file.filename)
+            if upload_user_id and file_name:
+                safe_upload_name = _sanitize_filename(file_name)
                 storage_path = f"{upload_user_id}/{safe_upload_name}"
                 storage_url = f"{SUPABASE_URL}/storage/v1/object/originals/{storage_path}"
                 _upload_ct = (
-                    "application/pdf" if _is_pdf
+                    "application/pdf" if upload["is_pdf"]
                     else "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
                 )
                 async with httpx.AsyncClient(timeout=15) as client:
@@ -2553,115 +2627,39 @@ async def mark_essay(
         print(f"Failed to upload original: {repr(e)}")
 
     # 4. Build teacher_config from form fields (matches MarkerConfig)
-    teacher_config: dict = {}
-
-    # --- Works / titles ---
-    if author:
-        teacher_config["author_name"] = author
-    if title:
-        teacher_config["text_title"] = title
-    if text_is_minor_work is not None:
-        teacher_config["text_is_minor_work"] = text_is_minor_work
-
-    if author2:
-        teacher_config["author_name_2"] = author2
-    if title2:
-        teacher_config["text_title_2"] = title2
-    if text_is_minor_work_2 is not None:
-        teacher_config["text_is_minor_work_2"] = text_is_minor_work_2
-
-    if author3:
-        teacher_config["author_name_3"] = author3
-    if title3:
-        teacher_config["text_title_3"] = title3
-    if text_is_minor_work_3 is not None:
-        teacher_config["text_is_minor_work_3"] = text_is_minor_work_3
-
-    # --- Rule overrides ---
-    # These override the defaults chosen by get_preset_config(mode)
-    if forbid_personal_pronouns is not None:
-        teacher_config["forbid_personal_pronouns"] = forbid_personal_pronouns
-    if forbid_audience_reference is not None:
-        teacher_config["forbid_audience_reference"] = forbid_audience_reference
-    if enforce_closed_thesis is not None:
-        teacher_config["enforce_closed_thesis"] = enforce_closed_thesis
-    if require_body_evidence is not None:
-        teacher_config["require_body_evidence"] = require_body_evidence
-    if allow_intro_summary_quotes is not None:
-        teacher_config["allow_intro_summary_quotes"] = allow_intro_summary_quotes
-    if enforce_intro_quote_rule is not None:
-        teacher_config["enforce_intro_quote_rule"] = enforce_intro_quote_rule
-    if enforce_long_quote_rule is not None:
-        teacher_config["enforce_long_quote_rule"] = enforce_long_quote_rule
-    if enforce_contractions_rule is not None:
-        teacher_config["enforce_contractions_rule"] = enforce_contractions_rule
-    if enforce_which_rule is not None:
-        teacher_config["enforce_which_rule"] = enforce_which_rule
-    if enforce_weak_verbs_rule is not None:
-        teacher_config["enforce_weak_verbs_rule"] = enforce_weak_verbs_rule
-    if enforce_fact_proof_rule is not None:
-        teacher_config["enforce_fact_proof_rule"] = enforce_fact_proof_rule
-    if enforce_human_people_rule is not None:
-        teacher_config["enforce_human_people_rule"] = enforce_human_people_rule
-    if enforce_vague_terms_rule is not None:
-        teacher_config["enforce_vague_terms_rule"] = enforce_vague_terms_rule
-    if enforce_sva_rule is not None:
-        teacher_config["enforce_sva_rule"] = enforce_sva_rule
-    if enforce_spelling_rule is not None:
-        teacher_config["enforce_spelling_rule"] = enforce_spelling_rule
-    if enforce_confused_words_rule is not None:
-        teacher_config["enforce_confused_words_rule"] = enforce_confused_words_rule
-    if enforce_intro_comma_rule is not None:
-        teacher_config["enforce_intro_comma_rule"] = enforce_intro_comma_rule
-    if enforce_apostrophe_rule is not None:
-        teacher_config["enforce_apostrophe_rule"] = enforce_apostrophe_rule
-    if enforce_present_tense_rule is not None:
-        teacher_config["enforce_present_tense_rule"] = enforce_present_tense_rule
-    if highlight_thesis_devices is not None:
-        teacher_config["highlight_thesis_devices"] = highlight_thesis_devices
-    if student_mode is True:
-        teacher_config["student_mode"] = True
+    teacher_config = _build_teacher_config(form)
 
-    # 5. Call your engine (release concurrency guard when done)
-    try:
-        mark_docx_bytes, _ = get_engine()
-        marked_bytes, metadata = mark_docx_bytes(
-            docx_bytes,
-            mode=mode,
-            teacher_config=teacher_config if teacher_config else None,
-            include_summary_table=include_summary_table,
-        )
-    finally:
-        _active_marks.discard(_mark_user_id or "")
-
-    # 5b. Upload marked .docx to Supabase Storage (best-effort) so the
-    # Progress page download button can serve the annotated version later.
-    # Path mirrors the originals bucket: marked/{user_id}/{safe_filename}
-    try:
-        if SUPABASE_URL and SUPABASE_SERVICE_KEY and marked_bytes:
-            _marked_uid = user.get("id") if isinstance(user, dict) else None
-            if _marked_uid and file.filename:
-                _marked_safe = _sanitize_filename(file.filename)
-                _marked_url = f"{SUPABASE_URL}/storage/v1/object/marked/{_marked_uid}/{_marked_safe}"
-                async with httpx.AsyncClient(timeout=15) as client:
-                    _mresp = await client.post(
-                        _marked_url,
-                        content=marked_bytes,
-                        headers={
-                            "apikey": SUPABASE_SERVICE_KEY,
-                            "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                            "Content-Type": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                            "x-upsert": "true",
-                        },
-                    )
-                    if _DEBUG: print(f"[DEBUG] Marked upload: status={_mresp.status_code}, path={_marked_uid}/{_marked_safe}")
-    except Exception as e:
-        print(f"Failed to upload marked: {repr(e)}")
+    # 5. Call your engine
+    marked_bytes, metadata = await run_mark_docx_bytes(
+        docx_bytes,
+        user=user,
+        on_start=on_start,
+        mode=form["mode"],
+        teacher_config=teacher_config if teacher_config else None,
+        include_summary_table=form["include_summary_table"],
+    )
 
     if _DEBUG:
         print("Vysti metadata:", metadata)
         print("Teacher config used:", teacher_config)
 
+    return marked_bytes, metadata
+
+
+def _marked_filename(file_name: str | None) -> str:
+    """"{name}_marked.docx" for an uploaded essay's file name."""
+    clean_name = _sanitize_filename(file_name or "essay.docx")
+    base_name = clean_name.rsplit(".", 1)[0] if clean_name else "essay"
+    return f"{base_name}_marked.docx"
+
+
+def _build_mark_record(upload: dict, form: dict, marked_bytes: bytes, metadata: dict) -> dict:
+    """
+    Derive everything persisted and returned for one finished mark (label
+    counts, scores, client metadata) without touching Supabase. The client
+    payload is record["result"]; its mark_event_id is filled in by
+    _persist_mark_records.
+    """
     # ----- Extract examples from metadata -----
     examples = metadata.get("examples", []) if isinstance(metadata, dict) else []
 
@@ -2696,11 +2694,11 @@ async def mark_essay(
     _meta_word_count = metadata.get("word_count") if isinstance(metadata, dict) else None
     _meta_scores = None
     try:
-        orig_doc = Document(BytesIO(docx_bytes))
+        orig_doc = Document(BytesIO(upload["docx_bytes"]))
         essay_text = "\n\n".join(p.text.strip() for p in orig_doc.paragraphs if p.text.strip())
         _meta_scores = _compute_scores(
             essay_text,
-            mode=mode,
+            mode=form["mode"],
             label_counts=dict(label_counter),
             mark_event_id=None,
             sentence_types=(metadata.get("sentence_types", {}) if isinstance(metadata, dict) else {}),
@@ -2709,7 +2707,100 @@ async def mark_essay(
     except Exception as e:
         if _DEBUG: print(f"[SCORE] Pre-insert _compute_scores failed: {repr(e)}")
 
-    # Save mark to Supabase mark_events (best-effort; do not break marking if this fails).
+    output_filename = _marked_filename(upload["file_name"])
+
+    # Enrich metadata with computed values the frontend needs
+    enriched = dict(metadata) if isinstance(metadata, dict) else {}
+    enriched["total_labels"] = total_labels
+    enriched["label_counts"] = dict(label_counter)
+    enriched["mark_event_id"] = None
+    # Reuse pre-computed scores (computed before mark_events insert)
+    if _meta_scores:
+        enriched["scores"] = _meta_scores
+    # Strip proprietary fields before sending to client
+    if "issues" in enriched:
+        enriched["issues"] = _strip_ip_from_issues(enriched["issues"])
+    if "examples" in enriched:
+        enriched["examples"] = _strip_ip_from_examples(enriched["examples"])
+    if upload["word_count_warning"]:
+        enriched["word_count_warning"] = upload["word_count_warning"]
+
+    return {
+        "upload": upload,
+        "marked_bytes": marked_bytes,
+        "examples": examples,
+        "issues": issues,
+        "positive_events": _meta_positive_events,
+        "label_counts": dict(label_counter),
+        "total_labels": total_labels,
+        "word_count": _meta_word_count,
+        "scores": _meta_scores,
+        "result": {
+            "document": marked_bytes,
+            "filename": output_filename,
+            "metadata": _sanitize_for_json(enriched),
+        },
+    }
+
+
+def _postgrest_in(values) -> str:
+    """Value for a PostgREST ``in.(...)`` filter, quoted and URL-encoded."""
+    quoted = []
+    for v in values:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"')
+        quoted.append(f'"{v}"')
+    return urllib.parse.quote(f"in.({','.join(quoted)})", safe="")
+
+
+async def _upload_marked_docx(user: dict, file_name: str | None, marked_bytes: bytes) -> None:
+    """
+    Upload a marked .docx to Supabase Storage (best-effort) so the Progress
+    page download button can serve the annotated version later.
+    Path mirrors the originals bucket: marked/{user_id}/{safe_filename}
+    """
+    try:
+        if SUPABASE_URL and SUPABASE_SERVICE_KEY and marked_bytes:
+            _marked_uid = user.get("id") if isinstance(user, dict) else None
+            if _marked_uid and file_name:
+                _marked_safe = _sanitize_filename(file_name)
+                _marked_url = f"{SUPABASE_URL}/storage/v1/object/marked/{_marked_uid}/{_marked_safe}"
+                async with httpx.AsyncClient(timeout=15) as client:
+                    _mresp = await client.post(
+                        _marked_url,
+                        content=marked_bytes,
+                        headers={
+                            "apikey": SUPABASE_SERVICE_KEY,
+                            "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+                            "Content-Type": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                            "x-upsert": "true",
+                        },
+                    )
+                    if _DEBUG: print(f"[DEBUG] Marked upload: status={_mresp.status_code}, path={_marked_uid}/{_marked_safe}")
+    except Exception as e:
+        print(f"Failed to upload marked: {repr(e)}")
+
+
+async def _persist_mark_records(user: dict, form: dict, records: list[dict]) -> None:
+    """
+    Persist finished marks: marked .docx uploads, mark_events rows and
+    issue_examples. Supabase writes are batched across ``records`` (one
+    lookup, one bulk insert, one examples delete + insert) so /mark/batch
+    costs a handful of round trips rather than several per essay.
+    Sets result["metadata"]["mark_event_id"] on each record.
+    """
+    if not records:
+        return
+    mode = form["mode"]
+    assignment_name = form["assignment_name"]
+    user_id = user.get("id") if isinstance(user, dict) else None
+
+    # 5b. Upload marked .docx files (storage has no bulk API; run them concurrently)
+    await asyncio.gather(*(
+        _upload_marked_docx(user, r["upload"]["file_name"], r["marked_bytes"])
+        for r in records
+    ))
+
+    # Save marks to Supabase mark_events (best-effort; do not break marking if this fails).
     #
     # IMPORTANT — re-mark behaviour:
     # When a teacher re-marks the same file (same user_id + file_name), we
@@ -2720,22 +2811,20 @@ async def mark_essay(
     # essay_title) — destroying real grading work whenever an essay was
     # re-marked after annotation. We now only touch the marker-computed
     # columns; teacher annotations survive.
-    mark_event_id = None
-    _is_new_mark = False
+    mark_event_ids: dict[str, str] = {}
     try:
         if SUPABASE_URL and SUPABASE_SERVICE_KEY:
-            user_id = user.get("id") if isinstance(user, dict) else None
+            file_names = [r["upload"]["file_name"] for r in records]
 
-            # 1. Look up an existing row for this (user_id, file_name).
-            #    PostgREST: exactly one such row should exist if any, but
-            #    take the most recent defensively in case of legacy dupes.
-            encoded_filename = urllib.parse.quote(file.filename, safe="")
+            # 1. Look up existing rows for these (user_id, file_name) pairs.
+            #    PostgREST: exactly one such row should exist per file if any,
+            #    but take the most recent defensively in case of legacy dupes.
             lookup_url = (
                 f"{SUPABASE_URL}/rest/v1/mark_events"
-                f"?user_id=eq.{user_id}&file_name=eq.{encoded_filename}"
-                f"&select=id&order=created_at.desc&limit=1"
+                f"?user_id=eq.{user_id}&file_name={_postgrest_in(file_names)}"
+                f"&select=id,file_name&order=created_at.desc"
             )
-            existing_id = None
+            existing_ids: dict[str, str] = {}
             async with httpx.AsyncClient(timeout=5) as client:
                 lookup_resp = await client.get(
                     lookup_url,
@@ -2746,22 +2835,29 @@ async def mark_essay(
                 )
                 if lookup_resp.status_code == 200:
                     rows = lookup_resp.json()
-                    if isinstance(rows, list) and rows:
-                        existing_id = rows[0].get("id")
-            _is_new_mark = existing_id is None
-
-            # 2a. Re-mark: PATCH only the marker-computed columns. Every
-            #     teacher-set field stays as it was (preserved).
-            if existing_id:
+                    if isinstance(rows, list):
+                        for row in rows:
+                            existing_ids.setdefault(row.get("file_name"), row.get("id"))
+
+            new_records = []
+            for r in records:
+                file_name = r["upload"]["file_name"]
+                existing_id = existing_ids.get(file_name)
+                if not existing_id:
+                    new_records.append(r)
+                    continue
+
+                # 2a. Re-mark: PATCH only the marker-computed columns. Every
+                #     teacher-set field stays as it was (preserved).
                 patch_body = {
                     "mode": mode,
-                    "bytes": len(docx_bytes),
-                    "total_labels": total_labels,
-                    "label_counts": dict(label_counter),
-                    "issues": issues,
-                    "word_count": _meta_word_count,
-                    "scores": _sanitize_for_json(_meta_scores) if _meta_scores else None,
-                    "positive_events": _sanitize_for_json(_meta_positive_events),
+                    "bytes": len(r["upload"]["docx_bytes"]),
+                    "total_labels": r["total_labels"],
+                    "label_counts": r["label_counts"],
+                    "issues": r["issues"],
+                    "word_count": r["word_count"],
+                    "scores": _sanitize_for_json(r["scores"]) if r["scores"] else None,
+                    "positive_events": _sanitize_for_json(r["positive_events"]),
                 }
                 patch_url = f"{SUPABASE_URL}/rest/v1/mark_events?id=eq.{existing_id}"
                 async with httpx.AsyncClient(timeout=5) as client:
@@ -2776,32 +2872,35 @@ async def mark_essay(
                         },
                     )
                     if 200 <= patch_resp.status_code < 300:
-                        mark_event_id = existing_id
+                        mark_event_ids[file_name] = existing_id
                         if _DEBUG: print(f"[DEBUG] Re-marked existing row id={existing_id}")
                     else:
                         if _DEBUG: print(f"[DEBUG] Re-mark PATCH failed: {patch_resp.status_code} {patch_resp.text[:200]}")
 
-            # 2b. First mark for this filename: INSERT with the parser-/
-            #     form-supplied student_name / assignment_name / class_id.
-            else:
-                payload = {
-                    "user_id": user_id,
-                    "file_name": file.filename,
-                    "mode": mode,
-                    "bytes": len(docx_bytes),
-                    "student_name": student_name,
-                    "assignment_name": assignment_name,
-                    "class_id": class_id_validated,
-                    "total_labels": total_labels,
-                    "label_counts": dict(label_counter),
-                    "issues": issues,
-                    "review_status": "pending",
-                    "word_count": _meta_word_count,
-                    "scores": _sanitize_for_json(_meta_scores) if _meta_scores else None,
-                    "positive_events": _sanitize_for_json(_meta_positive_events),
-                }
-                db_url = f"{SUPABASE_URL}/rest/v1/mark_events?select=id"
-                async with httpx.AsyncClient(timeout=5) as client:
+            # 2b. First mark for these filenames: one bulk INSERT with the
+            #     parser-/form-supplied student_name / assignment_name / class_id.
+            if new_records:
+                payload = [
+                    {
+                        "user_id": user_id,
+                        "file_name": r["upload"]["file_name"],
+                        "mode": mode,
+                        "bytes": len(r["upload"]["docx_bytes"]),
+                        "student_name": r["upload"]["student_name"],
+                        "assignment_name": assignment_name,
+                        "class_id": r["upload"]["class_id"],
+                        "total_labels": r["total_labels"],
+                        "label_counts": r["label_counts"],
+                        "issues": r["issues"],
+                        "review_status": "pending",
+                        "word_count": r["word_count"],
+                        "scores": _sanitize_for_json(r["scores"]) if r["scores"] else None,
+                        "positive_events": _sanitize_for_json(r["positive_events"]),
+                    }
+                    for r in new_records
+                ]
+                db_url = f"{SUPABASE_URL}/rest/v1/mark_events?select=id,file_name"
+                async with httpx.AsyncClient(timeout=10) as client:
                     resp = await client.post(
                         db_url,
                         json=payload,
@@ -2812,16 +2911,20 @@ async def mark_essay(
                             "Prefer": "return=representation",
                         },
                     )
-                    if 200 <= resp.status_code < 300:
-                        resp_data = resp.json()
-                        if isinstance(resp_data, list) and resp_data:
-                            mark_event_id = resp_data[0].get("id")
+                if 200 <= resp.status_code < 300:
+                    resp_data = resp.json()
+                    if isinstance(resp_data, list):
+                        for row in resp_data:
+                            mark_event_ids[row.get("file_name")] = row.get("id")
                             # Bump monotonic lifetime mark counter — only on new marks
                             if user_id:
                                 await _bump_lifetime_marks(user_id)
     except Exception as e:
         print("Failed to log mark_event:", repr(e))
 
+    for r in records:
+        r["result"]["metadata"]["mark_event_id"] = mark_event_ids.get(r["upload"]["file_name"])
+
     # NOTE: an automatic-prune block used to live here, deleting every
     # mark_events row past _MAX_MARK_EVENTS_PER_USER = 200 (along with the
     # corresponding issue_examples). That was silently destroying months
@@ -2834,17 +2937,17 @@ async def mark_essay(
 
     # Log examples to Supabase issue_examples (best-effort; do not break marking if this fails)
     try:
-        if _DEBUG: print(f"[DEBUG] Examples from marker: count={len(examples) if examples else 0}")
-        if SUPABASE_URL and SUPABASE_SERVICE_KEY and examples:
-            user_id = user.get("id") if isinstance(user, dict) else None
-            if _DEBUG: print(f"[DEBUG] Saving examples: user_id={user_id}, file_name={file.filename}")
+        with_examples = [r for r in records if r["examples"]]
+        if _DEBUG: print(f"[DEBUG] Examples from marker: count={sum(len(r['examples']) for r in records)}")
+        if SUPABASE_URL and SUPABASE_SERVICE_KEY and with_examples:
+            if _DEBUG: print(f"[DEBUG] Saving examples: user_id={user_id}, files={len(with_examples)}")
             if user_id:
-                # Clear old cached examples for this user/file to ensure fresh start
-                encoded_filename = urllib.parse.quote(file.filename)
+                # Clear old cached examples for these user/files to ensure fresh start
+                file_filter = _postgrest_in(r["upload"]["file_name"] for r in with_examples)
                 delete_url = f"{SUPABASE_URL}/rest/v1/issue_examples"
                 async with httpx.AsyncClient(timeout=5) as client:
                     resp = await client.delete(
-                        f"{delete_url}?user_id=eq.{user_id}&file_name=eq.{encoded_filename}",
+                        f"{delete_url}?user_id=eq.{user_id}&file_name={file_filter}",
                         headers={
                             "apikey": SUPABASE_SERVICE_KEY,
                             "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
@@ -2853,40 +2956,42 @@ async def mark_essay(
                     if _DEBUG: print(f"[DEBUG] Deleted old examples: status={resp.status_code}")
 
                 example_rows = []
-                for ex in examples:
-                    if not isinstance(ex, dict):
-                        continue
-                    label = ex.get("label")
-                    sentence = ex.get("sentence")
-                    paragraph_index = ex.get("paragraph_index")
-                    if not label or not sentence:
-                        continue
-                    example_row = {
-                        "user_id": user_id,
-                        "class_id": class_id_validated,
-                        "assignment_name": assignment_name,
-                        "student_name": student_name,
-                        "mode": mode,
-                        "file_name": file.filename,
-                        "label": label,
-                        "sentence": sentence,
-                        "paragraph_index": paragraph_index,
-                        "mark_event_id": mark_event_id,
-                        # Include context fields for dynamic guidance (use None if missing to ensure all rows have same keys)
-                        "found_value": ex.get("found_value"),
-                        "topics": ex.get("topics"),
-                        "thesis": ex.get("thesis"),
-                        "confidence": ex.get("confidence"),
-                        "original_phrase": ex.get("original_phrase"),
-                    }
-
-                    example_rows.append(example_row)
+                for r in with_examples:
+                    upload = r["upload"]
+                    for ex in r["examples"]:
+                        if not isinstance(ex, dict):
+                            continue
+                        label = ex.get("label")
+                        sentence = ex.get("sentence")
+                        paragraph_index = ex.get("paragraph_index")
+                        if not label or not sentence:
+                            continue
+                        example_row = {
+                            "user_id": user_id,
+                            "class_id": upload["class_id"],
+                            "assignment_name": assignment_name,
+                            "student_name": upload["student_name"],
+                            "mode": mode,
+                            "file_name": upload["file_name"],
+                            "label": label,
+                            "sentence": sentence,
+                            "paragraph_index": paragraph_index,
+                            "mark_event_id": mark_event_ids.get(upload["file_name"]),
+                            # Include context fields for dynamic guidance (use None if missing to ensure all rows have same keys)
+                            "found_value": ex.get("found_value"),
+                            "topics": ex.get("topics"),
+                            "thesis": ex.get("thesis"),
+                            "confidence": ex.get("confidence"),
+                            "original_phrase": ex.get("original_phrase"),
+                        }
+
+                        example_rows.append(example_row)
 
                 if _DEBUG: print(f"[DEBUG] Created {len(example_rows)} example rows to insert")
                 if example_rows:
                     if _DEBUG: print(f"[DEBUG] First example row: {example_rows[0]}")
                     db_url = f"{SUPABASE_URL}/rest/v1/issue_examples"
-                    async with httpx.AsyncClient(timeout=5) as client:
+                    async with httpx.AsyncClient(timeout=10) as client:
                         post_resp = await client.post(
                             db_url,
                             json=example_rows,
@@ -2901,46 +3006,441 @@ async def mark_essay(
                 else:
                     if _DEBUG: print("[DEBUG] No valid example rows to insert")
         else:
-            if _DEBUG: print(f"[DEBUG] Skipping examples insert: SUPABASE_URL={bool(SUPABASE_URL)}, SUPABASE_SERVICE_KEY={bool(SUPABASE_SERVICE_KEY)}, examples={bool(examples)}")
+            if _DEBUG: print(f"[DEBUG] Skipping examples insert: SUPABASE_URL={bool(SUPABASE_URL)}, SUPABASE_SERVICE_KEY={bool(SUPABASE_SERVICE_KEY)}, examples={bool(with_examples)}")
     except Exception as e:
         print("Failed to log issue_examples:", repr(e))
 
-    # 5. Return response - JSON with metadata or stream the marked .docx
-    clean_name = _sanitize_filename(file.filename or "essay.docx")
-    base_name = clean_name.rsplit(".", 1)[0] if clean_name else "essay"
-    output_filename = f"{base_name}_marked.docx"
 
-    # NEW: Return JSON if requested
+async def _record_mark(
+    user: dict, upload: dict, form: dict, marked_bytes: bytes, metadata: dict
+) -> dict:
+    """
+    Persist a finished mark (marked docx, mark_events row, issue_examples)
+    and build the client payload: {"document", "filename", "metadata"},
+    where document is the raw marked .docx bytes.
+    """
+    record = _build_mark_record(upload, form, marked_bytes, metadata)
+    await _persist_mark_records(user, form, [record])
+    return record["result"]
+
+
+def _mark_response(result: dict, return_metadata: bool):
+    """Return a mark result as JSON with metadata, or stream the marked .docx."""
     if return_metadata:
-        # Enrich metadata with computed values the frontend needs
-        enriched = dict(metadata) if isinstance(metadata, dict) else {}
-        enriched["total_labels"] = total_labels
-        enriched["label_counts"] = dict(label_counter)
-        enriched["mark_event_id"] = mark_event_id
-        # Reuse pre-computed scores (computed before mark_events insert)
-        if _meta_scores:
-            enriched["scores"] = _meta_scores
-        # Strip proprietary fields before sending to client
-        if "issues" in enriched:
-            enriched["issues"] = _strip_ip_from_issues(enriched["issues"])
-        if "examples" in enriched:
-            enriched["examples"] = _strip_ip_from_examples(enriched["examples"])
-        if _word_count_warning:
-            enriched["word_count_warning"] = _word_count_warning
         return JSONResponse({
-            "document": base64.b64encode(marked_bytes).decode('utf-8'),
-            "filename": output_filename,
-            "metadata": _sanitize_for_json(enriched),
+            "document": base64.b64encode(result["document"]).decode('utf-8'),
+            "filename": result["filename"],
+            "metadata": result["metadata"],
         })
 
-    # Existing: Stream the document
     return StreamingResponse(
-        io.BytesIO(marked_bytes),
+        io.BytesIO(result["document"]),
         media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": f'attachment; filename="{output_filename}"'},
+        headers={"Content-Disposition": f'attachment; filename="{result["filename"]}"'},
     )
 
 
+@app.post("/mark")
+@limiter.limit("40/minute")
+async def mark_essay(
+    request: Request,
+    file: UploadFile = File(...),
+    user: dict = Depends(require_product("mark", "revise")),
+    form: dict = Depends(_mark_form_fields),
+):
+    """
+    Mark a .docx essay using the Vysti engine.
+
+    Accepts up to three works (author/title) plus:
+      - text_is_minor_work, text_is_minor_work_2, text_is_minor_work_3
+      - forbid_personal_pronouns
+      - enforce_closed_thesis
+
+    These map directly onto MarkerConfig in marker.py (see _mark_form_fields).
+    """
+    upload = await _prepare_mark_upload(user, file, form)
+    if isinstance(upload, JSONResponse):
+        return upload
+
+    # Concurrent marks from the same user queue fairly in the scheduler
+    # (see run_mark_docx_bytes) instead of being rejected.
+    marked_bytes, metadata = await _run_mark_engine(user, upload, form)
+    result = await _record_mark(user, upload, form, marked_bytes, metadata)
+    return _mark_response(result, form["return_metadata"])
+
+
+# ===== Batch marking (/mark/batch) =====
+_BATCH_MAX_FILES = env_int("VYSTI_MARK_BATCH_MAX_FILES", 150)
+_BATCH_MAX_TOTAL_BYTES = 200 * 1024 * 1024  # uncompressed, across the whole upload
+_BACKGROUND_TASKS: set = set()  # strong refs for fire-and-forget persistence
+
+
+def _batch_output_names(file_names: list[str]) -> list[str]:
+    """
+    _marked_filename() for each essay of a batch, made unique: "Smith.docx"
+    and "Smith.pdf" would both be "Smith_marked.docx", so the later one
+    becomes "Smith (2)_marked.docx".
+    """
+    used: set[str] = set()
+    names: list[str] = []
+    for file_name in file_names:
+        name = _marked_filename(file_name)
+        base = name[: -len("_marked.docx")]
+        n = 2
+        while name.lower() in used:
+            name = f"{base} ({n})_marked.docx"
+            n += 1
+        used.add(name.lower())
+        names.append(name)
+    return names
+
+
+def _expand_batch_uploads(uploads: list[tuple[str | None, bytes]]):
+    """
+    Flatten a /mark/batch upload into individual essays.
+
+    ZIPs are unpacked (folders flattened; OS junk such as __MACOSX, dotfiles
+    and Word "~$" lock files ignored). Returns (essays, skipped) where
+    essays is [(file_name, bytes)] and skipped is [{"file_name", "error"}].
+    Members that can't be extracted (corrupt or encrypted) are skipped.
+    Raises HTTPException(400) for unreadable ZIPs or an oversized batch.
+    """
+    essays: list[tuple[str, bytes]] = []
+    skipped: list[dict] = []
+    seen: set[str] = set()
+    total_bytes = 0
+
+    def _check_total(size: int):
+        if total_bytes + size > _BATCH_MAX_TOTAL_BYTES:
+            raise HTTPException(status_code=400, detail="This upload is too large. Please split it into smaller batches.")
+
+    def _add(name: str, data: bytes):
+        nonlocal total_bytes
+        if name in seen:
+            skipped.append({"file_name": name, "error": "Duplicate file name in this upload."})
+            return
+        _check_total(len(data))
+        seen.add(name)
+        total_bytes += len(data)
+        essays.append((name, data))
+
+    for upload_name, data in uploads:
+        if not (upload_name or "").lower().endswith(".zip"):
+            _add(upload_name or "essay", data)
+            continue
+        try:
+            archive = zipfile.ZipFile(BytesIO(data))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail=f"{upload_name} is not a valid ZIP file.")
+        with archive:
+            for info in archive.infolist():
+                name = info.filename.replace("\\", "/").rsplit("/", 1)[-1]
+                if info.is_dir() or info.filename.startswith("__MACOSX/") or not name or name.startswith((".", "~$")):
+                    continue
+                if not name.lower().endswith((".docx", ".pdf")):
+                    skipped.append({"file_name": name, "error": "Skipped: not a .docx or .pdf file."})
+                    continue
+                if info.file_size > _MAX_UPLOAD_BYTES:
+                    skipped.append({"file_name": name, "error": "File exceeds the 10 MB size limit."})
+                    continue
+                # Check the declared size before decompressing anything
+                _check_total(info.file_size)
+                try:
+                    member = archive.read(info)
+                except (zipfile.BadZipFile, RuntimeError, ValueError, NotImplementedError):
+                    # Corrupt (bad CRC), encrypted or unsupported compression
+                    skipped.append({"file_name": name, "error": "Could not read this file from the ZIP."})
+                    continue
+                _add(name, member)
+
+    if len(essays) > _BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Please upload at most {_BATCH_MAX_FILES} essays at a time ({len(essays)} found).",
+        )
+    return essays, skipped
+
+
+class _ZipChunkWriter:
+    """Write-only file for zipfile that hands the archive back chunk by chunk."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+@app.post("/mark/batch")
+@limiter.limit("10/minute")
+async def mark_batch(
+    request: Request,
+    files: list[UploadFile] = File(...),
+    output: str = Form("ndjson"),
+    user: dict = Depends(require_product("mark", "revise")),
+    form: dict = Depends(_mark_form_fields),
+):
+    """
+    Mark a whole class at once: a ZIP and/or several .docx/.pdf files,
+    sharing one set of /mark form fields (student_name is guessed per file).
+
+    Auth, tier and class checks run once; the essays are then marked in
+    parallel through the scheduler and streamed back as each one finishes:
+
+      - output=ndjson (default): one JSON object per line —
+        {"type": "result", "index", "file_name", "filename", "document", "metadata"}
+        or {"type": "error", "index", "file_name", "error"}, then a final
+        {"type": "summary", ..., "mark_event_ids": {file_name: id}}.
+      - output=zip: a streamed ZIP of marked .docx files plus manifest.json.
+
+    mark_events and issue_examples are written in one batch once every
+    essay is done, so per-essay mark_event_ids arrive in the summary.
+    """
+    if output not in ("ndjson", "zip"):
+        return JSONResponse(status_code=400, content={"error": "output must be 'ndjson' or 'zip'."})
+
+    # 0. Product-level access check based on calling context
+    await _enforce_product_for_mode(user, bool(form["student_mode"]))
+
+    essays, skipped = _expand_batch_uploads([(f.filename, await f.read()) for f in files])
+    if not essays:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "No .docx or .pdf essays found in this upload.", "skipped": skipped},
+        )
+
+    # 1c. Free-tier usage check (the whole batch must fit)
+    await _check_free_tier_marks(user, essays=len(essays))
+
+    # 2. Validate class_id once for the batch
+    class_id_validated = await _validate_mark_class(user, form["class_id"])
+    if isinstance(class_id_validated, JSONResponse):
+        return class_id_validated
+
+    tenant, _ = await _mark_tenant(user)
+    try:
+        get_mark_scheduler().check_capacity(tenant, count=len(essays))
+    except MarkQueueFull as e:
+        raise _busy_exception(e)
+
+    output_names = _batch_output_names([name for name, _ in essays])
+
+    async def _mark_one(index: int, file_name: str, contents: bytes):
+        try:
+            upload = await _prepare_essay(file_name, contents, None)
+            if isinstance(upload, str):
+                return index, file_name, None, upload
+            upload["class_id"] = class_id_validated
+            marked_bytes, metadata = await _run_mark_engine(user, upload, form)
+            record = _build_mark_record(upload, form, marked_bytes, metadata)
+            record["result"]["filename"] = output_names[index]
+            return index, file_name, record, None
+        except Exception as e:
+            detail = getattr(e, "detail", None)
+            if isinstance(detail, dict):
+                detail = detail.get("message")
+            if not isinstance(detail, str):
+                print(f"Batch mark failed for {file_name}: {repr(e)}")
+                detail = "Marking failed. Please try again."
+            return index, file_name, None, detail
+
+    async def _results():
+        """Yield (index, file_name, record, error) as essays finish, then persist."""
+        tasks = [asyncio.create_task(_mark_one(i, n, b)) for i, (n, b) in enumerate(essays)]
+        records: list[dict] = []
+        persisted = False
+        try:
+            for fut in asyncio.as_completed(tasks):
+                index, file_name, record, error = await fut
+                if record is not None:
+                    records.append(record)
+                yield index, file_name, record, error
+            await _persist_mark_records(user, form, records)
+            persisted = True
+        finally:
+            for t in tasks:
+                t.cancel()
+            if records and not persisted:
+                # Client went away mid-stream: still record what was marked.
+                task = asyncio.create_task(_persist_mark_records(user, form, records))
+                _BACKGROUND_TASKS.add(task)
+                task.add_done_callback(_BACKGROUND_TASKS.discard)
+
+    def _summary(records_by_name: dict, failed: int) -> dict:
+        return {
+            "type": "summary",
+            "total": len(essays) + len(skipped),
+            "marked": len(records_by_name),
+            "failed": failed + len(skipped),
+            "mark_event_ids": {
+                name: r["result"]["metadata"].get("mark_event_id")
+                for name, r in records_by_name.items()
+            },
+        }
+
+    async def _ndjson():
+        for item in skipped:
+            yield json.dumps({"type": "error", "index": None, **item}) + "\n"
+        done: dict[str, dict] = {}
+        failed = 0
+        async for index, file_name, record, error in _results():
+            if record is None:
+                failed += 1
+                yield json.dumps({"type": "error", "index": index, "file_name": file_name, "error": error}) + "\n"
+                continue
+            done[file_name] = record
+            result = record["result"]
+            yield json.dumps({
+                "type": "result",
+                "index": index,
+                "file_name": file_name,
+                "filename": result["filename"],
+                "document": base64.b64encode(result["document"]).decode("utf-8"),
+                "metadata": result["metadata"],
+            }) + "\n"
+        yield json.dumps(_summary(done, failed)) + "\n"
+
+    async def _zip():
+        sink = _ZipChunkWriter()
+        archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+        manifest = {"essays": [], "skipped": skipped}
+        done: dict[str, dict] = {}
+        failed = 0
+        async for index, file_name, record, error in _results():
+            if record is None:
+                failed += 1
+                manifest["essays"].append({"index": index, "file_name": file_name, "error": error})
+                continue
+            done[file_name] = record
+            result = record["result"]
+            archive.writestr(result["filename"], result["document"])
+            manifest["essays"].append({
+                "index": index,
+                "file_name": file_name,
+                "filename": result["filename"],
+                "metadata": result["metadata"],
+            })
+            yield sink.drain()
+        manifest["summary"] = _summary(done, failed)
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+        archive.close()
+        yield sink.drain()
+
+    if output == "zip":
+        return StreamingResponse(
+            _zip(),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="marked_essays.zip"'},
+        )
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
+
+@app.post("/mark/jobs", status_code=202)
+@limiter.limit("40/minute")
+async def create_mark_job(
+    request: Request,
+    file: UploadFile = File(...),
+    user: dict = Depends(require_product("mark", "revise")),
+    form: dict = Depends(_mark_form_fields),
+):
+    """
+    Queue an essay for marking and return a job id immediately.
+
+    Takes the same form fields as /mark. The upload is validated before
+    the job is queued, so bad files and usage limits fail here rather than
+    in the job. Poll GET /mark/jobs/{job_id}; once ``status`` is "done",
+    GET /mark/jobs/{job_id}/result returns what /mark would have returned.
+    """
+    upload = await _prepare_mark_upload(user, file, form)
+    if isinstance(upload, JSONResponse):
+        return upload
+
+    async def _run_job(mark_running) -> dict:
+        # Re-check the free tier: a free user can queue several jobs before
+        # the first one is recorded.
+        await _check_free_tier_marks(user)
+        marked_bytes, metadata = await _run_mark_engine(user, upload, form, on_start=mark_running)
+        return await _record_mark(user, upload, form, marked_bytes, metadata)
+
+    # Refuse up front if this user's scheduler queue is already full,
+    # rather than accepting a job that would fail as soon as it runs.
+    tenant, _ = await _mark_tenant(user)
+    try:
+        get_mark_scheduler().check_capacity(tenant)
+    except MarkQueueFull as e:
+        raise _busy_exception(e)
+
+    try:
+        job = await get_mark_job_queue().submit(
+            _run_job,
+            user_id=user.get("id") if isinstance(user, dict) else None,
+            file_name=upload["file_name"],
+            return_metadata=form["return_metadata"],
+        )
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The marking queue is full. Please try again in a few minutes.",
+        )
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            **job_status_payload(await get_mark_job_queue().get(job["id"])),
+            "status_url": f"/mark/jobs/{job['id']}",
+        },
+    )
+
+
+async def _get_user_mark_job(job_id: str, user: dict) -> dict:
+    """Look up a job owned by this user; missing, expired and foreign jobs are all 404."""
+    job = await get_mark_job_queue().get(job_id)
+    user_id = user.get("id") if isinstance(user, dict) else None
+    if job is None or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Marking job not found or expired.")
+    return job
+
+
+@app.get("/mark/jobs/{job_id}")
+@limiter.limit("120/minute")
+async def get_mark_job(
+    request: Request,
+    job_id: str,
+    user: dict = Depends(require_product("mark", "revise")),
+):
+    """Status of a queued mark: queued → running → done | failed."""
+    return job_status_payload(await _get_user_mark_job(job_id, user))
+
+
+@app.get("/mark/jobs/{job_id}/result")
+@limiter.limit("60/minute")
+async def get_mark_job_result(
+    request: Request,
+    job_id: str,
+    user: dict = Depends(require_product("mark", "revise")),
+):
+    """Result of a finished mark, in the same shape /mark returns."""
+    job = await _get_user_mark_job(job_id, user)
+    if job["status"] != JOB_DONE:
+        return JSONResponse(
+            status_code=409,
+            content={
+                "error": job["error"] or "This essay has not finished marking yet.",
+                "status": job["status"],
+            },
+        )
+    return _mark_response(job, job["return_metadata"])
+
+
 @app.post("/export_docx")
 @limiter.limit("30/minute")
 async def export_docx(
@@ -5005,13 +5505,13 @@ async def check_revision(
     mode = body.mode or "textual_analysis"
     teacher_config = build_teacher_config_from_titles(body.titles)
 
-    mark_docx_bytes, _ = get_engine()
     normalized_label = normalize_label(label_value)
 
     # Mark the rewrite in isolation to see if the issue still triggers
     doc_rewrite = build_doc_from_text(body.rewrite.strip())
-    _, metadata_rewrite = mark_docx_bytes(
+    _, metadata_rewrite = await run_mark_docx_bytes(
         doc_rewrite,
+        user=user,
         mode=mode,
         teacher_config=teacher_config if teacher_config else None,
     )
@@ -5144,10 +5644,10 @@ async def mark_text(
             teacher_config[_rf] = _rv
 
     # 3. Call mark_docx_bytes (same pipeline as /mark)
-    mark_docx_bytes, _ = get_engine()
     mode = body.mode or "textual_analysis"
-    marked_bytes, metadata = mark_docx_bytes(
+    marked_bytes, metadata = await run_mark_docx_bytes(
         docx_bytes,
+        user=user,
         mode=mode,
         teacher_config=teacher_config if teacher_config else None,
         include_summary_table=bool(body.include_summary_table),
@@ -5433,6 +5933,15 @@ async def check_text(
     header. Anonymous responses are stripped (no student_guidance,
     short_explanation, examples) and rate-limited more aggressively
     (20/min per IP). Non-Write modes still require a valid token.
+
+    Incremental checks: with a session_id, an unchanged revision is
+    answered from the session, and unchanged paragraphs reuse their marks
+    and grammar checks (see check_sessions.py). Such responses also carry
+    "revision" and "changed_paragraphs" (indices edited since the
+    previous check in the session, or null on its first check).
+    Every response carries "grammar_checks" ("full", "partial" or
+    "skipped"); only "full" responses are replayed for an unchanged
+    revision.
     """
     _is_write = _is_write_mode(body.mode)
 
@@ -5499,6 +6008,36 @@ async def check_text(
     if body.text and len(body.text) > _MAX_TEXT_CHARS:
         raise HTTPException(status_code=400, detail=f"Text exceeds {_MAX_TEXT_CHARS} character limit.")
 
+    # 0c. Incremental Write sessions
+    session = None
+    session_key = revision = None
+    paragraphs = split_paragraphs(body.text)
+    if body.session_id:
+        owner = user.get("id") if user else f"anon:{get_remote_address(request) or 'unknown'}"
+        session_key = f"{owner}:{body.session_id}"
+        revision = revision_hash(
+            {**body.model_dump(exclude={"session_id", "file_name"}), "anonymous": _is_anonymous}
+        )
+        session = get_check_sessions().get(session_key)
+        # A response marked without some of its grammar checks (LanguageTool
+        # down or over budget) is not replayed; the revision is checked again.
+        if (
+            session is not None
+            and session.revision == revision
+            and session.response.get("grammar_checks", "full") == "full"
+        ):
+            if _is_api_client:
+                await _log_api_usage(
+                    api_key_id=user.get("_api_key_id", ""),
+                    endpoint="/check_text",
+                    status_code=200,
+                    chars_processed=len(body.text or ""),
+                    response_ms=int((time.time() - _api_start_time) * 1000),
+                    client_ip=get_remote_address(request),
+                    metadata={"mode": body.mode, "session_hit": True},
+                )
+            return JSONResponse({**session.response, "revision": revision, "changed_paragraphs": []})
+
     # 1. Create .docx from text
     docx_bytes = build_doc_from_text(body.text)
 
@@ -5507,14 +6046,18 @@ async def check_text(
     teacher_config["student_mode"] = body.student_mode
 
     # 3. Call mark_docx_bytes (same pipeline as /mark and /mark_text)
-    mark_docx_bytes_fn, _ = get_engine()
     mode = body.mode or "textual_analysis"
-    _marked_bytes, metadata = mark_docx_bytes_fn(
+    _marked_bytes, metadata = await run_mark_docx_bytes(
         docx_bytes,
+        user=user,
         mode=mode,
         teacher_config=teacher_config if teacher_config else None,
         include_summary_table=False,
+        grammar_matches=(session.grammar_matches if session else {}) if session_key else None,
+        paragraph_marks=(session.paragraph_marks if session else {}) if session_key else None,
     )
+    grammar_matches = metadata.pop("grammar_matches", {}) if isinstance(metadata, dict) else {}
+    paragraph_marks = metadata.pop("paragraph_marks", {}) if isinstance(metadata, dict) else {}
 
     # 4. Extract issues, examples, detected_lexis from metadata
     examples = metadata.get("examples", []) if isinstance(metadata, dict) else []
@@ -5523,6 +6066,7 @@ async def check_text(
     techniques_discussed = metadata.get("techniques_discussed", []) if isinstance(metadata, dict) else []
     sentence_types = metadata.get("sentence_types", {}) if isinstance(metadata, dict) else {}
     first_sentence_components = metadata.get("first_sentence_components", {}) if isinstance(metadata, dict) else {}
+    grammar_checks = metadata.get("grammar_checks", "full") if isinstance(metadata, dict) else "full"
 
     # 5. Count labels
     label_counter = Counter()
@@ -5681,6 +6225,7 @@ async def check_text(
             "first_sentence_components": first_sentence_components,
             "repeated_nouns": repeated_nouns,
             "scores": None,
+            "grammar_checks": grammar_checks,
             "is_anonymous": True,
         }
     else:
@@ -5696,8 +6241,23 @@ async def check_text(
             "first_sentence_components": first_sentence_components,
             "repeated_nouns": repeated_nouns,
             "scores": scores,
+            "grammar_checks": grammar_checks,
         }
         # For regular users, include mark_event_id; strip it for API clients
         if not _is_api_client:
             _response_data["mark_event_id"] = mark_event_id
-    return JSONResponse(_sanitize_for_json(_response_data))
+    _response_data = _sanitize_for_json(_response_data)
+    if session_key:
+        get_check_sessions().put(session_key, CheckSession(
+            revision=revision,
+            paragraphs=paragraphs,
+            response=_response_data,
+            grammar_matches=grammar_matches,
+            paragraph_marks=paragraph_marks,
+        ))
+        _response_data = {
+            **_response_data,
+            "revision": revision,
+            "changed_paragraphs": changed_paragraphs(session.paragraphs, paragraphs) if session else None,
+        }
+    return JSONResponse(_response_data)
@@ -0,0 +1,131 @@
+"""
+Memory-mapped English word index for offline "is this a word?" checks.
+
+marker._is_valid_derivation asked LanguageTool whether the base of every
+flagged -ability / -ization / -ness / -ment word is spelled correctly,
+one synchronous round trip per word. With a word index artifact present
+it answers from the index instead.
+
+The artifact (built by build_word_index.py) is an open-addressing hash
+table of 64-bit word fingerprints:
+
+    header  8-byte magic, slot count (a power of two), word count   (<8sQQ)
+    slots   one little-endian uint64 per slot; 0 marks an empty slot
+
+Lookups hash the lowercased word and probe a few slots: O(1), no parsing
+at load time, and the pages are shared by every worker on the host
+because the file is mmap'ed read-only. At 64 bits, a false "yes" needs a
+fingerprint collision, about one in 2**64 per lookup.
+
+A miss is final (no LanguageTool fallback), so an index built from a
+partial word list would turn valid derivations into spelling errors. The
+builder refuses to write one with fewer than MIN_WORDS words, and
+get_word_index ignores any such artifact.
+
+Config (env):
+    VYSTI_WORD_INDEX_PATH   artifact path (default english-words.idx).
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+WORD_INDEX_PATH = os.getenv("VYSTI_WORD_INDEX_PATH", "english-words.idx")
+
+# A full English dictionary has well over this many words; LanguageTool's
+# spelling*.txt additions alone have far fewer.
+MIN_WORDS = 50000
+
+_MAGIC = b"VYWORDS1"
+_HEADER = struct.Struct("<8sQQ")
+
+
+def word_fingerprint(word: str) -> int:
+    """Nonzero 64-bit fingerprint of the lowercased word."""
+    digest = hashlib.blake2b(word.lower().encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def build_word_index(words, path: str = WORD_INDEX_PATH, min_words: int = MIN_WORDS) -> int:
+    """
+    Write the index for ``words`` to ``path`` (atomically); returns the word
+    count. Raises ValueError, writing nothing, for fewer than ``min_words``.
+    """
+    fingerprints = {word_fingerprint(w) for w in (w.strip() for w in words) if w}
+    if len(fingerprints) < min_words:
+        raise ValueError(f"only {len(fingerprints)} words; a full dictionary has at least {min_words}")
+    capacity = 8
+    while capacity < 2 * len(fingerprints):  # load factor <= 0.5
+        capacity *= 2
+    mask = capacity - 1
+    slots = array("Q", bytes(8 * capacity))
+    for fp in fingerprints:
+        i = fp & mask
+        while slots[i]:
+            i = (i + 1) & mask
+        slots[i] = fp
+    if sys.byteorder != "little":
+        slots.byteswap()
+
+    out_dir = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, capacity, len(fingerprints)))
+        f.write(slots.tobytes())
+    os.replace(tmp_path, path)
+    return len(fingerprints)
+
+
+class WordIndex:
+    """Read-only view of a word index artifact; ``word in index`` is O(1)."""
+
+    def __init__(self, path: str = WORD_INDEX_PATH):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, capacity, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or len(self._mm) != _HEADER.size + 8 * capacity:
+            self._mm.close()
+            raise ValueError(f"{path} is not a word index")
+        self._mask = capacity - 1
+        self._count = count
+        self.path = path
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, word: str) -> bool:
+        fp = word_fingerprint(word)
+        i = fp & self._mask
+        while True:
+            slot = int.from_bytes(self._mm[_HEADER.size + 8 * i:_HEADER.size + 8 * i + 8], "little")
+            if slot == fp:
+                return True
+            if slot == 0:
+                return False
+            i = (i + 1) & self._mask
+
+
+_INDEX: WordIndex | None = None
+_INDEX_LOADED = False
+
+
+def get_word_index() -> WordIndex | None:
+    """Process-wide WordIndex over WORD_INDEX_PATH (None if the artifact is missing, invalid or too small)."""
+    global _INDEX, _INDEX_LOADED
+    if not _INDEX_LOADED:
+        _INDEX_LOADED = True
+        try:
+            _INDEX = WordIndex(WORD_INDEX_PATH)
+            if len(_INDEX) < MIN_WORDS:
+                raise ValueError(f"only {len(_INDEX)} words (built from a partial word list?)")
+            print(f"✓ Word index loaded ({len(_INDEX)} words, {WORD_INDEX_PATH})")
+        except FileNotFoundError:
+            _INDEX = None
+        except (OSError, ValueError) as e:
+            print(f"[word_index] ignoring {WORD_INDEX_PATH}: {e}")
+            _INDEX = None
+    return _INDEX